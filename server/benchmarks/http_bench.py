@@ -0,0 +1,435 @@
+"""
+End-to-end latency, throughput, query counts and memory for every
+djangoapp API route.
+
+Usage (from the server directory):
+    python benchmarks/http_bench.py [--dealers 5000] [--reviews 200000]
+        [--mode client|gunicorn|both] [--output baseline.json]
+    python benchmarks/http_bench.py --compare baseline.json current.json
+
+A throwaway SQLite database is migrated and filled by
+``populate_data --makes/--dealers/--reviews/--seed``. Each route is then
+driven in-process through the Django test client, which also counts SQL
+queries per request, and over real HTTP against a local gunicorn. Both
+clients log in as a benchmark user first, since analyze_review needs an
+authenticated session. Latency percentiles, throughput, error counts and
+peak RSS are written to a JSON file; a run in which any route answered
+with errors exits with status 1. ``--compare`` flags routes that got
+slower, lost throughput, issue more queries than a baseline or returned
+errors. The configured db.sqlite3 is never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_USER = 'http-bench'
+BENCH_PASSWORD = 'http-bench-password'
+
+ROUTES = [
+    'get_cars',
+    'get_dealers',
+    'get_dealers_by_state',
+    'dealer_details',
+    'dealer_reviews',
+    'add_review',
+    'analyze_review',
+]
+REVIEW_TEXTS = [
+    'Great service and a fair price, highly recommend.',
+    'Waited two hours and the paperwork was wrong. Poor experience.',
+    'Bought a sedan here last spring.',
+]
+# Compared against the baseline by --compare
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(timings, elapsed):
+    timings = sorted(timings)
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'throughput_rps': round(len(timings) / elapsed, 1) if elapsed else None,
+    }
+
+
+class RequestFactory:
+    """Picks the method, path and body for the next request to each route"""
+
+    def __init__(self, rng, dealer_ids, states):
+        from django.urls import reverse
+
+        self.rng = rng
+        self.dealer_ids = dealer_ids
+        self.states = states
+        self.reverse = reverse
+
+    def __call__(self, route):
+        rng = self.rng
+        if route == 'get_dealers_by_state':
+            return 'GET', self.reverse('djangoapp:' + route, args=[rng.choice(self.states)]), None
+        if route in ('dealer_details', 'dealer_reviews'):
+            return 'GET', self.reverse('djangoapp:' + route, args=[rng.choice(self.dealer_ids)]), None
+        if route == 'add_review':
+            return 'POST', self.reverse('djangoapp:' + route), {
+                'name': 'Benchmark',
+                'dealership': rng.choice(self.dealer_ids),
+                'review': rng.choice(REVIEW_TEXTS),
+                'purchase': False,
+            }
+        if route == 'analyze_review':
+            return 'POST', self.reverse('djangoapp:' + route), {'review': rng.choice(REVIEW_TEXTS)}
+        return 'GET', self.reverse('djangoapp:' + route), None
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process (ru_maxrss is bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _report_line(mode, route, result):
+    line = (f"  {mode:<8} {route:<22} p50 {result['p50_ms']:8.2f} ms  "
+            f"p95 {result['p95_ms']:8.2f} ms  {result['throughput_rps']:8.1f} req/s")
+    if 'queries_mean' in result:
+        line += f"  {result['queries_mean']:5.1f} queries"
+    if result['errors']:
+        line += f"  {result['errors']} ERRORS"
+    return line
+
+
+def bench_client(routes, factory, requests_per_route, warmup, user):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    client.force_login(user)
+    results = {}
+    for route in routes:
+        def send():
+            method, path, body = factory(route)
+            if method == 'POST':
+                return client.post(path, json.dumps(body), content_type='application/json')
+            return client.get(path)
+
+        for _ in range(warmup):
+            send()
+        timings = []
+        queries = []
+        errors = 0
+        started = time.perf_counter()
+        for _ in range(requests_per_route):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                response = send()
+                timings.append((time.perf_counter() - request_started) * 1000)
+            queries.append(len(captured))
+            errors += response.status_code >= 400
+        elapsed = time.perf_counter() - started
+        results[route] = {
+            **summarize(timings, elapsed),
+            'errors': errors,
+            'queries_mean': round(statistics.fmean(queries), 2),
+            'queries_max': max(queries),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        print(_report_line('client', route, results[route]))
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid):
+    pids = [pid]
+    for child_pid in pids:
+        try:
+            with open(f'/proc/{child_pid}/task/{child_pid}/children') as handle:
+                pids.extend(int(child) for child in handle.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def _tree_peak_rss_kb(pid):
+    """Sum of VmHWM over a process and its children; None where /proc is missing"""
+    total = 0
+    for tree_pid in _process_tree(pid):
+        try:
+            with open(f'/proc/{tree_pid}/status') as handle:
+                for line in handle:
+                    if line.startswith('VmHWM:'):
+                        total += int(line.split()[1])
+        except OSError:
+            continue
+    return total or None
+
+
+def _wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'gunicorn did not listen on port {port} within {timeout}s')
+
+
+def bench_gunicorn(routes, factory, requests_per_route, warmup, workers, concurrency):
+    import requests
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'djangoproj.wsgi',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning'],
+        cwd=SERVER_DIR,
+        env=os.environ.copy(),
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    local = threading.local()
+    factory_lock = threading.Lock()
+
+    def login():
+        session = requests.Session()
+        response = session.post(
+            base_url + '/djangoapp/login/',
+            json={'userName': BENCH_USER, 'password': BENCH_PASSWORD}, timeout=60
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f'Benchmark login failed with HTTP {response.status_code}')
+        # Session-authenticated POSTs need the token login() rotated in
+        session.headers['X-CSRFToken'] = session.cookies['csrftoken']
+        return session
+
+    def send(route):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = login()
+        with factory_lock:
+            method, path, body = factory(route)
+        started = time.perf_counter()
+        response = session.request(method, base_url + path, json=body, timeout=60)
+        return (time.perf_counter() - started) * 1000, response.status_code
+
+    results = {}
+    try:
+        _wait_for(port, process)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for route in routes:
+                list(pool.map(send, [route] * warmup))
+                started = time.perf_counter()
+                outcomes = list(pool.map(send, [route] * requests_per_route))
+                elapsed = time.perf_counter() - started
+                results[route] = {
+                    **summarize([timing for timing, _ in outcomes], elapsed),
+                    'errors': sum(status >= 400 for _, status in outcomes),
+                    'peak_rss_kb': _tree_peak_rss_kb(process.pid),
+                }
+                print(_report_line('gunicorn', route, results[route]))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    """Seed, benchmark and write the report; returns the routes that had errors"""
+    workdir = tempfile.mkdtemp(prefix='http-bench-')
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.sqlite3')
+    os.environ.setdefault('DEBUG', 'False')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+    if args.analyzer_url:
+        os.environ['SENTIMENT_ANALYZER_URL'] = args.analyzer_url
+    sys.path.insert(0, SERVER_DIR)
+
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+
+    from djangoapp.models import CarDealer
+
+    try:
+        call_command('migrate', verbosity=0)
+        started = time.perf_counter()
+        call_command(
+            'populate_data', makes=args.makes, dealers=args.dealers,
+            reviews=args.reviews, seed=args.seed, verbosity=0
+        )
+        print(f'Seeded {args.makes:,} makes, {args.dealers:,} dealers and '
+              f'{args.reviews:,} reviews in {time.perf_counter() - started:.1f}s')
+
+        user = User.objects.create_user(BENCH_USER, password=BENCH_PASSWORD)
+        dealer_ids = list(CarDealer.objects.values_list('id', flat=True))
+        states = sorted(set(CarDealer.objects.values_list('st', flat=True)))
+        connection.close()
+        routes = args.routes or ROUTES
+
+        results = {}
+        if args.mode in ('client', 'both'):
+            factory = RequestFactory(random.Random(args.seed), dealer_ids, states)
+            results['client'] = bench_client(routes, factory, args.requests, args.warmup, user)
+            connection.close()
+        if args.mode in ('gunicorn', 'both'):
+            factory = RequestFactory(random.Random(args.seed), dealer_ids, states)
+            results['gunicorn'] = bench_gunicorn(
+                routes, factory, args.requests, args.warmup, args.workers, args.concurrency
+            )
+
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'platform': platform.platform(),
+                'dataset': {
+                    'makes': args.makes, 'dealers': args.dealers,
+                    'reviews': args.reviews, 'seed': args.seed,
+                },
+                'requests_per_route': args.requests,
+                'gunicorn_workers': args.workers,
+                'concurrency': args.concurrency,
+                'sentiment_analyzer_url': settings.SENTIMENT_ANALYZER_URL,
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+        print(f'\nWrote {args.output}')
+        failed = [
+            f"{mode} {route} ({result['errors']} errors)"
+            for mode, mode_results in results.items()
+            for route, result in mode_results.items() if result['errors']
+        ]
+        if failed:
+            print(f"Routes with errors: {', '.join(failed)}")
+        return failed
+    finally:
+        connection.close()
+        if args.keep:
+            print(f'Database left in {workdir}')
+        else:
+            shutil.rmtree(workdir)
+
+
+def compare(baseline_path, current_path, threshold):
+    """Print per-route changes; returns the list of regressions found"""
+    with open(baseline_path) as handle:
+        baseline = json.load(handle)
+    with open(current_path) as handle:
+        current = json.load(handle)
+    if baseline['meta'].get('dataset') != current['meta'].get('dataset'):
+        print('warning: the runs used different datasets')
+
+    regressions = []
+    for mode, routes in current['results'].items():
+        for route, now in routes.items():
+            before = baseline['results'].get(mode, {}).get(route)
+            if before is None:
+                continue
+            changes = []
+            for metric in LATENCY_METRICS:
+                if before.get(metric) and now.get(metric) is not None:
+                    change = now[metric] / before[metric] - 1
+                    changes.append(f'{metric} {change:+.0%}')
+                    if change > threshold:
+                        regressions.append(f'{mode} {route}: {metric} {before[metric]} -> {now[metric]}')
+            if before.get('throughput_rps') and now.get('throughput_rps') is not None:
+                change = now['throughput_rps'] / before['throughput_rps'] - 1
+                changes.append(f'throughput {change:+.0%}')
+                if change < -threshold:
+                    regressions.append(
+                        f"{mode} {route}: throughput {before['throughput_rps']} -> {now['throughput_rps']}"
+                    )
+            if 'queries_max' in before and now.get('queries_max', 0) > before['queries_max']:
+                regressions.append(
+                    f"{mode} {route}: queries {before['queries_max']} -> {now['queries_max']}"
+                )
+            if now.get('errors'):
+                regressions.append(f"{mode} {route}: {now['errors']} errors")
+            print(f"{mode:<8} {route:<22} {', '.join(changes)}")
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {threshold:.0%}:')
+        for regression in regressions:
+            print(f'  {regression}')
+    else:
+        print(f'\nNo regressions beyond {threshold:.0%}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every djangoapp API route')
+    parser.add_argument('--makes', type=int, default=50)
+    parser.add_argument('--dealers', type=int, default=5000)
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per route')
+    parser.add_argument('--mode', choices=['client', 'gunicorn', 'both'], default='both')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent gunicorn clients')
+    parser.add_argument('--routes', nargs='+', choices=ROUTES, help='only these routes')
+    parser.add_argument('--analyzer-url', help='sentiment analyzer to use for add_review/analyzereview')
+    parser.add_argument('--output', default='http_bench.json')
+    parser.add_argument('--keep', action='store_true', help='keep the benchmark database')
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+        help='compare two result files instead of running'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.15,
+        help='relative slowdown reported as a regression by --compare'
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    sys.exit(1 if run(args) else 0)
+
+
+if __name__ == '__main__':
+    main()
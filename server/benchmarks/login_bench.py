@@ -0,0 +1,223 @@
+"""
+Login and session throughput under each auth profile.
+
+Usage (from the server directory):
+    python benchmarks/login_bench.py [--clients 4] [--writers 2]
+        [--seconds 10] [--profiles default fast] [--requests-per-login 5]
+
+For every profile a throwaway database is migrated and seeded with
+--users accounts whose passwords are hashed by that profile's hasher.
+Client processes then log in, make --requests-per-login authenticated
+POSTs to analyzereview (each one loads the session) and log out, while
+writer processes post reviews through add_review, so logins and session
+writes compete with review writes for the SQLite lock as they do in
+production. The table shows logins and authenticated requests per
+second, login latency, review writes per second and lock errors. The
+configured db.sqlite3 and session cache are never touched.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'bench-password-1'
+
+
+def _setup_django(env):
+    os.environ.update(env)
+    sys.path.insert(0, SERVER_DIR)
+    import django
+    django.setup()
+
+
+def _base_env(workdir, profile):
+    return {
+        'DJANGO_SETTINGS_MODULE': 'djangoproj.settings',
+        'SQLITE_PATH': os.path.join(workdir, 'bench.sqlite3'),
+        'SESSION_CACHE_LOCATION': os.path.join(workdir, 'sessions'),
+        'AUTH_PROFILE': profile,
+        'DEBUG': 'False',
+        'PERF_LOG_LEVEL': 'WARNING',
+        'DJANGOAPP_LOG_LEVEL': 'ERROR',
+        'SENTIMENT_MODE': 'sync',
+        # Nothing listens here: the client falls back to 'neutral' at once
+        'SENTIMENT_ANALYZER_URL': 'http://127.0.0.1:9',
+    }
+
+
+def seed(env, users, dealers):
+    _setup_django(env)
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('populate_data', dealers=dealers, reviews=1000, makes=5, seed=1, verbosity=0)
+    # One hash for every account keeps seeding fast; logins still verify it
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f'bench{n}', password=password) for n in range(users)
+    )
+
+
+def _is_locked(message):
+    return 'locked' in message or 'busy' in message
+
+
+def _wait_for_start(ready, go, deadline):
+    # Start only once every process has imported Django
+    ready.put(os.getpid())
+    go.wait()
+    return deadline.value
+
+
+def client(env, ready, go, deadline, args, seed_value, results):
+    _setup_django(env)
+    import random
+    from django.test import Client
+
+    rng = random.Random(seed_value)
+    http = Client()
+    deadline = _wait_for_start(ready, go, deadline)
+    counts = {'logins': 0, 'requests': 0, 'locked': 0, 'errors': 0, 'latencies': []}
+    while time.time() < deadline:
+        try:
+            started = time.perf_counter()
+            response = http.post(
+                '/djangoapp/login/',
+                json.dumps({'userName': f'bench{rng.randrange(args.users)}',
+                            'password': PASSWORD}),
+                content_type='application/json'
+            )
+            if response.status_code != 200:
+                counts['locked' if _is_locked(response.content.decode()) else 'errors'] += 1
+                continue
+            counts['logins'] += 1
+            counts['latencies'].append((time.perf_counter() - started) * 1000)
+            for _ in range(args.requests_per_login):
+                response = http.post(
+                    '/djangoapp/analyzereview/', {'review': 'Great service'},
+                    content_type='application/json'
+                )
+                if response.status_code == 200:
+                    counts['requests'] += 1
+                else:
+                    counts['locked' if _is_locked(response.content.decode()) else 'errors'] += 1
+            http.post('/djangoapp/logout/')
+        except Exception as e:
+            counts['locked' if _is_locked(str(e)) else 'errors'] += 1
+    results.put(('client', counts))
+
+
+def writer(env, ready, go, deadline, args, seed_value, results):
+    _setup_django(env)
+    import random
+    from django.test import Client
+
+    rng = random.Random(seed_value)
+    http = Client()
+    deadline = _wait_for_start(ready, go, deadline)
+    counts = {'writes': 0, 'locked': 0, 'errors': 0}
+    while time.time() < deadline:
+        try:
+            response = http.post(
+                '/djangoapp/add_review/',
+                json.dumps({'name': 'Bench', 'dealership': rng.randint(1, args.dealers),
+                            'review': 'Great service', 'purchase': False}),
+                content_type='application/json'
+            )
+            if response.status_code == 200:
+                counts['writes'] += 1
+            else:
+                counts['locked' if _is_locked(response.content.decode()) else 'errors'] += 1
+        except Exception as e:
+            counts['locked' if _is_locked(str(e)) else 'errors'] += 1
+    results.put(('writer', counts))
+
+
+def run_profile(context, profile, args):
+    workdir = tempfile.mkdtemp(prefix='login-bench-')
+    env = _base_env(workdir, profile)
+    try:
+        setup = context.Process(target=seed, args=(env, args.users, args.dealers))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            raise RuntimeError(f'Seeding the {profile} database failed')
+
+        results = context.Queue()
+        ready = context.Queue()
+        go = context.Event()
+        deadline = context.Value('d', 0.0)
+        shared = (env, ready, go, deadline, args)
+        processes = [
+            context.Process(target=client, args=(*shared, n, results))
+            for n in range(args.clients)
+        ] + [
+            context.Process(target=writer, args=(*shared, 1000 + n, results))
+            for n in range(args.writers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+        deadline.value = time.time() + args.seconds
+        go.set()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(workdir)
+
+    clients = [counts for kind, counts in collected if kind == 'client']
+    writers = [counts for kind, counts in collected if kind == 'writer']
+    latencies = sorted(latency for counts in clients for latency in counts['latencies'])
+    return {
+        'logins_per_second': round(sum(c['logins'] for c in clients) / args.seconds, 1),
+        'requests_per_second': round(sum(c['requests'] for c in clients) / args.seconds, 1),
+        'login_p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'login_p95_ms': round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+        'writes_per_second': round(sum(c['writes'] for c in writers) / args.seconds, 1),
+        'locked_errors': sum(c['locked'] for c in clients + writers),
+        'other_errors': sum(c['errors'] for c in clients + writers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark logins and sessions per auth profile')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--dealers', type=int, default=100)
+    parser.add_argument('--requests-per-login', type=int, default=5)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'fast'])
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for profile in args.profiles:
+        print(f'Running {profile} ({args.clients} clients, {args.writers} writers, '
+              f'{args.seconds:g}s)...')
+        results[profile] = run_profile(context, profile, args)
+
+    print(f"\n{'profile':<10}{'logins/s':>10}{'authed/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'writes/s':>10}{'locked':>8}{'errors':>8}")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['logins_per_second']:>10}{result['requests_per_second']:>10}"
+              f"{result['login_p50_ms']!s:>9}{result['login_p95_ms']!s:>9}"
+              f"{result['writes_per_second']:>10}{result['locked_errors']:>8}"
+              f"{result['other_errors']:>8}")
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({'args': vars(args), 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
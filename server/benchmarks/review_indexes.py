@@ -0,0 +1,140 @@
+"""
+Query plans and latency of the dealer/review lookups before and after
+migration 0002 (dealership/sentiment and CarDealer.st indexes).
+
+Usage (from the server directory):
+    python benchmarks/review_indexes.py [--reviews 1000000] [--dealers 5000]
+
+The benchmark builds a throwaway SQLite database with Django's own
+migrations, so the schema and indexes are exactly the ones the project
+ships. Nothing touches the configured db.sqlite3.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERIES = [
+    (
+        'reviews for a dealer',
+        'SELECT id, name, review, sentiment FROM djangoapp_dealerreview WHERE dealership = %s',
+        'dealer',
+    ),
+    (
+        'positive reviews for a dealer',
+        'SELECT COUNT(*) FROM djangoapp_dealerreview WHERE dealership = %s AND sentiment = %s',
+        'dealer_sentiment',
+    ),
+    (
+        'dealers in a state',
+        'SELECT id, full_name FROM djangoapp_cardealer WHERE st = %s',
+        'state',
+    ),
+]
+STATES = ['AL', 'AZ', 'CA', 'CO', 'FL', 'GA', 'IL', 'KS', 'MA', 'MI', 'NC', 'NJ',
+          'NV', 'NY', 'OH', 'OR', 'PA', 'TN', 'TX', 'UT', 'VA', 'WA', 'WI']
+SENTIMENTS = ['positive', 'negative', 'neutral']
+INSERT_BATCH = 50000
+
+
+def load(cursor, dealers, reviews, rng):
+    cursor.executemany(
+        'INSERT INTO djangoapp_cardealer (id, city, state, st, address, zip, lat, long, '
+        'short_name, full_name) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)',
+        [
+            (i, 'City', 'State', rng.choice(STATES), 'Address', '00000',
+             rng.uniform(25, 49), rng.uniform(-124, -67), f'D{i}', f'Dealer {i}')
+            for i in range(1, dealers + 1)
+        ]
+    )
+    for start in range(0, reviews, INSERT_BATCH):
+        cursor.executemany(
+            'INSERT INTO djangoapp_dealerreview (name, dealership, review, purchase, '
+            'sentiment) VALUES (%s, %s, %s, %s, %s)',
+            [
+                ('Reviewer', rng.randint(1, dealers), 'Synthetic review text', False,
+                 rng.choice(SENTIMENTS))
+                for _ in range(min(INSERT_BATCH, reviews - start))
+            ]
+        )
+
+
+def measure(cursor, dealers, repeats, rng):
+    params = {
+        'dealer': lambda: (rng.randint(1, dealers),),
+        'dealer_sentiment': lambda: (rng.randint(1, dealers), rng.choice(SENTIMENTS)),
+        'state': lambda: (rng.choice(STATES),),
+    }
+    results = {}
+    for name, sql, kind in QUERIES:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params[kind]())
+        plan = '; '.join(row[-1] for row in cursor.fetchall())
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            cursor.execute(sql, params[kind]())
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (plan, statistics.median(timings), max(timings))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the review/dealer indexes')
+    parser.add_argument('--reviews', type=int, default=1000000)
+    parser.add_argument('--dealers', type=int, default=5000)
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help='keep the benchmark database')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='review-index-bench-')
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.sqlite3')
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+    sys.path.insert(0, SERVER_DIR)
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    rng = random.Random(args.seed)
+    call_command('migrate', 'djangoapp', '0001', verbosity=0)
+    started = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        load(cursor, args.dealers, args.reviews, rng)
+    print(f'Loaded {args.dealers:,} dealers and {args.reviews:,} reviews '
+          f'in {time.perf_counter() - started:.1f}s')
+
+    with connection.cursor() as cursor:
+        before = measure(cursor, args.dealers, args.repeats, rng)
+
+    started = time.perf_counter()
+    call_command('migrate', 'djangoapp', '0002', verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    print(f'Applied 0002 (indexes + dealer backfill) in {time.perf_counter() - started:.1f}s')
+
+    with connection.cursor() as cursor:
+        after = measure(cursor, args.dealers, args.repeats, rng)
+
+    for name, _, _ in QUERIES:
+        print(f'\n{name}')
+        for label, results in (('before', before), ('after', after)):
+            plan, median, worst = results[name]
+            print(f'  {label:<7} median {median:9.3f} ms  max {worst:9.3f} ms  plan: {plan}')
+    connection.close()
+    if args.keep:
+        print(f'\nDatabase left in {workdir}')
+    else:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
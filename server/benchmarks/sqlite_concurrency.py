@@ -0,0 +1,219 @@
+"""
+Concurrent write throughput and lock errors under each SQLite profile.
+
+Usage (from the server directory):
+    python benchmarks/sqlite_concurrency.py [--writers 8] [--readers 4]
+        [--seconds 10] [--profiles default wal] [--read-only-routing]
+
+For every profile a throwaway database is migrated and seeded, then
+writer processes post reviews through add_review and import small
+batches through the bulk importer (one atomic block each), while reader
+processes page through dealer reviews with the view cache disabled.
+Every process opens its own connections, as gunicorn workers do. The
+table shows completed writes and reads per second, write latency and how
+many writes failed with "database is locked". The configured
+db.sqlite3 is never touched.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BATCH = 20
+
+
+def _setup_django(env):
+    os.environ.update(env)
+    sys.path.insert(0, SERVER_DIR)
+    import django
+    django.setup()
+
+
+def _base_env(path, profile, routing):
+    return {
+        'DJANGO_SETTINGS_MODULE': 'djangoproj.settings',
+        'SQLITE_PATH': path,
+        'SQLITE_PROFILE': profile,
+        'SQLITE_READ_ONLY_ROUTING': 'True' if routing else 'False',
+        'DEBUG': 'False',
+        'PERF_LOG_LEVEL': 'WARNING',
+        'DJANGOAPP_LOG_LEVEL': 'ERROR',
+        'VIEW_CACHE_TIMEOUT': '0',
+        'SENTIMENT_MODE': 'sync',
+        # Nothing listens here: the client falls back to 'neutral' at once
+        'SENTIMENT_ANALYZER_URL': 'http://127.0.0.1:9',
+    }
+
+
+def seed(env, dealers, reviews):
+    _setup_django(env)
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('populate_data', dealers=dealers, reviews=reviews, makes=5, seed=1,
+                 verbosity=0)
+
+
+def _is_locked(message):
+    return 'locked' in message or 'busy' in message
+
+
+def _wait_for_start(ready, go, deadline):
+    # Start only once every process has imported Django
+    ready.put(os.getpid())
+    go.wait()
+    return deadline.value
+
+
+def writer(env, ready, go, deadline, dealers, seed_value, results):
+    _setup_django(env)
+    import random
+    from django.test import Client
+    from djangoapp.review_import import import_reviews
+
+    rng = random.Random(seed_value)
+    client = Client()
+    deadline = _wait_for_start(ready, go, deadline)
+    counts = {'writes': 0, 'locked': 0, 'errors': 0, 'latencies': []}
+    turn = 0
+    while time.time() < deadline:
+        turn += 1
+        started = time.perf_counter()
+        try:
+            if turn % 2:
+                response = client.post(
+                    '/djangoapp/add_review/',
+                    json.dumps({'name': 'Bench', 'dealership': rng.randint(1, dealers),
+                                'review': 'Great service', 'purchase': False}),
+                    content_type='application/json'
+                )
+                error = response.json().get('error') if response.status_code != 200 else None
+                written = 0 if error else 1
+            else:
+                rows = [
+                    (n, {'name': 'Bench', 'dealership': rng.randint(1, dealers),
+                         'review': 'Bulk review', 'sentiment': 'positive'})
+                    for n in range(IMPORT_BATCH)
+                ]
+                report = import_reviews(rows, batch_size=IMPORT_BATCH, score=False)
+                error = report.errors[0]['error'] if report.errors else None
+                written = report.imported
+        except Exception as e:
+            error, written = str(e), 0
+        elapsed = (time.perf_counter() - started) * 1000
+        if error:
+            counts['locked' if _is_locked(error) else 'errors'] += 1
+        else:
+            counts['writes'] += written
+            counts['latencies'].append(elapsed)
+    results.put(('writer', counts))
+
+
+def reader(env, ready, go, deadline, dealers, seed_value, results):
+    _setup_django(env)
+    import random
+    from django.test import Client
+
+    rng = random.Random(seed_value)
+    client = Client()
+    deadline = _wait_for_start(ready, go, deadline)
+    counts = {'reads': 0, 'locked': 0, 'errors': 0}
+    while time.time() < deadline:
+        try:
+            response = client.get(f'/djangoapp/reviews/dealer/{rng.randint(1, dealers)}/?limit=50')
+            if response.status_code == 200:
+                counts['reads'] += 1
+            elif _is_locked(response.content.decode()):
+                counts['locked'] += 1
+            else:
+                counts['errors'] += 1
+        except Exception as e:
+            counts['locked' if _is_locked(str(e)) else 'errors'] += 1
+    results.put(('reader', counts))
+
+
+def run_profile(context, profile, args):
+    workdir = tempfile.mkdtemp(prefix='sqlite-concurrency-')
+    env = _base_env(os.path.join(workdir, 'bench.sqlite3'), profile, args.read_only_routing)
+    try:
+        setup = context.Process(target=seed, args=(env, args.dealers, args.reviews))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            raise RuntimeError(f'Seeding the {profile} database failed')
+
+        results = context.Queue()
+        ready = context.Queue()
+        go = context.Event()
+        deadline = context.Value('d', 0.0)
+        shared = (env, ready, go, deadline, args.dealers)
+        processes = [
+            context.Process(target=writer, args=(*shared, n, results))
+            for n in range(args.writers)
+        ] + [
+            context.Process(target=reader, args=(*shared, 1000 + n, results))
+            for n in range(args.readers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+        deadline.value = time.time() + args.seconds
+        go.set()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        shutil.rmtree(workdir)
+
+    writers = [counts for kind, counts in collected if kind == 'writer']
+    readers = [counts for kind, counts in collected if kind == 'reader']
+    latencies = sorted(latency for counts in writers for latency in counts['latencies'])
+    return {
+        'writes_per_second': round(sum(c['writes'] for c in writers) / args.seconds, 1),
+        'reads_per_second': round(sum(c['reads'] for c in readers) / args.seconds, 1),
+        'write_p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'write_p95_ms': round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+        'locked_errors': sum(c['locked'] for c in writers + readers),
+        'other_errors': sum(c['errors'] for c in writers + readers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent SQLite writes per profile')
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--dealers', type=int, default=500)
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--profiles', nargs='+', default=['default', 'wal'])
+    parser.add_argument('--read-only-routing', action='store_true',
+                        help='send reads through the read-only connection')
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for profile in args.profiles:
+        print(f'Running {profile} ({args.writers} writers, {args.readers} readers, '
+              f'{args.seconds:g}s)...')
+        results[profile] = run_profile(context, profile, args)
+
+    print(f"\n{'profile':<10}{'writes/s':>10}{'reads/s':>10}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'locked':>8}{'errors':>8}")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['writes_per_second']:>10}{result['reads_per_second']:>10}"
+              f"{result['write_p50_ms']!s:>9}{result['write_p95_ms']!s:>9}"
+              f"{result['locked_errors']:>8}{result['other_errors']:>8}")
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({'args': vars(args), 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import CarMake, CarModel, CarDealer, DealerReview
+from .models import CarMake, CarModel, CarDealer, DealerReview, DealerReviewStats
+from .search import matching_ids
 
 
 @admin.register(CarMake)
@@ -26,4 +27,18 @@ class CarDealerAdmin(admin.ModelAdmin):
 class DealerReviewAdmin(admin.ModelAdmin):
     list_display = ['name', 'dealership', 'sentiment', 'purchase']
     list_filter = ['sentiment', 'purchase']
-    search_fields = ['name', 'review']
\ No newline at end of file
+    search_fields = ['name', 'review']
+
+    def get_search_results(self, request, queryset, search_term):
+        # Search name and review text through the full-text index instead
+        # of LIKE scans; search_fields only turns the search box on
+        ids = matching_ids(search_term)
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(id__in=ids), False
+
+
+@admin.register(DealerReviewStats)
+class DealerReviewStatsAdmin(admin.ModelAdmin):
+    list_display = ['dealer', 'review_count', 'positive_count', 'negative_count', 'neutral_count']
+    search_fields = ['dealer__full_name']
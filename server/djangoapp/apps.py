@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class DjangoappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'djangoapp'
\ No newline at end of file
+    name = 'djangoapp'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
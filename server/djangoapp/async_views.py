@@ -0,0 +1,165 @@
+"""
+Async variants of the I/O-bound API views, for ASGI deployments.
+
+With ASYNC_VIEWS on (the default when SERVER_MODE=asgi) djangoapp.urls
+routes get_dealerships, get_dealer_reviews, add_review and
+sentiment_analyzer here. They parse requests with the same helpers as
+the sync views in views.py and return the same bodies, but query through
+the async ORM and call the sentiment analyzer with the httpx client, so
+a request waiting on the analyzer or the database does not hold a worker
+thread and one process can keep hundreds of requests in flight.
+
+DRF's api_view only wraps sync views, so these check methods, parse
+bodies and apply the IsAuthenticatedOrReadOnly policy themselves. Under
+WSGI they still work, one event loop per request, which is slower than
+the sync views.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from .caching import adependent_key, aget_or_build
+from .conditional import add_stamp, astamp, not_modified, stamp_key
+from .models import DealerReview
+from .sentiment_client import get_client
+from .sentiment_queue import PENDING_SENTIMENT, get_worker
+from .views import (
+    STREAM_CHUNK_SIZE, _dealer_list_query, _dealer_reviews_query, _page, _page_rows,
+    _review_fields
+)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt returns a sync wrapper
+    # before Django 5.0, which would hide the coroutine from the handler
+    view.csrf_exempt = True
+    return view
+
+
+def _ndjson_response(query):
+    """Stream a ListQuery's rows as NDJSON, fetching them chunk by chunk"""
+    async def lines():
+        async for row in query.rows.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield json.dumps(query.present(row), cls=DjangoJSONEncoder) + '\n'
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
+async def _list_response(request, query):
+    response_stamp = await astamp(query.label, query.sources, query.stream, *query.key_parts)
+    response = not_modified(request, response_stamp)
+    if response is not None:
+        return response
+    if query.stream:
+        return add_stamp(_ndjson_response(query), response_stamp)
+
+    async def serialize():
+        rows = [row async for row in _page_rows(query)]
+        return json.dumps(_page(query, rows), cls=DjangoJSONEncoder).encode()
+
+    timeout = settings.VIEW_CACHE_TIMEOUT
+    if timeout:
+        key = await adependent_key(
+            query.label, query.versions, *query.key_parts, stamp_key(response_stamp)
+        )
+        body = await aget_or_build(key, serialize, timeout)
+    else:
+        body = await serialize()
+    return add_stamp(HttpResponse(body, content_type='application/json'), response_stamp)
+
+
+async def _is_authenticated(request):
+    # Resolving request.user reads the session from the database
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def _request_data(request):
+    """JSON or form request body as a dict-like; raises ValueError"""
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object')
+        return data
+    return request.POST
+
+
+async def get_dealerships(request, state=None):
+    """Get dealerships, optionally filtered by state (see views.get_dealerships)"""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    try:
+        query = _dealer_list_query(request, state)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return await _list_response(request, query)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+async def get_dealer_reviews(request, dealer_id):
+    """Get reviews for a specific dealer (see views.get_dealer_reviews)"""
+    if request.method not in SAFE_METHODS:
+        return HttpResponseNotAllowed(SAFE_METHODS)
+    try:
+        query = _dealer_reviews_query(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return await _list_response(request, query)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+async def add_review(request):
+    """Add a new review"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body)
+
+        if settings.SENTIMENT_MODE == 'deferred':
+            sentiment = PENDING_SENTIMENT
+        else:
+            sentiment = await get_client().aanalyze(data.get('review', ''))
+
+        # Saved in autocommit mode, so the row is committed once acreate returns
+        review = await DealerReview.objects.acreate(**_review_fields(data), sentiment=sentiment)
+        if sentiment == PENDING_SENTIMENT:
+            get_worker().enqueue(review.id)
+
+        return JsonResponse({
+            "status": 200,
+            "message": "Review added successfully",
+            "review_id": review.id
+        })
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+async def sentiment_analyzer(request):
+    """Direct sentiment analysis endpoint; needs a logged-in user, like the DRF view"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if not await _is_authenticated(request):
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=403)
+    try:
+        data = _request_data(request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    try:
+        review_text = data.get('review', '')
+        sentiment = await get_client().aanalyze(review_text)
+        return JsonResponse({
+            "sentiment": sentiment,
+            "review": review_text
+        })
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
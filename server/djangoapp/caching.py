@@ -0,0 +1,188 @@
+"""
+Versioned cache keys shared by the djangoapp read endpoints.
+
+A cached response is stored under the current version of every resource
+it was built from, so invalidation is a version bump rather than a key
+scan: 'dealers' for dealer rows, 'review_stats' for any review count,
+and 'reviews' plus 'reviews:<dealer id>' for one dealer's reviews.
+Versions live in the default cache, so with a shared backend (file or
+Redis, see CACHES in settings) one bump invalidates every worker.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+import zlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY_PREFIX = 'djangoapp:version:'
+REVIEWS_VERSION_NAME = 'reviews'
+REVIEW_STATS_VERSION_NAME = 'review_stats'
+
+# A cold key is built by one thread per process (striped locks) and one
+# process per cache (an add()-based lock); everyone else waits for it.
+BUILD_LOCK_TIMEOUT = 30
+BUILD_WAIT = 5.0
+BUILD_POLL_INTERVAL = 0.02
+_build_locks = [threading.Lock() for _ in range(64)]
+
+
+def _initial_version():
+    # Seeded from the clock so a version key that was evicted never comes
+    # back with a number that older cached entries were stored under.
+    return int(time.time() * 1000)
+
+
+def get_version(name):
+    """Return the current version number for a cached resource"""
+    key = VERSION_KEY_PREFIX + name
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def get_versions(names):
+    """Current versions of several resources with one cache round trip"""
+    found = cache.get_many([VERSION_KEY_PREFIX + name for name in names])
+    return [
+        found.get(VERSION_KEY_PREFIX + name) or get_version(name)
+        for name in names
+    ]
+
+
+async def aget_version(name):
+    """Async variant of ``get_version``"""
+    key = VERSION_KEY_PREFIX + name
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _initial_version(), None)
+        version = await cache.aget(key, _initial_version())
+    return version
+
+
+async def aget_versions(names):
+    """Async variant of ``get_versions``"""
+    found = await cache.aget_many([VERSION_KEY_PREFIX + name for name in names])
+    return [
+        found.get(VERSION_KEY_PREFIX + name) or await aget_version(name)
+        for name in names
+    ]
+
+
+def bump_version(name):
+    """Invalidate every cache entry stored under the current version"""
+    key = VERSION_KEY_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_version(), None)
+
+
+def versioned_key(name, *parts):
+    """Build a cache key tied to the current version of ``name``"""
+    return ':'.join(['djangoapp', name, str(get_version(name))] + [str(p) for p in parts])
+
+
+def dependent_key(label, names, *parts):
+    """
+    Build a cache key tied to the current versions of every resource in
+    ``names``; ``parts`` (request arguments) are hashed to keep keys short
+    and safe for every backend
+    """
+    return _dependent_key(label, get_versions(names), parts)
+
+
+async def adependent_key(label, names, *parts):
+    """Async variant of ``dependent_key``"""
+    return _dependent_key(label, await aget_versions(names), parts)
+
+
+def _dependent_key(label, versions, parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return ':'.join(['djangoapp', label] + [str(v) for v in versions] + [digest])
+
+
+def review_version_names(dealer_id):
+    """Versions a cached list of ``dealer_id``'s reviews depends on"""
+    return [REVIEWS_VERSION_NAME, f'{REVIEWS_VERSION_NAME}:{dealer_id}']
+
+
+def invalidate_reviews(dealer_ids=None):
+    """
+    Drop cached reviews and review stats for ``dealer_ids`` (every dealer
+    when None) once the current transaction commits
+    """
+    if dealer_ids is not None:
+        dealer_ids = {dealer_id for dealer_id in dealer_ids if dealer_id is not None}
+
+    def bump():
+        if dealer_ids is None:
+            bump_version(REVIEWS_VERSION_NAME)
+        else:
+            for dealer_id in dealer_ids:
+                bump_version(f'{REVIEWS_VERSION_NAME}:{dealer_id}')
+        bump_version(REVIEW_STATS_VERSION_NAME)
+
+    transaction.on_commit(bump)
+
+
+def get_or_build(key, build, timeout):
+    """
+    Return the cached value for ``key``, calling ``build`` to fill it on a
+    miss; concurrent misses for the same key wait for a single build
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _build_locks[zlib.crc32(key.encode()) % len(_build_locks)]:
+        value = cache.get(key)
+        if value is not None:
+            return value
+        lock_key = key + ':building'
+        if not cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT):
+            # Another process holds the build; wait for its result
+            deadline = time.monotonic() + BUILD_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(BUILD_POLL_INTERVAL)
+                value = cache.get(key)
+                if value is not None:
+                    return value
+            return build()
+        try:
+            value = build()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+
+
+async def aget_or_build(key, build, timeout):
+    """
+    Async variant of ``get_or_build``; ``build`` is a coroutine function.
+    Concurrent misses share the add()-based lock, which also covers other
+    requests on the same event loop.
+    """
+    value = await cache.aget(key)
+    if value is not None:
+        return value
+
+    lock_key = key + ':building'
+    if not await cache.aadd(lock_key, 1, BUILD_LOCK_TIMEOUT):
+        deadline = time.monotonic() + BUILD_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(BUILD_POLL_INTERVAL)
+            value = await cache.aget(key)
+            if value is not None:
+                return value
+        return await build()
+    try:
+        value = await build()
+        await cache.aset(key, value, timeout)
+    finally:
+        await cache.adelete(lock_key)
+    return value
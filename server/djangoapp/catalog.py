@@ -0,0 +1,184 @@
+"""In-process facet index over the CarModel catalog.
+
+Every car model gets a bit position (in id order) and every make, type
+and year a bitmap, stored as a Python int, of the models that have it.
+A filter combination is the AND of the OR of each facet's selected
+bitmaps, and the counts for one facet are the popcounts of its bitmaps
+ANDed with the filters on the other facets. That is the usual
+"disjunctive" faceting, so picking a make still shows how many models
+every other make has. Answering a query never scans CarModel rows or
+runs a GROUP BY.
+
+Before a query the index compares the 'catalog' cache version, which
+the CarMake and CarModel signals bump, with the one it was built under.
+Only when that moved, or STAMP_CHECK_INTERVAL seconds have passed, does
+it read the database stamp (newest updated_at of CarModel and CarMake
+and of their delete tombstones) and rebuild if the stamp moved. The
+periodic check catches bulk writes that send no signals and other
+workers' writes under a per-process cache.
+"""
+import threading
+import time
+
+from .caching import get_version
+from .conditional import deletes, row_stamp
+from .models import CarMake, CarModel
+
+FACETS = ('make', 'type', 'year')
+# Longest a write that bumped no visible 'catalog' version goes unseen
+STAMP_CHECK_INTERVAL = 5.0
+
+
+def catalog_sources():
+    """The querysets whose stamps say when the catalog last changed"""
+    return [
+        CarModel.objects.all(), CarMake.objects.all(),
+        deletes('car_models'), deletes('car_makes'),
+    ]
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+class FacetFilter:
+    """Selected values per facet; an empty or missing facet matches everything"""
+
+    def __init__(self, makes=None, types=None, year_min=None, year_max=None):
+        self.makes = makes or []
+        self.types = types or []
+        self.year_min = year_min
+        self.year_max = year_max
+
+
+class CatalogIndex:
+    """Bitmaps of CarModel positions per make, type and year"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._version = None
+        self._checked = 0.0
+        self._all = 0           # every position set
+        self._makes = {}        # make id -> bitmap
+        self._make_names = {}   # make id -> name
+        self._make_ids = {}     # lower-cased make name -> [make id, ...]
+        self._types = {}        # type -> bitmap
+        self._years = {}        # year -> bitmap
+
+    def rebuild(self):
+        """Reload the whole catalog from the database"""
+        with self._lock:
+            version = get_version('catalog')
+            stamp = self._current_stamp()
+            count = 0
+            makes, types, years = {}, {}, {}
+            rows = CarModel.objects.order_by('id').values_list('id', 'car_make_id', 'type', 'year')
+            for position, (_, make_id, car_type, year) in enumerate(
+                    rows.iterator(chunk_size=5000)):
+                bit = 1 << position
+                count = position + 1
+                makes[make_id] = makes.get(make_id, 0) | bit
+                types[car_type] = types.get(car_type, 0) | bit
+                years[year] = years.get(year, 0) | bit
+            make_names = dict(CarMake.objects.values_list('id', 'name'))
+            make_ids = {}
+            for make_id, name in make_names.items():
+                make_ids.setdefault(name.lower(), []).append(make_id)
+
+            self._all = (1 << count) - 1
+            self._makes, self._types, self._years = makes, types, years
+            self._make_names, self._make_ids = make_names, make_ids
+            self._stamp = stamp
+            self._version = version
+            self._checked = time.monotonic()
+
+    @staticmethod
+    def _current_stamp():
+        return row_stamp(catalog_sources())
+
+    def _ensure_current(self):
+        version = get_version('catalog')
+        now = time.monotonic()
+        if (self._stamp is not None and version == self._version
+                and now - self._checked < STAMP_CHECK_INTERVAL):
+            return
+        if self._stamp != self._current_stamp():
+            self.rebuild()
+            return
+        self._version = version
+        self._checked = now
+
+    def make_ids(self, names):
+        """Ids of the makes called any of ``names`` (case-insensitive)"""
+        with self._lock:
+            self._ensure_current()
+            return [
+                make_id for name in names
+                for make_id in self._make_ids.get(name.lower(), [])
+            ]
+
+    def _facet_bits(self, facet, selection):
+        """Bitmap of the models matching ``selection`` on one facet"""
+        if facet == 'make':
+            if not selection.makes:
+                return self._all
+            bits = 0
+            for name in selection.makes:
+                for make_id in self._make_ids.get(name.lower(), []):
+                    bits |= self._makes.get(make_id, 0)
+            return bits
+        if facet == 'type':
+            if not selection.types:
+                return self._all
+            bits = 0
+            for car_type in selection.types:
+                bits |= self._types.get(car_type, 0)
+            return bits
+        if selection.year_min is None and selection.year_max is None:
+            return self._all
+        bits = 0
+        for year, year_bits in self._years.items():
+            if selection.year_min is not None and year < selection.year_min:
+                continue
+            if selection.year_max is not None and year > selection.year_max:
+                continue
+            bits |= year_bits
+        return bits
+
+    def facets(self, selection):
+        """
+        Return (total, facet counts) for ``selection``; the counts for each
+        facet ignore that facet's own filter, and zero counts are left out
+        """
+        with self._lock:
+            self._ensure_current()
+            matched = {facet: self._facet_bits(facet, selection) for facet in FACETS}
+            total = popcount(matched['make'] & matched['type'] & matched['year'])
+
+            def others(facet):
+                bits = self._all
+                for other in FACETS:
+                    if other != facet:
+                        bits &= matched[other]
+                return bits
+
+            counts = {}
+            for facet, bitmaps in (('make', self._makes), ('type', self._types),
+                                   ('year', self._years)):
+                base = others(facet)
+                counts[facet] = {
+                    value: count for value, count in (
+                        (value, popcount(bits & base)) for value, bits in sorted(bitmaps.items())
+                    ) if count
+                }
+            # Makes are reported by name; same-named makes are merged
+            by_name = {}
+            for make_id, count in counts['make'].items():
+                name = self._make_names.get(make_id, str(make_id))
+                by_name[name] = by_name.get(name, 0) + count
+            counts['make'] = dict(sorted(by_name.items()))
+            return total, counts
+
+
+catalog_index = CatalogIndex()
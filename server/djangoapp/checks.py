@@ -0,0 +1,21 @@
+"""System checks for state the migrations cannot guarantee on their own"""
+from django.core.checks import Tags, Warning, register
+from django.db import connections
+
+from .search import missing_triggers
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """Warn when a table rebuild has dropped the review search triggers"""
+    warnings = []
+    for alias in databases or []:
+        missing = missing_triggers(connections[alias])
+        if missing:
+            warnings.append(Warning(
+                f"Review search triggers are missing from '{alias}': {', '.join(missing)}",
+                hint="New and edited reviews are not searchable until "
+                     "'python manage.py rebuild_review_search' restores them.",
+                id='djangoapp.W001',
+            ))
+    return warnings
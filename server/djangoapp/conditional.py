@@ -0,0 +1,105 @@
+"""
+Conditional GET for the dealer and review read endpoints.
+
+A response is stamped from the rows it is built from without loading
+them: one MAX(updated_at) per source queryset, which the updated_at and
+(dealership, updated_at) indexes answer from the last index entry. The
+newest updated_at moves on every insert and update; deletes leave it
+alone, so each response also takes a Tombstone source (see ``deletes``)
+whose MAX(deleted_at) moves instead. Sources are never filtered on
+columns a row can change, so a row moving out of a filtered list still
+moves its stamp. The stamp becomes a weak ETag and a Last-Modified
+header, and a matching If-None-Match or If-Modified-Since is answered
+with 304 Not Modified before anything is serialized.
+
+Unlike the cache versions in caching.py, stamps come from the database,
+so every worker process hands out the same ETag for the same data. The
+ETag is also part of the response cache key (stamp_key), so a worker
+whose per-process versions missed another worker's write can never pair
+a new ETag with an old cached body.
+"""
+import hashlib
+from collections import namedtuple
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Tombstone
+
+Stamp = namedtuple('Stamp', 'etag last_modified')
+
+
+def deletes(table, scope=None):
+    """Tombstones of ``table`` (within ``scope``), as a stamp source"""
+    tombstones = Tombstone.objects.filter(table=table)
+    if scope is not None:
+        tombstones = tombstones.filter(scope=scope)
+    return tombstones
+
+
+def _changed_at(source):
+    return 'deleted_at' if source.model is Tombstone else 'updated_at'
+
+
+def _newest(source):
+    return source.order_by().aggregate(modified=Max(_changed_at(source)))['modified']
+
+
+async def _anewest(source):
+    return (await source.order_by().aaggregate(modified=Max(_changed_at(source))))['modified']
+
+
+def _make_stamp(label, parts, sources, results):
+    live = [modified for source, modified in zip(sources, results) if source.model is not Tombstone]
+    if not any(live):
+        # Nothing to stamp; let the view build its empty or 404 response
+        return None
+    digest = hashlib.md5(repr((label, parts, results)).encode()).hexdigest()
+    return Stamp(etag=f'W/"{digest}"', last_modified=max(filter(None, results)))
+
+
+def row_stamp(sources):
+    """
+    Newest change in each of ``sources``, for in-process indexes that
+    rebuild when the rows they were loaded from change
+    """
+    return tuple(_newest(source) for source in sources)
+
+
+def stamp(label, sources, *parts):
+    """
+    Stamp for a response built from ``sources`` (querysets of models with
+    updated_at, and ``deletes`` tombstones); ``parts`` are the request
+    arguments that shape the body. Returns None when every source other
+    than the tombstones is empty.
+    """
+    return _make_stamp(label, parts, sources, [_newest(source) for source in sources])
+
+
+async def astamp(label, sources, *parts):
+    """Async variant of ``stamp``"""
+    return _make_stamp(label, parts, sources, [await _anewest(source) for source in sources])
+
+
+def stamp_key(response_stamp):
+    """Cache key part that ties a cached body to the stamp it was built under"""
+    return response_stamp.etag if response_stamp is not None else None
+
+
+def not_modified(request, response_stamp):
+    """The 304 response when the client already has this stamp, else None"""
+    if response_stamp is None:
+        return None
+    return get_conditional_response(
+        request, etag=response_stamp.etag,
+        last_modified=int(response_stamp.last_modified.timestamp()),
+    )
+
+
+def add_stamp(response, response_stamp):
+    """Set ETag and Last-Modified on a full response"""
+    if response_stamp is not None:
+        response['ETag'] = response_stamp.etag
+        response['Last-Modified'] = http_date(response_stamp.last_modified.timestamp())
+    return response
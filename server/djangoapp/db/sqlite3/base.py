@@ -0,0 +1,40 @@
+"""
+SQLite backend with a configurable performance profile.
+
+Takes two extra entries in a database's OPTIONS on top of Django's own:
+
+    'pragmas': {'journal_mode': 'WAL', 'busy_timeout': 5000, ...}
+        applied to every new connection, in order
+    'transaction_mode': 'IMMEDIATE'
+        how atomic() blocks begin. Django issues a plain (deferred) BEGIN,
+        and a deferred transaction that reads and then writes cannot wait
+        for the write lock: it fails with "database is locked" right away
+        instead of honouring busy_timeout. BEGIN IMMEDIATE takes the write
+        lock up front, so concurrent atomic writers queue instead.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop('pragmas', {})
+        transaction_mode = params.pop('transaction_mode', None)
+        if transaction_mode is not None and transaction_mode.upper() not in TRANSACTION_MODES:
+            raise ValueError(f'transaction_mode must be one of {", ".join(TRANSACTION_MODES)}')
+        self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
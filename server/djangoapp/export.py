@@ -0,0 +1,271 @@
+"""
+Streaming exports of CarDealer and DealerReview rows.
+
+Rows are read with values_list().iterator() in fixed-size chunks and
+encoded as they arrive, so memory use depends on the chunk size and never
+on the table size. Formats:
+
+    ndjson   one JSON object per line, gzipped unless asked otherwise
+    csv      header row plus one line per row, gzipped unless asked otherwise
+    parquet  one row group per chunk (needs pyarrow, which is optional)
+
+Incremental exports use updated_at as a watermark. An export covers rows
+with ``since - watermark_overlap() < updated_at <= watermark``, where the
+watermark is the newest updated_at when the export starts; passing it
+back as ``since`` next time picks up the rows written in between.
+updated_at is stamped in Python before the write commits, so a row can
+become visible after an export with a timestamp below that export's
+watermark; the overlap re-reads a window as long as the SQLite busy
+timeout (the longest a write can wait for its lock) plus a second to
+catch it. Rows in the overlap can appear in two consecutive exports, so
+consumers should upsert by ``id``.
+
+Deletes are exported from the Tombstone rows that the post_delete
+signals write: ``deleted=True`` exports ``id`` and ``deleted_at`` of the
+rows deleted since the watermark, which works the same way on
+deleted_at. Keep a separate watermark for each feed.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CarDealer, DealerReview, Tombstone
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TABLES = {
+    'dealers': CarDealer,
+    'reviews': DealerReview,
+}
+FORMATS = ('ndjson', 'csv', 'parquet')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+CHUNK_SIZE = 5000
+# Slack on top of the busy timeout for the write itself and clock skew
+WATERMARK_SLACK = timedelta(seconds=1)
+GZIP_LEVEL = 6
+
+
+def parquet_available():
+    return pyarrow is not None
+
+
+def watermark_overlap():
+    """Longest expected gap between a row's updated_at and its commit"""
+    return timedelta(milliseconds=settings.SQLITE_BUSY_TIMEOUT) + WATERMARK_SLACK
+
+
+def parse_watermark(value):
+    """Decode an ISO 8601 ``since`` watermark; naive times are taken as UTC"""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValueError("since must be an ISO 8601 date and time")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+def format_watermark(moment):
+    return moment.isoformat() if moment is not None else None
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _value(value):
+    # Full precision, so exported updated_at values compare with watermarks
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(fields, rows):
+    for chunk in rows:
+        yield ''.join(
+            json.dumps({field: _value(value) for field, value in zip(fields, row)},
+                       cls=DjangoJSONEncoder) + '\n'
+            for row in chunk
+        ).encode()
+
+
+def _csv(fields, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for chunk in rows:
+        writer.writerows([_value(value) for value in row] for row in chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Sink:
+    """Write-only file object whose contents are drained between row groups"""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_type(field):
+    if isinstance(field, models.BooleanField):
+        return pyarrow.bool_()
+    if isinstance(field, (models.AutoField, models.IntegerField, models.ForeignKey)):
+        return pyarrow.int64()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def _parquet(fields, model_fields, rows):
+    schema = pyarrow.schema([
+        (name, _arrow_type(field)) for name, field in zip(fields, model_fields)
+    ])
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+    for chunk in rows:
+        columns = list(zip(*chunk))
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=column_type)
+             for column, column_type in zip(columns, schema.types)],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class Export:
+    """One planned export: which rows, in what format, up to which watermark"""
+
+    def __init__(self, table, fmt='ndjson', since=None, compress=True, deleted=False):
+        if table not in TABLES:
+            raise ValueError(f"table must be one of {', '.join(TABLES)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if fmt == 'parquet' and not parquet_available():
+            raise ValueError("parquet exports need pyarrow installed")
+        self.table = table
+        self.format = fmt
+        self.since = since
+        self.deleted = deleted
+        # Parquet compresses its own pages
+        self.compress = compress and fmt != 'parquet'
+        if deleted:
+            self.model_fields = [Tombstone._meta.get_field(name) for name in ('row_id', 'deleted_at')]
+            self.fields = ['id', 'deleted_at']
+            self.changed_at = 'deleted_at'
+            rows = Tombstone.objects.filter(table=table)
+        else:
+            self.model_fields = TABLES[table]._meta.concrete_fields
+            self.fields = [field.attname for field in self.model_fields]
+            self.changed_at = 'updated_at'
+            rows = TABLES[table].objects.all()
+
+        if since is not None:
+            rows = rows.filter(**{f'{self.changed_at}__gt': since - watermark_overlap()})
+        # Fixed when the export starts, so rows written while it streams
+        # are left for the next one
+        self.watermark = rows.aggregate(watermark=Max(self.changed_at))['watermark']
+        self._rows = rows
+
+    @property
+    def filename(self):
+        name = f'{self.table}-deleted' if self.deleted else self.table
+        name = f'{name}.{self.format}'
+        return name + '.gz' if self.compress else name
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else CONTENT_TYPES[self.format]
+
+    @property
+    def next_since(self):
+        """Watermark to pass as ``since`` for the next incremental export"""
+        if self.watermark is None or (self.since is not None and self.since > self.watermark):
+            # Only overlap rows matched; never move the watermark back
+            return self.since
+        return self.watermark
+
+    def row_chunks(self):
+        """Matching rows as tuples, CHUNK_SIZE at a time, oldest change first"""
+        if self.watermark is None:
+            return
+        rows = (
+            self._rows
+            .filter(**{f'{self.changed_at}__lte': self.watermark})
+            .order_by(self.changed_at)
+            .values_list(*(field.attname for field in self.model_fields))
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def chunks(self):
+        """The encoded export as a stream of bytes"""
+        if self.format == 'parquet':
+            return _parquet(self.fields, self.model_fields, self.row_chunks())
+        encode = _csv if self.format == 'csv' else _ndjson
+        data = encode(self.fields, self.row_chunks())
+        return _gzip(data) if self.compress else data
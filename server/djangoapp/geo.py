@@ -0,0 +1,211 @@
+"""In-process spatial index over CarDealer coordinates.
+
+Dealers are bucketed into a fixed lat/long grid. Nearest-neighbour and
+radius queries walk rings of cells outwards from the query point and stop
+as soon as no unvisited cell can hold a closer dealer, so a query only
+touches the cells around the point instead of every dealer row.
+
+Before a query the index compares the 'dealers' cache version with the
+one it was last checked under, which costs one cache read. When the
+version moved, or STAMP_CHECK_INTERVAL seconds have passed, it reads a
+database stamp of CarDealer (newest updated_at and newest delete
+tombstone, two index lookups) and rebuilds only if that moved too. The
+periodic check picks up writes that bumped no version this process can
+see: bulk writes, or another worker's write with a per-process cache.
+Changes made in this process are applied in place and predict the new
+stamp, which avoids a rebuild unless another write happened meanwhile.
+
+The grid does not wrap across the antimeridian, which is fine for the
+dealer network it indexes.
+"""
+import math
+import threading
+import time
+
+from .caching import get_version
+from .conditional import deletes, row_stamp
+from .models import CarDealer
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_SIZE_DEG = 1.0
+# Longest a write that bumped no visible 'dealers' version goes unseen
+STAMP_CHECK_INTERVAL = 5.0
+
+
+def _stamp_sources():
+    return [CarDealer.objects.all(), deletes('dealers')]
+
+
+def _later(newest, moment):
+    if moment is None or (newest is not None and newest >= moment):
+        return newest
+    return moment
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / CELL_SIZE_DEG), math.floor(lon / CELL_SIZE_DEG))
+
+
+def _point(lat, lon):
+    lat_rad = math.radians(lat)
+    return (lat, lon, lat_rad, math.radians(lon), math.cos(lat_rad))
+
+
+def haversine_km(lat, lon, points):
+    """Great-circle distances from (lat, lon) to a batch of indexed points
+
+    ``points`` are tuples built by ``_point``; their radians and cosines are
+    precomputed, so only the query side is converted once per batch.
+    """
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    cos_lat = math.cos(lat_rad)
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS_KM
+    distances = []
+    for _, _, p_lat, p_lon, p_cos in points:
+        h = (sin((p_lat - lat_rad) / 2) ** 2
+             + cos_lat * p_cos * sin((p_lon - lon_rad) / 2) ** 2)
+        distances.append(diameter * asin(sqrt(min(1.0, h))))
+    return distances
+
+
+class DealerIndex:
+    """Grid index of dealer coordinates kept in sync with CarDealer rows"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._points = {}
+        self._cells = {}
+        self._extent = None
+        self._stamp = None
+        self._version = None
+        self._checked = 0.0
+
+    def _add(self, dealer_id, lat, lon):
+        self._extent = None
+        point = _point(lat, lon)
+        self._points[dealer_id] = point
+        self._cells.setdefault(_cell(lat, lon), {})[dealer_id] = point
+
+    def _discard(self, dealer_id):
+        point = self._points.pop(dealer_id, None)
+        if point is None:
+            return
+        self._extent = None
+        cell = _cell(point[0], point[1])
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(dealer_id, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def rebuild(self):
+        """Reload every dealer coordinate from the database"""
+        with self._lock:
+            # Taken first: a write that lands while loading triggers another rebuild
+            version = get_version('dealers')
+            stamp = row_stamp(_stamp_sources())
+            self._points = {}
+            self._cells = {}
+            self._extent = None
+            rows = CarDealer.objects.values_list('id', 'lat', 'long')
+            for dealer_id, lat, lon in rows.iterator(chunk_size=5000):
+                self._add(dealer_id, lat, lon)
+            self._stamp = stamp
+            self._version = version
+            self._checked = time.monotonic()
+
+    def _bounds(self):
+        # (min_i, max_i, min_j, max_j, max_abs_lat) of the occupied cells
+        if self._extent is None:
+            rows = [i for i, _ in self._cells]
+            cols = [j for _, j in self._cells]
+            max_abs_lat = max(max(abs(i), abs(i + 1)) for i in rows) * CELL_SIZE_DEG
+            self._extent = (min(rows), max(rows), min(cols), max(cols), max_abs_lat)
+        return self._extent
+
+    def _ensure_current(self):
+        version = get_version('dealers')
+        now = time.monotonic()
+        if (self._stamp is not None and version == self._version
+                and now - self._checked < STAMP_CHECK_INTERVAL):
+            return
+        if self._stamp != row_stamp(_stamp_sources()):
+            self.rebuild()
+            return
+        self._version = version
+        self._checked = now
+
+    def apply(self, dealer_id, lat=None, lon=None, updated_at=None, deleted_at=None):
+        """Apply one committed dealer change made in this process
+
+        ``lat``/``lon`` of None removes the dealer, whose tombstone was
+        written at ``deleted_at``. The stamp moves the way this change
+        alone moves it; if anything else changed too, the next query sees
+        a different stamp in the database and rebuilds.
+        """
+        with self._lock:
+            if self._stamp is None:
+                return
+            self._discard(dealer_id)
+            if lat is not None and lon is not None:
+                self._add(dealer_id, lat, lon)
+            modified, deleted = self._stamp
+            self._stamp = (_later(modified, updated_at), _later(deleted, deleted_at))
+
+    def nearest(self, lat, lon, k=10, radius_km=None):
+        """Return up to ``k`` (dealer_id, distance_km) pairs, closest first"""
+        with self._lock:
+            self._ensure_current()
+            if not self._cells:
+                return []
+            return self._search(lat, lon, k, radius_km)
+
+    def _search(self, lat, lon, k, radius_km):
+        cells = self._cells
+        min_i, max_i, min_j, max_j, max_abs_lat = self._bounds()
+        cos_bound = math.cos(math.radians(min(max(abs(lat), max_abs_lat), 90.0)))
+        center_i, center_j = _cell(lat, lon)
+        max_ring = max(
+            abs(min_i - center_i), abs(max_i - center_i),
+            abs(min_j - center_j), abs(max_j - center_j)
+        )
+
+        found = []
+        for ring in range(max_ring + 1):
+            candidates = []
+            for i in range(center_i - ring, center_i + ring + 1):
+                edge = i in (center_i - ring, center_i + ring)
+                step = 1 if edge else 2 * ring
+                for j in range(center_j - ring, center_j + ring + 1, step):
+                    bucket = cells.get((i, j))
+                    if bucket:
+                        candidates.extend(bucket.items())
+            if candidates:
+                distances = haversine_km(lat, lon, [p for _, p in candidates])
+                found.extend(
+                    (dealer_id, distance)
+                    for (dealer_id, _), distance in zip(candidates, distances)
+                    if radius_km is None or distance <= radius_km
+                )
+
+            # Anything outside the rings visited so far is at least this far
+            gap = math.radians(ring * CELL_SIZE_DEG)
+            bound = min(
+                EARTH_RADIUS_KM * gap,
+                2 * EARTH_RADIUS_KM * math.asin(min(1.0, cos_bound * math.sin(gap / 2)))
+            )
+            if radius_km is not None and bound > radius_km:
+                break
+            if len(found) >= k:
+                found.sort(key=lambda item: item[1])
+                del found[k:]
+                if found[-1][1] <= bound:
+                    break
+
+        found.sort(key=lambda item: item[1])
+        return found[:k]
+
+
+dealer_index = DealerIndex()
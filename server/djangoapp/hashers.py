@@ -0,0 +1,46 @@
+"""
+Password hashers whose cost comes from settings.
+
+Each keeps the algorithm name of the Django hasher it extends, so hashes
+written by either verify with the other; must_update() compares a stored
+hash with the configured cost, and Django re-hashes the password at the
+new cost on the user's next successful login. Argon2 needs argon2-cffi
+and bcrypt the bcrypt package; both are only loaded when a hash of that
+kind is made or checked.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, BCryptSHA256PasswordHasher, PBKDF2PasswordHasher
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PBKDF2_ITERATIONS rounds"""
+
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with ARGON2_TIME_COST, ARGON2_MEMORY_COST (KiB) and ARGON2_PARALLELISM"""
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+class TunedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """bcrypt over a SHA-256 digest, with 2 ** BCRYPT_ROUNDS rounds"""
+
+    @property
+    def rounds(self):
+        return settings.BCRYPT_ROUNDS
@@ -0,0 +1,73 @@
+import gzip
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from djangoapp.review_import import (
+    DEFAULT_BATCH_SIZE, MAX_BATCH_SIZE, import_reviews, read_csv, read_ndjson
+)
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+class Command(BaseCommand):
+    help = 'Import reviews from a CSV or NDJSON file (optionally gzipped, "-" for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Input format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help=f'Rows per transaction and analyzer call (at most {MAX_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--no-sentiment', action='store_true',
+            help='Store unscored rows as pending instead of calling the analyzer'
+        )
+
+    def _format(self, path, fmt):
+        if fmt:
+            return fmt
+        name = path[:-3] if path.endswith('.gz') else path
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+        raise CommandError('Cannot tell the format from the file name; pass --format')
+
+    def _open(self, path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rt', encoding='utf-8', newline='')
+        return open(path, encoding='utf-8', newline='')
+
+    def handle(self, *args, **options):
+        fmt = self._format(options['path'], options['format'])
+        if not 1 <= options['batch_size'] <= MAX_BATCH_SIZE:
+            raise CommandError(f'--batch-size must be between 1 and {MAX_BATCH_SIZE}')
+
+        def progress(report):
+            self.stdout.write(f'Imported {report.imported} reviews, {report.failed} failed...')
+
+        try:
+            with self._open(options['path']) as handle:
+                report = import_reviews(
+                    READERS[fmt](handle),
+                    batch_size=options['batch_size'],
+                    score=not options['no_sentiment'],
+                    progress=progress,
+                ).as_dict()
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully imported {report['imported']} reviews "
+            f"({report['rows_per_second']} rows/s, {report['failed']} failed, "
+            f"{report['pending_sentiment']} pending sentiment)!"
+        ))
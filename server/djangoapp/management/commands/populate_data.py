@@ -1,11 +1,30 @@
 from django.core.management.base import BaseCommand
 from djangoapp.models import CarMake, CarModel, CarDealer, DealerReview
+from djangoapp.synthetic_data import generate
 from datetime import date
 
 class Command(BaseCommand):
     help = 'Populate database with sample data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dealers', type=int, default=0, help='Synthetic dealers to generate')
+        parser.add_argument('--reviews', type=int, default=0, help='Synthetic reviews to generate')
+        parser.add_argument('--makes', type=int, default=0, help='Synthetic car makes to generate')
+        parser.add_argument(
+            '--models-per-make', type=int, default=8,
+            help='Car models generated for each synthetic make'
+        )
+        parser.add_argument('--seed', type=int, default=0, help='Seed for repeatable data')
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows per bulk_create batch'
+        )
+
     def handle(self, *args, **options):
+        if options['dealers'] or options['reviews'] or options['makes']:
+            generate(options, self.stdout, self.style)
+            return
+
         self.stdout.write('Populating database with sample data...')
         
         # Create Car Makes
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from djangoapp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Restore missing sync triggers, then rebuild and optimize the review search index'
+
+    def handle(self, *args, **options):
+        if rebuild_index():
+            self.stdout.write(self.style.SUCCESS('Rebuilt the review search index!'))
+        else:
+            self.stdout.write(self.style.WARNING('No full-text index on this database; nothing to do'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from djangoapp.review_stats import rebuild_review_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-dealer review stats from DealerReview'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dealer_ids', nargs='*', type=int,
+            help='Only rebuild these dealers (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        dealers = rebuild_review_stats(options['dealer_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt review stats for {dealers} dealers!'))
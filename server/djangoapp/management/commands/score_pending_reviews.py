@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from djangoapp.models import DealerReview
+from djangoapp.sentiment_client import SentimentUnavailable
+from djangoapp.sentiment_queue import PENDING_SENTIMENT, score_reviews
+
+
+class Command(BaseCommand):
+    help = 'Score reviews whose sentiment is still pending, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Reviews sent to the analyzer per request'
+        )
+        parser.add_argument(
+            '--rescore', action='store_true',
+            help='Re-score every review, not just pending ones'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        reviews = DealerReview.objects.order_by('id').only('id', 'review', 'dealer_id')
+        if not options['rescore']:
+            reviews = reviews.filter(sentiment=PENDING_SENTIMENT)
+
+        scored = 0
+        last_id = 0
+        while True:
+            batch = list(reviews.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            try:
+                scored += score_reviews(batch)
+            except SentimentUnavailable as e:
+                raise CommandError(f'Stopped after {scored} reviews: {e}')
+            last_id = batch[-1].id
+            self.stdout.write(f'Scored {scored} reviews...')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully scored {scored} reviews!'))
@@ -0,0 +1,62 @@
+"""
+The Django app's metrics, served at /metrics.
+
+The registry itself lives in the sentiment service's metrics_core
+module (stdlib only, shipped in the same tree), so both services render
+the same format; see there for how recording, scrapes and the per-worker
+pid label work.
+"""
+from sentiment_analyzer.metrics_core import CONTENT_TYPE, Registry
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'djangoapp_http_requests_total', 'HTTP requests by URL name, method and status',
+    labels=('view', 'method', 'status')
+)
+http_request_duration = registry.histogram(
+    'djangoapp_http_request_duration_seconds', 'Time to produce a response by URL name',
+    labels=('view',)
+)
+db_queries = registry.counter(
+    'djangoapp_db_queries_total', 'Database queries by URL name', labels=('view',)
+)
+db_query_duration = registry.counter(
+    'djangoapp_db_query_seconds_total', 'Time spent in database queries by URL name',
+    labels=('view',)
+)
+sentiment_labels = registry.counter(
+    'djangoapp_sentiment_labels_total', 'Sentiment labels returned by the analyzer',
+    labels=('sentiment',)
+)
+sentiment_failures = registry.counter(
+    'djangoapp_sentiment_failures_total', 'Failed calls to the sentiment analyzer',
+    labels=('call',)
+)
+sentiment_fallbacks = registry.counter(
+    'djangoapp_sentiment_fallbacks_total',
+    "Reviews given the 'neutral' fallback because the analyzer was unavailable",
+    labels=('reason',)
+)
+sentiment_duration = registry.histogram(
+    'djangoapp_sentiment_request_duration_seconds', 'Sentiment analyzer call latency',
+    labels=('call',)
+)
+sentiment_cache = registry.counter(
+    'djangoapp_sentiment_cache_requests_total',
+    'Sentiment cache lookups by result (local_hit, shared_hit, miss)',
+    labels=('result',)
+)
+sentiment_cache_evictions = registry.counter(
+    'djangoapp_sentiment_cache_evictions_total',
+    'Entries evicted from the per-process sentiment cache'
+)
+
+
+def observe_request(view, method, status, seconds, timings):
+    """Record a finished request; ``timings`` is its RequestTimings"""
+    http_requests.inc(view, method, str(status))
+    http_request_duration.observe(seconds, view)
+    if timings.db_queries:
+        db_queries.inc(view, amount=timings.db_queries)
+        db_query_duration.inc(view, amount=timings.db_seconds)
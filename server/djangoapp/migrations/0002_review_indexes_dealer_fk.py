@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:44
+
+from django.db import migrations, models
+from django.db.models import F, Subquery
+import django.db.models.deletion
+
+
+def backfill_review_dealers(apps, schema_editor):
+    """Point existing reviews at their dealer with a single UPDATE"""
+    CarDealer = apps.get_model('djangoapp', 'CarDealer')
+    DealerReview = apps.get_model('djangoapp', 'DealerReview')
+    DealerReview.objects.filter(
+        dealer__isnull=True,
+        dealership__in=Subquery(CarDealer.objects.values('id')),
+    ).update(dealer=F('dealership'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealerreview',
+            name='dealer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='djangoapp.cardealer'),
+        ),
+        migrations.AlterField(
+            model_name='cardealer',
+            name='st',
+            field=models.CharField(db_index=True, max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='dealerreview',
+            index=models.Index(fields=['dealership', 'sentiment'], name='review_dealer_sentiment_idx'),
+        ),
+        migrations.RunPython(backfill_review_dealers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:46
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def build_review_stats(apps, schema_editor):
+    DealerReview = apps.get_model('djangoapp', 'DealerReview')
+    DealerReviewStats = apps.get_model('djangoapp', 'DealerReviewStats')
+    rows = (
+        DealerReview.objects.filter(dealer__isnull=False)
+        .order_by()
+        .values('dealer_id')
+        .annotate(
+            review_count=Count('id'),
+            positive_count=Count('id', filter=Q(sentiment='positive')),
+            negative_count=Count('id', filter=Q(sentiment='negative')),
+            neutral_count=Count('id', filter=Q(sentiment='neutral')),
+        )
+    )
+    DealerReviewStats.objects.bulk_create(
+        (DealerReviewStats(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0002_review_indexes_dealer_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerReviewStats',
+            fields=[
+                ('dealer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stats', serialize=False, to='djangoapp.cardealer')),
+                ('review_count', models.IntegerField(default=0)),
+                ('positive_count', models.IntegerField(default=0)),
+                ('negative_count', models.IntegerField(default=0)),
+                ('neutral_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(build_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0003_dealer_review_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dealerreview',
+            index=models.Index(fields=['dealership', 'purchase_date', 'id'], name='review_dealer_date_idx'),
+        ),
+    ]
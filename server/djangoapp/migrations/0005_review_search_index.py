@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# An external-content FTS5 index over DealerReview.review and name. The
+# triggers keep it in step with every write, including bulk_create and
+# bulk_update, which bypass model signals; updates that do not touch the
+# indexed columns (sentiment scoring) leave it alone.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE djangoapp_dealerreview_fts USING fts5(
+        review, name,
+        content='djangoapp_dealerreview', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_insert
+    AFTER INSERT ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (rowid, review, name)
+        VALUES (new.id, new.review, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_delete
+    AFTER DELETE ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts, rowid, review, name)
+        VALUES ('delete', old.id, old.review, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_update
+    AFTER UPDATE OF review, name ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts, rowid, review, name)
+        VALUES ('delete', old.id, old.review, old.name);
+        INSERT INTO djangoapp_dealerreview_fts (rowid, review, name)
+        VALUES (new.id, new.review, new.name);
+    END
+    """,
+    "INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_insert",
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_delete",
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_update",
+    "DROP TABLE IF EXISTS djangoapp_dealerreview_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only; other databases fall back to LIKE searches
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0004_review_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
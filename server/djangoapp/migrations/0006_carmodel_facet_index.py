@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0005_review_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['car_make', 'type', 'year'], name='carmodel_make_type_year_idx'),
+        ),
+    ]
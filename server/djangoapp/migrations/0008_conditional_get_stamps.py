@@ -0,0 +1,22 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0007_export_watermarks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealerreviewstats',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='dealerreview',
+            index=models.Index(fields=['dealership', 'updated_at'], name='review_dealer_updated_idx'),
+        ),
+    ]
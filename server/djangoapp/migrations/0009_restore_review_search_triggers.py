@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# 0007 added DealerReview.updated_at, which SQLite's schema editor applies
+# by rebuilding the table; the rebuild drops the FTS5 triggers from 0005,
+# so new and edited reviews stopped reaching the search index. Recreate
+# them and rebuild the index from the table.
+CREATE_SQL = [
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_insert",
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_delete",
+    "DROP TRIGGER IF EXISTS djangoapp_dealerreview_fts_update",
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_insert
+    AFTER INSERT ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (rowid, review, name)
+        VALUES (new.id, new.review, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_delete
+    AFTER DELETE ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts, rowid, review, name)
+        VALUES ('delete', old.id, old.review, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER djangoapp_dealerreview_fts_update
+    AFTER UPDATE OF review, name ON djangoapp_dealerreview BEGIN
+        INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts, rowid, review, name)
+        VALUES ('delete', old.id, old.review, old.name);
+        INSERT INTO djangoapp_dealerreview_fts (rowid, review, name)
+        VALUES (new.id, new.review, new.name);
+    END
+    """,
+    "INSERT INTO djangoapp_dealerreview_fts (djangoapp_dealerreview_fts) VALUES ('rebuild')",
+]
+
+
+def restore_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0008_conditional_get_stamps'),
+    ]
+
+    operations = [
+        # Reversing leaves the triggers in place, as 0007's reversal expects
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
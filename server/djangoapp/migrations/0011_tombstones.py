@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0010_catalog_stamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=20)),
+                ('row_id', models.IntegerField()),
+                ('scope', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['table', 'deleted_at'], name='tombstone_table_deleted_idx'), models.Index(fields=['table', 'scope', 'deleted_at'], name='tombstone_scope_deleted_idx')],
+            },
+        ),
+    ]
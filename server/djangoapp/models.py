@@ -5,6 +5,8 @@ from django.contrib.auth.models import User
 class CarMake(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
+    # Catalog index and get_cars stamps
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -23,6 +25,14 @@ class CarModel(models.Model):
     ]
     type = models.CharField(max_length=20, choices=CAR_TYPES, default='SEDAN')
     year = models.IntegerField()
+    # Catalog index and get_cars stamps
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Faceted catalog search: make, then type, then a year range
+            models.Index(fields=['car_make', 'type', 'year'], name='carmodel_make_type_year_idx'),
+        ]
 
     def __str__(self):
         return f"{self.car_make.name} {self.name}"
@@ -32,13 +42,15 @@ class CarDealer(models.Model):
     id = models.AutoField(primary_key=True)
     city = models.CharField(max_length=100)
     state = models.CharField(max_length=100)
-    st = models.CharField(max_length=2)  # State abbreviation
+    st = models.CharField(max_length=2, db_index=True)  # State abbreviation
     address = models.CharField(max_length=200)
     zip = models.CharField(max_length=10)
     lat = models.FloatField()
     long = models.FloatField()
     short_name = models.CharField(max_length=100)
     full_name = models.CharField(max_length=200)
+    # Watermark for incremental exports; bulk_update callers must list it
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.full_name
@@ -48,6 +60,11 @@ class DealerReview(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
     dealership = models.IntegerField()
+    # Same dealer as ``dealership`` when that dealer exists, for joins and prefetching
+    dealer = models.ForeignKey(
+        CarDealer, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='reviews'
+    )
     review = models.TextField()
     purchase = models.BooleanField(default=False)
     purchase_date = models.DateField(null=True, blank=True)
@@ -55,6 +72,70 @@ class DealerReview(models.Model):
     car_model = models.CharField(max_length=100, null=True, blank=True)
     car_year = models.IntegerField(null=True, blank=True)
     sentiment = models.CharField(max_length=20, default='neutral')
+    # Watermark for incremental exports; bulk_update callers must list it
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Also serves lookups on dealership alone
+            models.Index(fields=['dealership', 'sentiment'], name='review_dealer_sentiment_idx'),
+            # Newest-first review pages for a dealer
+            models.Index(fields=['dealership', 'purchase_date', 'id'], name='review_dealer_date_idx'),
+            # Conditional GET stamps: MAX(updated_at) of one dealer's reviews
+            models.Index(fields=['dealership', 'updated_at'], name='review_dealer_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so that review stats can move a review between buckets
+        if 'dealer_id' in field_names and 'sentiment' in field_names:
+            instance._stats_key = (instance.dealer_id, instance.sentiment)
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.dealer_id != self.dealership:
+            self.dealer_id = (
+                CarDealer.objects.filter(pk=self.dealership)
+                .values_list('pk', flat=True).first()
+            )
+        super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"Review by {self.name} for dealership {self.dealership}"
\ No newline at end of file
+        return f"Review by {self.name} for dealership {self.dealership}"
+
+
+class DealerReviewStats(models.Model):
+    """Review totals per dealer, kept up to date as reviews change"""
+    dealer = models.OneToOneField(
+        CarDealer, primary_key=True, on_delete=models.CASCADE,
+        related_name='review_stats'
+    )
+    review_count = models.IntegerField(default=0)
+    positive_count = models.IntegerField(default=0)
+    negative_count = models.IntegerField(default=0)
+    neutral_count = models.IntegerField(default=0)
+    # Set explicitly by the F() counter updates, which skip auto_now
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.review_count} reviews for dealership {self.dealer_id}"
+
+
+class Tombstone(models.Model):
+    """A deleted row, so incremental exports and stamps can see deletes"""
+    # Export table name ('dealers', 'reviews') or catalog model name
+    table = models.CharField(max_length=20)
+    row_id = models.IntegerField()
+    # Dealer a deleted review belonged to
+    scope = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table', 'deleted_at'], name='tombstone_table_deleted_idx'),
+            models.Index(fields=['table', 'scope', 'deleted_at'], name='tombstone_scope_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.table} {self.row_id} deleted at {self.deleted_at}"
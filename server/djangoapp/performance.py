@@ -0,0 +1,181 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times every request and splits the time between
+the database (every connection gets an execute_wrapper when it opens,
+which charges each query to the current request) and outbound HTTP
+calls, which the sentiment client reports through record_http(). The
+split is sent back as a ``Server-Timing`` header and added to the
+/metrics counters; with PERF_LOG_LEVEL=INFO it is also logged as one
+JSON line per request on the ``djangoapp.performance`` logger.
+With PERF_SLOW_LOG on, a sample of requests slower than
+PERF_SLOW_REQUEST_MS are also logged with their slowest SQL statements.
+
+For streaming responses only the work done before the first byte is
+measured; rows produced while the body is iterated are not. The
+middleware runs natively under ASGI. The current request is tracked in a
+context variable, which follows the async ORM onto its worker thread
+(database connections, being per thread, do not).
+"""
+import contextvars
+import heapq
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import observe_request
+
+logger = logging.getLogger('djangoapp.performance')
+slow_logger = logging.getLogger('djangoapp.performance.slow')
+
+_current = contextvars.ContextVar('djangoapp_request_timings', default=None)
+
+METRIC_METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+
+
+class RequestTimings:
+    """Database and outbound HTTP time accumulated by one request"""
+
+    def __init__(self, keep_queries=0):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+        self.keep_queries = keep_queries
+        self.slowest_queries = []  # min-heap of (seconds, sequence, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.db_queries += 1
+            self.db_seconds += elapsed
+            if self.keep_queries:
+                entry = (elapsed, self.db_queries, sql)
+                if len(self.slowest_queries) < self.keep_queries:
+                    heapq.heappush(self.slowest_queries, entry)
+                elif elapsed > self.slowest_queries[0][0]:
+                    heapq.heapreplace(self.slowest_queries, entry)
+
+    def add_http(self, seconds):
+        self.http_calls += 1
+        self.http_seconds += seconds
+
+
+def _timed_execute(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_query_timing(connection):
+    """Charge queries on ``connection`` to the request running them; idempotent"""
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def current_timings():
+    """The RequestTimings of the request being handled, or None outside one"""
+    return _current.get()
+
+
+def record_http(seconds):
+    """Charge an outbound HTTP call to the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add_http(seconds)
+
+
+def _server_timing(timings, total_ms):
+    db_ms = timings.db_seconds * 1000
+    http_ms = timings.http_seconds * 1000
+    app_ms = max(total_ms - db_ms - http_ms, 0)
+    return ', '.join([
+        f'db;dur={db_ms:.1f};desc="{timings.db_queries} queries"',
+        f'http;dur={http_ms:.1f};desc="{timings.http_calls} calls"',
+        f'app;dur={app_ms:.1f}',
+        f'total;dur={total_ms:.1f}',
+    ])
+
+
+class PerformanceMiddleware:
+    """Time each request and report the db/http/app split"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.server_timing = settings.PERF_SERVER_TIMING
+        self.slow_log = settings.PERF_SLOW_LOG
+        self.slow_ms = settings.PERF_SLOW_REQUEST_MS
+        self.slow_sample_rate = settings.PERF_SLOW_SAMPLE_RATE
+        self.top_queries = settings.PERF_SLOW_TOP_QUERIES if self.slow_log else 0
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings = RequestTimings(keep_queries=self.top_queries)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings = RequestTimings(keep_queries=self.top_queries)
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, timings, started)
+
+    def _report(self, request, response, timings, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        if self.server_timing:
+            response['Server-Timing'] = _server_timing(timings, total_ms)
+        record = self._record(request, response, timings, total_ms)
+        observe_request(
+            record['view'] or '<unresolved>',
+            request.method if request.method in METRIC_METHODS else 'OTHER',
+            response.status_code, total_ms / 1000, timings
+        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record))
+        if (self.slow_log and total_ms >= self.slow_ms
+                and random.random() < self.slow_sample_rate):
+            record['slowest_queries'] = [
+                {'ms': round(seconds * 1000, 3), 'sql': sql}
+                for seconds, _, sql in sorted(timings.slowest_queries, reverse=True)
+            ]
+            slow_logger.warning(json.dumps(record))
+        return response
+
+    def _record(self, request, response, timings, total_ms):
+        match = getattr(request, 'resolver_match', None)
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 3),
+            'db_ms': round(timings.db_seconds * 1000, 3),
+            'db_queries': timings.db_queries,
+            'http_ms': round(timings.http_seconds * 1000, 3),
+            'http_calls': timings.http_calls,
+        }
@@ -0,0 +1,222 @@
+"""
+Bulk review import from CSV or NDJSON.
+
+Input is consumed as a stream and handled in chunks: each chunk is
+validated row by row, the rows that still need a sentiment are scored
+with one batch call to the analyzer, and the chunk is written with
+bulk_create inside its own transaction. Invalid rows are reported with
+their line number and skipped; they never abort the rest of the file.
+"""
+import csv
+import json
+import time
+from datetime import date
+
+from django.db import transaction
+
+from .models import CarDealer, DealerReview
+from .review_stats import reviews_added
+from .sentiment_client import SentimentUnavailable, get_client
+from .sentiment_queue import PENDING_SENTIMENT
+
+DEFAULT_BATCH_SIZE = 1000
+# A chunk is held in memory and scored with one analyzer call, which takes
+# at most this many reviews (MAX_BATCH_SIZE in sentiment_analyzer/app.py)
+MAX_BATCH_SIZE = 10000
+MAX_REPORTED_ERRORS = 1000
+SENTIMENTS = ('positive', 'negative', 'neutral')
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 't')
+FALSE_VALUES = ('', '0', 'false', 'no', 'n', 'f')
+
+
+def read_ndjson(lines):
+    """Yield (line_number, row) pairs; undecodable lines yield the error instead"""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            row = ValueError('Each line must be a JSON object')
+        yield line_number, row
+
+
+def read_csv(lines):
+    """Yield (line_number, row) pairs from CSV with a header row"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _text(row, field, max_length, required=False):
+    value = row.get(field)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    value = str(value)
+    if len(value) > max_length:
+        raise ValueError(f'{field} is longer than {max_length} characters')
+    return value
+
+
+def _integer(row, field, required=False):
+    value = row.get(field)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f'{field} must be an integer')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be an integer')
+
+
+def _boolean(row, field):
+    value = row.get(field)
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'{field} must be true or false')
+
+
+def clean_row(row):
+    """Validate one raw row into DealerReview field values"""
+    review = row.get('review')
+    if not isinstance(review, str) or not review.strip():
+        raise ValueError('review is required')
+    purchase_date = row.get('purchase_date') or None
+    if purchase_date is not None:
+        try:
+            purchase_date = date.fromisoformat(str(purchase_date))
+        except ValueError:
+            raise ValueError('purchase_date must be YYYY-MM-DD')
+    sentiment = row.get('sentiment') or None
+    if sentiment is not None and sentiment not in SENTIMENTS:
+        raise ValueError(f"sentiment must be one of {', '.join(SENTIMENTS)}")
+    return {
+        'name': _text(row, 'name', 100, required=True),
+        'dealership': _integer(row, 'dealership', required=True),
+        'review': review,
+        'purchase': _boolean(row, 'purchase'),
+        'purchase_date': purchase_date,
+        'car_make': _text(row, 'car_make', 100),
+        'car_model': _text(row, 'car_model', 100),
+        'car_year': _integer(row, 'car_year'),
+        'sentiment': sentiment,
+    }
+
+
+class ImportReport:
+    """Running totals and per-row errors for one import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.pending = 0
+        self.errors = []
+        self._started = time.perf_counter()
+
+    def add_error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "error": message})
+
+    def as_dict(self):
+        seconds = time.perf_counter() - self._started
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "pending_sentiment": self.pending,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(self.imported / seconds, 1) if seconds else None,
+            "errors": self.errors,
+        }
+
+
+def _score(reviews, report):
+    unscored = [review for review in reviews if not review.sentiment]
+    if not unscored:
+        return
+    try:
+        sentiments = get_client().analyze_many([review.review for review in unscored])
+    except SentimentUnavailable:
+        sentiments = [PENDING_SENTIMENT] * len(unscored)
+        report.pending += len(unscored)
+    for review, sentiment in zip(unscored, sentiments):
+        review.sentiment = sentiment
+
+
+def _import_chunk(chunk, report, batch_size, score):
+    reviews = []
+    lines = []
+    for line_number, row in chunk:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            reviews.append(DealerReview(**clean_row(row)))
+            lines.append(line_number)
+        except ValueError as e:
+            report.add_error(line_number, str(e))
+    if not reviews:
+        return
+
+    dealer_ids = set(
+        CarDealer.objects.filter(id__in={review.dealership for review in reviews})
+        .values_list('id', flat=True)
+    )
+    for review in reviews:
+        if review.dealership in dealer_ids:
+            review.dealer_id = review.dealership
+    if score:
+        _score(reviews, report)
+    else:
+        for review in reviews:
+            if not review.sentiment:
+                review.sentiment = PENDING_SENTIMENT
+                report.pending += 1
+
+    try:
+        with transaction.atomic():
+            DealerReview.objects.bulk_create(reviews, batch_size=batch_size)
+            reviews_added(reviews)
+    except Exception as e:
+        for line_number in lines:
+            report.add_error(line_number, f'Not saved: {e}')
+        return
+    report.imported += len(reviews)
+
+
+def import_reviews(rows, batch_size=DEFAULT_BATCH_SIZE, score=True, progress=None):
+    """
+    Import (line_number, row) pairs from read_csv/read_ndjson
+
+    ``score`` scores rows without a sentiment via the analyzer; rows it
+    cannot score, or all of them when ``score`` is False, are stored as
+    'pending' for score_pending_reviews. ``progress`` is called with the
+    report after every chunk.
+    """
+    report = ImportReport()
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= batch_size:
+            _import_chunk(chunk, report, batch_size, score)
+            chunk = []
+            if progress:
+                progress(report)
+    if chunk:
+        _import_chunk(chunk, report, batch_size, score)
+        if progress:
+            progress(report)
+    return report
@@ -0,0 +1,156 @@
+"""
+Incremental maintenance of DealerReviewStats.
+
+Single review saves and deletes adjust the counters of the affected
+dealer with F() expressions. Bulk writes bypass model signals, so code
+that uses bulk_create calls reviews_added() and code that bulk-updates
+sentiments calls sentiments_changed(), both of which apply one F() delta
+per dealer; the rebuild_review_stats command recomputes everything from
+DealerReview.
+Every path also invalidates the cached reviews and stats it changed.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .caching import invalidate_reviews
+from .models import DealerReview, DealerReviewStats
+
+SENTIMENT_COLUMNS = {
+    'positive': 'positive_count',
+    'negative': 'negative_count',
+    'neutral': 'neutral_count',
+}
+STATS_FIELDS = ('review_count', 'positive_count', 'negative_count', 'neutral_count')
+
+
+def summarize(review_count, positive_count, negative_count, neutral_count):
+    """
+    Public shape of a dealer's review stats
+
+    ``rating`` maps the sentiment mix of scored reviews onto a 1-5 scale
+    (all negative = 1, balanced = 3, all positive = 5).
+    """
+    review_count = review_count or 0
+    positive_count = positive_count or 0
+    negative_count = negative_count or 0
+    neutral_count = neutral_count or 0
+    scored = positive_count + negative_count + neutral_count
+    return {
+        "review_count": review_count,
+        "positive": positive_count,
+        "negative": negative_count,
+        "neutral": neutral_count,
+        "positive_pct": round(100 * positive_count / review_count, 1) if review_count else None,
+        "rating": round(3 + 2 * (positive_count - negative_count) / scored, 2) if scored else None,
+    }
+
+
+def _adjust(dealer_id, sentiment, delta):
+    if dealer_id is None:
+        return
+    updates = {'review_count': F('review_count') + delta, 'updated_at': timezone.now()}
+    column = SENTIMENT_COLUMNS.get(sentiment)
+    if column:
+        updates[column] = F(column) + delta
+    if not DealerReviewStats.objects.filter(dealer_id=dealer_id).update(**updates):
+        rebuild_review_stats([dealer_id])
+
+
+def _apply_deltas(deltas):
+    """Add {dealer id: {stats field: delta}} with one update per dealer"""
+    missing = []
+    now = timezone.now()
+    for dealer_id, counts in deltas.items():
+        updates = {field: F(field) + delta for field, delta in counts.items() if delta}
+        if not updates:
+            continue
+        updates['updated_at'] = now
+        if not DealerReviewStats.objects.filter(dealer_id=dealer_id).update(**updates):
+            missing.append(dealer_id)
+    if missing:
+        rebuild_review_stats(missing)
+
+
+def reviews_added(reviews):
+    """Count freshly bulk-inserted ``reviews`` with one update per dealer"""
+    invalidate_reviews({review.dealership for review in reviews})
+    deltas = {}
+    for review in reviews:
+        if review.dealer_id is None:
+            continue
+        counts = deltas.setdefault(review.dealer_id, dict.fromkeys(STATS_FIELDS, 0))
+        counts['review_count'] += 1
+        column = SENTIMENT_COLUMNS.get(review.sentiment)
+        if column:
+            counts[column] += 1
+    _apply_deltas(deltas)
+
+
+def sentiments_changed(changes):
+    """
+    Move bulk-updated reviews between sentiment counters with one update
+    per dealer; ``changes`` are (dealer id, old sentiment, new sentiment)
+    """
+    changes = list(changes)
+    invalidate_reviews({dealer_id for dealer_id, _, _ in changes})
+    deltas = {}
+    for dealer_id, old, new in changes:
+        if dealer_id is None:
+            continue
+        counts = deltas.setdefault(dealer_id, dict.fromkeys(STATS_FIELDS, 0))
+        # 'pending' has no column, so scoring a pending review only adds
+        for sentiment, delta in ((old, -1), (new, 1)):
+            column = SENTIMENT_COLUMNS.get(sentiment)
+            if column:
+                counts[column] += delta
+    _apply_deltas(deltas)
+
+
+def review_saved(review, created):
+    """Move ``review`` into the counters for its current dealer and sentiment"""
+    current = (review.dealer_id, review.sentiment)
+    previous = getattr(review, '_stats_key', None)
+    if created:
+        _adjust(*current, 1)
+    elif previous is None:
+        # Saved without being loaded first, so the old bucket is unknown
+        rebuild_review_stats([review.dealer_id])
+    elif previous != current:
+        _adjust(*previous, -1)
+        _adjust(*current, 1)
+    review._stats_key = current
+
+
+def review_deleted(review):
+    _adjust(*getattr(review, '_stats_key', (review.dealer_id, review.sentiment)), -1)
+
+
+def rebuild_review_stats(dealer_ids=None):
+    """Recompute stats for ``dealer_ids``, or for every dealer when None"""
+    reviews = DealerReview.objects.filter(dealer__isnull=False)
+    stats = DealerReviewStats.objects.all()
+    if dealer_ids is not None:
+        dealer_ids = [dealer_id for dealer_id in set(dealer_ids) if dealer_id is not None]
+        if not dealer_ids:
+            return 0
+        reviews = reviews.filter(dealer_id__in=dealer_ids)
+        stats = stats.filter(dealer_id__in=dealer_ids)
+    invalidate_reviews(dealer_ids)
+
+    rows = (
+        reviews.order_by()
+        .values('dealer_id')
+        .annotate(
+            review_count=Count('id'),
+            positive_count=Count('id', filter=Q(sentiment='positive')),
+            negative_count=Count('id', filter=Q(sentiment='negative')),
+            neutral_count=Count('id', filter=Q(sentiment='neutral')),
+        )
+    )
+    with transaction.atomic():
+        stats.delete()
+        DealerReviewStats.objects.bulk_create(
+            (DealerReviewStats(**row) for row in rows.iterator()), batch_size=1000
+        )
+    return len(dealer_ids) if dealer_ids is not None else DealerReviewStats.objects.count()
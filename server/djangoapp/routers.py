@@ -0,0 +1,32 @@
+"""
+Send djangoapp reads to a read-only SQLite connection.
+
+Enabled by SQLITE_READ_ONLY_ROUTING, which adds a ``readonly`` alias
+opened with ``mode=ro`` on the same file. In WAL mode readers never block
+the writer, and reads on their own connection cannot hold a shared lock
+that a write on the default connection then has to wait for. Inside an
+atomic block on the default database every read stays there, so a
+transaction always sees its own uncommitted writes.
+"""
+from django.db import connections
+
+READ_ONLY_ALIAS = 'readonly'
+
+
+class ReadOnlyRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'djangoapp':
+            return None
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return READ_ONLY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database file
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != READ_ONLY_ALIAS
@@ -0,0 +1,197 @@
+"""
+Ranked full-text search over DealerReview text.
+
+On SQLite, reviews are indexed by the djangoapp_dealerreview_fts FTS5
+table (migration 0005), which triggers keep in sync with every insert,
+delete and text update. Matches are ordered by BM25 (lower is better)
+with the review id as a tie breaker, so pages use the same keyset cursor
+style as the other review endpoints: "<score>:<id>" of the last hit.
+
+The triggers are raw SQL, and SQLite drops them whenever a migration
+rebuilds the review table; the djangoapp.W001 check reports missing ones
+and rebuild_index() puts them back.
+
+User input never reaches the FTS5 query syntax directly: it is split
+into words, each quoted, so every word must match; a trailing '*' on a
+word keeps prefix matching. On other databases search falls back to
+unranked icontains filters.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import DealerReview
+
+FTS_TABLE = 'djangoapp_dealerreview_fts'
+REVIEW_TABLE = DealerReview._meta.db_table
+# bm25() column weights, in index column order (review, name)
+BM25_WEIGHTS = (1.0, 0.5)
+TERM_PATTERN = re.compile(r'\w+\*?')
+# The triggers that keep the index in step with REVIEW_TABLE (see 0005)
+TRIGGERS = {
+    f'{FTS_TABLE}_insert': f"""
+        CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {REVIEW_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, review, name) VALUES (new.id, new.review, new.name);
+        END
+    """,
+    f'{FTS_TABLE}_delete': f"""
+        CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {REVIEW_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, review, name)
+            VALUES ('delete', old.id, old.review, old.name);
+        END
+    """,
+    f'{FTS_TABLE}_update': f"""
+        CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF review, name ON {REVIEW_TABLE} BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, review, name)
+            VALUES ('delete', old.id, old.review, old.name);
+            INSERT INTO {FTS_TABLE} (rowid, review, name) VALUES (new.id, new.review, new.name);
+        END
+    """,
+}
+
+
+def parse_terms(text):
+    """Words of a search box query, lower-cased; a trailing '*' marks a prefix"""
+    return [term.lower() for term in TERM_PATTERN.findall(text or '')]
+
+
+def match_expression(terms):
+    """FTS5 MATCH expression requiring every term"""
+    parts = []
+    for term in terms:
+        if term.endswith('*'):
+            parts.append('"%s"*' % term[:-1])
+        else:
+            parts.append('"%s"' % term)
+    return ' '.join(parts)
+
+
+def parse_cursor(value):
+    """Decode ``after``: the "<score>:<id>" of the last hit on the previous page"""
+    if not value:
+        return None
+    score, _, review_id = value.rpartition(':')
+    try:
+        return float(score), int(review_id)
+    except ValueError:
+        raise ValueError("after must be a cursor returned as next")
+
+
+def _cursor(score, review_id):
+    return f'{score!r}:{review_id}'
+
+
+def _uses_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def search_reviews(text, fields, dealer_id=None, sentiment=None, limit=20, cursor=None):
+    """
+    One page of reviews matching ``text``, best first
+    Returns (rows, next_cursor); each row holds ``fields`` plus its
+    ``score`` (None without FTS). Raises ValueError for an empty query.
+    """
+    terms = parse_terms(text)
+    if not terms:
+        raise ValueError("q must contain at least one word")
+    connection = connections[router.db_for_read(DealerReview)]
+    if not _uses_fts(connection):
+        return _search_like(terms, fields, dealer_id, sentiment, limit, cursor)
+
+    # extra() puts the FTS table in FROM, which MATCH and bm25() need
+    score = 'bm25(%s, %s)' % (FTS_TABLE, ', '.join(map(str, BM25_WEIGHTS)))
+    reviews = DealerReview.objects.extra(
+        select={'score': score},
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {REVIEW_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(terms)],
+    )
+    if dealer_id is not None:
+        reviews = reviews.filter(dealership=dealer_id)
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    if cursor is not None:
+        reviews = reviews.extra(
+            where=[f'({score} > %s OR ({score} = %s AND {REVIEW_TABLE}.id > %s))'],
+            params=[cursor[0], cursor[0], cursor[1]],
+        )
+    rows = list(reviews.order_by('score', 'id').values(*fields, 'score')[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _cursor(rows[-1]['score'], rows[-1]['id'])
+    return rows, next_cursor
+
+
+def _search_like(terms, fields, dealer_id, sentiment, limit, cursor):
+    reviews = DealerReview.objects.order_by('id')
+    for term in terms:
+        term = term.rstrip('*')
+        reviews = reviews.filter(Q(review__icontains=term) | Q(name__icontains=term))
+    if dealer_id is not None:
+        reviews = reviews.filter(dealership=dealer_id)
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    if cursor is not None:
+        reviews = reviews.filter(id__gt=cursor[1])
+    rows = [dict(row, score=None) for row in reviews.values(*fields)[:limit + 1]]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _cursor(0.0, rows[-1]['id'])
+    return rows, next_cursor
+
+
+def matching_ids(text):
+    """
+    Subquery expression for the ids of reviews matching ``text``, for
+    ``filter(id__in=...)``; None when there is nothing to search for or
+    the database has no FTS index
+    """
+    terms = parse_terms(text)
+    connection = connections[router.db_for_read(DealerReview)]
+    if not terms or not _uses_fts(connection):
+        return None
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_expression(terms)]
+    )
+
+
+def missing_triggers(connection):
+    """
+    Names of the sync triggers missing from ``connection``'s database;
+    empty when all are there or the database has no FTS index
+    """
+    if not _uses_fts(connection):
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE]
+        )
+        if cursor.fetchone() is None:
+            # Not migrated yet
+            return []
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        present = {name for name, in cursor.fetchall()}
+    return [name for name in TRIGGERS if name not in present]
+
+
+def rebuild_index():
+    """
+    Recreate any missing sync triggers, then rebuild the FTS index from
+    DealerReview and merge its segments
+    """
+    connection = connections[router.db_for_write(DealerReview)]
+    if not _uses_fts(connection):
+        return False
+    missing = missing_triggers(connection)
+    with connection.cursor() as cursor:
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return True
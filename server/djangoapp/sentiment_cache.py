@@ -0,0 +1,126 @@
+"""
+Memoized sentiment labels keyed by normalized review text.
+
+Reviews are normalized the way the analyzer reads them (case and runs
+of whitespace do not change a score) and hashed, so re-submitting or
+re-checking the same text skips the analyzer round trip. Each process
+keeps a bounded LRU with a TTL; when SENTIMENT_CACHE_ALIAS names a
+shared Django cache (file-based, Redis, ...), local misses fall through
+to it so gunicorn workers share each other's results. Only labels the
+analyzer actually returned are cached, never the 'neutral' fallback.
+
+Normalization, hashing and the LRU itself come from the analyzer's
+cache module (stdlib only, shipped in the same tree), so both services
+agree on which texts are the same review.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from sentiment_analyzer.cache import LRUCache, text_key as _digest
+
+from . import metrics
+
+KEY_PREFIX = 'djangoapp:sentiment:'
+
+
+def text_key(text):
+    return KEY_PREFIX + _digest(text).hex()
+
+
+class SentimentCache:
+    """Per-process LRU in front of an optional shared Django cache"""
+
+    def __init__(self, maxsize, ttl, shared=None):
+        self.local = LRUCache(maxsize, ttl)
+        self.ttl = ttl
+        self.shared = shared
+
+    def _store_local(self, key, sentiment):
+        evicted = self.local.set(key, sentiment)
+        if evicted:
+            metrics.sentiment_cache_evictions.inc(amount=evicted)
+
+    def get(self, text):
+        key = text_key(text)
+        sentiment = self.local.get(key)
+        if sentiment is not None:
+            metrics.sentiment_cache.inc('local_hit')
+            return sentiment
+        if self.shared is not None:
+            sentiment = self.shared.get(key)
+            if sentiment is not None:
+                metrics.sentiment_cache.inc('shared_hit')
+                self._store_local(key, sentiment)
+                return sentiment
+        metrics.sentiment_cache.inc('miss')
+        return None
+
+    def set(self, text, sentiment):
+        key = text_key(text)
+        self._store_local(key, sentiment)
+        if self.shared is not None:
+            self.shared.set(key, sentiment, self.ttl)
+
+    def get_many(self, texts):
+        """Cached labels for ``texts`` as {position: sentiment}"""
+        found = {}
+        shared_keys = {}
+        for position, text in enumerate(texts):
+            key = text_key(text)
+            sentiment = self.local.get(key)
+            if sentiment is not None:
+                found[position] = sentiment
+            else:
+                shared_keys.setdefault(key, []).append(position)
+        if found:
+            metrics.sentiment_cache.inc('local_hit', amount=len(found))
+        if shared_keys and self.shared is not None:
+            for key, sentiment in self.shared.get_many(list(shared_keys)).items():
+                self._store_local(key, sentiment)
+                for position in shared_keys.pop(key):
+                    found[position] = sentiment
+                    metrics.sentiment_cache.inc('shared_hit')
+        missed = sum(map(len, shared_keys.values()))
+        if missed:
+            metrics.sentiment_cache.inc('miss', amount=missed)
+        return found
+
+    def set_many(self, texts, sentiments):
+        entries = {text_key(text): sentiment for text, sentiment in zip(texts, sentiments)}
+        for key, sentiment in entries.items():
+            self._store_local(key, sentiment)
+        if self.shared is not None and entries:
+            self.shared.set_many(entries, self.ttl)
+
+    async def aget(self, text):
+        key = text_key(text)
+        sentiment = self.local.get(key)
+        if sentiment is not None:
+            metrics.sentiment_cache.inc('local_hit')
+            return sentiment
+        if self.shared is not None:
+            sentiment = await self.shared.aget(key)
+            if sentiment is not None:
+                metrics.sentiment_cache.inc('shared_hit')
+                self._store_local(key, sentiment)
+                return sentiment
+        metrics.sentiment_cache.inc('miss')
+        return None
+
+    async def aset(self, text, sentiment):
+        key = text_key(text)
+        self._store_local(key, sentiment)
+        if self.shared is not None:
+            await self.shared.aset(key, sentiment, self.ttl)
+
+
+def build_cache():
+    """The cache configured by the SENTIMENT_CACHE_* settings, or None when disabled"""
+    if settings.SENTIMENT_CACHE_SIZE <= 0:
+        return None
+    alias = settings.SENTIMENT_CACHE_ALIAS
+    return SentimentCache(
+        settings.SENTIMENT_CACHE_SIZE,
+        settings.SENTIMENT_CACHE_TTL,
+        shared=caches[alias] if alias else None,
+    )
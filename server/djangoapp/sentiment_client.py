@@ -0,0 +1,271 @@
+"""
+Client for the sentiment analyzer microservice.
+
+One pooled keep-alive session is shared by every request in the process,
+and a circuit breaker stops calling the analyzer for a while after
+repeated failures, so a dead or slow analyzer costs at most one timeout
+per reset window instead of one per review. Every failure path falls back
+to 'neutral', which is what reviews were stored with before. Labels the
+analyzer returns are memoized by sentiment_cache.
+"""
+import asyncio
+import collections
+import logging
+import threading
+import time
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+from .performance import record_http
+from .sentiment_cache import build_cache
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_SENTIMENT = 'neutral'
+
+
+class SentimentUnavailable(Exception):
+    """The analyzer could not score a batch; the reviews should stay pending"""
+
+
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures for ``reset_timeout`` seconds"""
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        """Whether a call may go out now; lets one trial call through after the reset timeout"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class SentimentClient:
+    """Pooled sync and async access to the analyzer's HTTP API"""
+
+    def __init__(self, base_url, connect_timeout=1.0, read_timeout=3.0,
+                 pool_size=10, breaker=None, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker(threshold=5, reset_timeout=30.0)
+        self.cache = cache
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._async_clients = {}  # event loop -> AsyncClient
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=1, pool_maxsize=self.pool_size, max_retries=0
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def _get_async_client(self):
+        # An AsyncClient is bound to the event loop it first ran on, so each
+        # loop gets its own. Under WSGI, async_to_sync runs every call in a
+        # new loop; the clients of loops that have closed are dropped so
+        # their connections are freed. (Weak keys would not help: pooled
+        # connections hold a reference to their loop.)
+        loop = asyncio.get_running_loop()
+        with self._session_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                for closed in [other for other in self._async_clients if other.is_closed()]:
+                    del self._async_clients[closed]
+                client = self._async_clients[loop] = httpx.AsyncClient(
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size
+                    ),
+                )
+        return client
+
+    def _sentiment_from(self, response):
+        # requests and httpx responses share status_code and json()
+        if response.status_code != 200:
+            raise ValueError(f'Sentiment analyzer returned HTTP {response.status_code}')
+        return response.json().get('sentiment', FALLBACK_SENTIMENT)
+
+    def _post(self, path, payload):
+        started = time.perf_counter()
+        try:
+            return self.session.post(
+                self.base_url + path, json=payload,
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            record_http(elapsed)
+            metrics.sentiment_duration.observe(elapsed, path.lstrip('/'))
+
+    async def _apost(self, path, payload):
+        started = time.perf_counter()
+        try:
+            return await self._get_async_client().post(self.base_url + path, json=payload)
+        finally:
+            elapsed = time.perf_counter() - started
+            record_http(elapsed)
+            metrics.sentiment_duration.observe(elapsed, path.lstrip('/'))
+
+    def _cache_for(self, text):
+        return self.cache if self.cache is not None and isinstance(text, str) else None
+
+    def analyze(self, text):
+        """Sentiment label for ``text``, or 'neutral' if the analyzer is unavailable"""
+        cache = self._cache_for(text)
+        if cache is not None:
+            sentiment = cache.get(text)
+            if sentiment is not None:
+                return sentiment
+        if not self.breaker.allow():
+            metrics.sentiment_fallbacks.inc('circuit_open')
+            return FALLBACK_SENTIMENT
+        try:
+            response = self._post('/analyzereview', {'review': text})
+            sentiment = self._sentiment_from(response)
+        except Exception as e:
+            self.breaker.record_failure()
+            metrics.sentiment_failures.inc('analyzereview')
+            metrics.sentiment_fallbacks.inc('error')
+            logger.warning('Sentiment analysis failed: %s', e)
+            return FALLBACK_SENTIMENT
+        self.breaker.record_success()
+        metrics.sentiment_labels.inc(sentiment)
+        if cache is not None:
+            cache.set(text, sentiment)
+        return sentiment
+
+    def analyze_many(self, texts):
+        """
+        Sentiment labels for a batch of texts, in order, via /analyzereviews
+        Raises SentimentUnavailable instead of falling back to 'neutral'.
+        """
+        if not texts:
+            return []
+        texts = list(texts)
+        cached = {}
+        cache = self.cache
+        if cache is not None and not all(isinstance(text, str) for text in texts):
+            cache = None
+        if cache is not None:
+            cached = cache.get_many(texts)
+            if len(cached) == len(texts):
+                return [cached[position] for position in range(len(texts))]
+        missing = [text for position, text in enumerate(texts) if position not in cached]
+        if not self.breaker.allow():
+            raise SentimentUnavailable('Sentiment analyzer circuit is open')
+        try:
+            response = self._post('/analyzereviews', {'reviews': missing})
+            if response.status_code != 200:
+                raise ValueError(f'Sentiment analyzer returned HTTP {response.status_code}')
+            sentiments = response.json()['sentiments']
+            if len(sentiments) != len(missing):
+                raise ValueError('Sentiment analyzer returned a partial batch')
+        except Exception as e:
+            self.breaker.record_failure()
+            metrics.sentiment_failures.inc('analyzereviews')
+            raise SentimentUnavailable(str(e)) from e
+        self.breaker.record_success()
+        for sentiment, count in collections.Counter(sentiments).items():
+            metrics.sentiment_labels.inc(sentiment, amount=count)
+        if cache is not None:
+            cache.set_many(missing, sentiments)
+        if not cached:
+            return sentiments
+        scored = iter(sentiments)
+        return [
+            cached[position] if position in cached else next(scored)
+            for position in range(len(texts))
+        ]
+
+    async def aanalyze(self, text):
+        """Async variant of ``analyze`` that does not block a worker thread"""
+        cache = self._cache_for(text)
+        if cache is not None:
+            sentiment = await cache.aget(text)
+            if sentiment is not None:
+                return sentiment
+        if not self.breaker.allow():
+            metrics.sentiment_fallbacks.inc('circuit_open')
+            return FALLBACK_SENTIMENT
+        try:
+            response = await self._apost('/analyzereview', {'review': text})
+            sentiment = self._sentiment_from(response)
+        except Exception as e:
+            self.breaker.record_failure()
+            metrics.sentiment_failures.inc('analyzereview')
+            metrics.sentiment_fallbacks.inc('error')
+            logger.warning('Sentiment analysis failed: %s', e)
+            return FALLBACK_SENTIMENT
+        self.breaker.record_success()
+        metrics.sentiment_labels.inc(sentiment)
+        if cache is not None:
+            await cache.aset(text, sentiment)
+        return sentiment
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client configured from the SENTIMENT_* settings"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = SentimentClient(
+                    settings.SENTIMENT_ANALYZER_URL,
+                    connect_timeout=settings.SENTIMENT_CONNECT_TIMEOUT,
+                    read_timeout=settings.SENTIMENT_READ_TIMEOUT,
+                    pool_size=settings.SENTIMENT_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        threshold=settings.SENTIMENT_BREAKER_THRESHOLD,
+                        reset_timeout=settings.SENTIMENT_BREAKER_RESET_TIMEOUT
+                    ),
+                    cache=build_cache(),
+                )
+    return _client
@@ -0,0 +1,134 @@
+"""
+Deferred sentiment scoring for reviews.
+
+With SENTIMENT_MODE = 'deferred', add_review stores a review with the
+'pending' sentiment and hands its id to a background thread in the same
+process. The thread gathers ids into batches, scores each batch with one
+call to the analyzer's batch endpoint and writes the labels back with a
+single bulk_update. Reviews that could not be scored (analyzer down,
+process restarted) stay 'pending' until the score_pending_reviews
+management command picks them up.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import DealerReview
+from .review_stats import sentiments_changed
+from .sentiment_client import SentimentUnavailable, get_client
+
+logger = logging.getLogger(__name__)
+
+PENDING_SENTIMENT = 'pending'
+
+
+def score_reviews(reviews):
+    """
+    Score ``reviews`` with one batch call and save them with one bulk_update
+    ``reviews`` need their id, review and dealer_id loaded.
+    Raises SentimentUnavailable and leaves the rows untouched on failure.
+    """
+    reviews = list(reviews)
+    if not reviews:
+        return 0
+    sentiments = get_client().analyze_many([review.review or '' for review in reviews])
+    with transaction.atomic():
+        # Current labels, read under the write lock: counters move from
+        # whatever another scorer wrote meanwhile, not from 'pending'
+        previous = dict(
+            DealerReview.objects
+            .filter(id__in=[review.id for review in reviews])
+            .values_list('id', 'sentiment')
+        )
+        now = timezone.now()
+        changed, changes = [], []
+        for review, sentiment in zip(reviews, sentiments):
+            old = previous.get(review.id)
+            if old is None or old == sentiment:
+                continue
+            review.sentiment = sentiment
+            # bulk_update skips auto_now
+            review.updated_at = now
+            changed.append(review)
+            changes.append((review.dealer_id, old, sentiment))
+        DealerReview.objects.bulk_update(changed, ['sentiment', 'updated_at'])
+        sentiments_changed(changes)
+    return len(reviews)
+
+
+def score_pending(review_ids):
+    """Score whichever of ``review_ids`` are still pending"""
+    pending = (
+        DealerReview.objects
+        .filter(id__in=review_ids, sentiment=PENDING_SENTIMENT)
+        .only('id', 'review', 'dealer_id')
+    )
+    return score_reviews(pending)
+
+
+class SentimentWorker:
+    """Background thread that scores queued review ids in batches"""
+
+    def __init__(self, batch_size=100, batch_wait=0.05):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, review_id):
+        self._ensure_started()
+        self._queue.put(review_id)
+
+    def _ensure_started(self):
+        # Started lazily so that pre-forking servers start one per worker
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, name='sentiment-worker', daemon=True
+                    )
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            try:
+                score_pending(batch)
+            except SentimentUnavailable as e:
+                logger.warning('Left %d reviews pending: %s', len(batch), e)
+            except Exception:
+                logger.exception('Scoring %d pending reviews failed', len(batch))
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """The process-wide worker configured from the SENTIMENT_* settings"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = SentimentWorker(
+                    batch_size=settings.SENTIMENT_BATCH_SIZE,
+                    batch_wait=settings.SENTIMENT_BATCH_WAIT
+                )
+    return _worker
@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .caching import bump_version, invalidate_reviews
+from .geo import dealer_index
+from .models import CarMake, CarModel, CarDealer, DealerReview, Tombstone
+from .performance import install_query_timing
+from .review_stats import review_deleted, review_saved
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    """Report the connection's queries to PerformanceMiddleware"""
+    install_query_timing(connection)
+
+
+TOMBSTONE_TABLES = {
+    CarDealer: 'dealers',
+    DealerReview: 'reviews',
+    CarMake: 'car_makes',
+    CarModel: 'car_models',
+}
+
+
+def _record_tombstone(sender, instance):
+    # Written in the deleting transaction, for exports and stamps
+    return Tombstone.objects.create(
+        table=TOMBSTONE_TABLES[sender], row_id=instance.pk,
+        scope=instance.dealership if sender is DealerReview else None
+    )
+
+
+@receiver(post_delete, sender=DealerReview)
+@receiver(post_delete, sender=CarMake)
+@receiver(post_delete, sender=CarModel)
+def record_tombstone(sender, instance, **kwargs):
+    """Record a deleted review or catalog row"""
+    _record_tombstone(sender, instance)
+
+
+@receiver(post_save, sender=CarMake)
+@receiver(post_delete, sender=CarMake)
+@receiver(post_save, sender=CarModel)
+@receiver(post_delete, sender=CarModel)
+def invalidate_catalog(sender, **kwargs):
+    """Drop the pre-serialized get_cars response when the catalog changes"""
+    bump_version('catalog')
+
+
+def _dealer_changed(dealer_id, lat=None, lon=None, updated_at=None, deleted_at=None):
+    bump_version('dealers')
+    dealer_index.apply(dealer_id, lat, lon, updated_at=updated_at, deleted_at=deleted_at)
+
+
+@receiver(post_save, sender=CarDealer)
+def update_dealer_index(sender, instance, **kwargs):
+    """Move a saved dealer to its current grid cell once the write commits"""
+    transaction.on_commit(lambda: _dealer_changed(
+        instance.id, instance.lat, instance.long, updated_at=instance.updated_at
+    ))
+
+
+@receiver(post_delete, sender=CarDealer)
+def remove_from_dealer_index(sender, instance, **kwargs):
+    """Record the delete and drop the dealer from the grid once it commits"""
+    dealer_id = instance.id
+    tombstone = _record_tombstone(sender, instance)
+    transaction.on_commit(lambda: _dealer_changed(dealer_id, deleted_at=tombstone.deleted_at))
+
+
+@receiver(post_save, sender=DealerReview)
+def update_review_stats_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stats_key', None)
+    invalidate_reviews({instance.dealership, previous[0] if previous else None})
+    review_saved(instance, created)
+
+
+@receiver(post_delete, sender=DealerReview)
+def update_review_stats_on_delete(sender, instance, **kwargs):
+    invalidate_reviews({instance.dealership})
+    review_deleted(instance)
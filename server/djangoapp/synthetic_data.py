@@ -0,0 +1,227 @@
+"""
+Deterministic synthetic data for load testing and benchmarks.
+
+``populate_data --dealers N --reviews N --makes N --seed S`` lands here.
+Rows are generated lazily and written with bulk_create in fixed-size
+batches, so memory stays flat however many rows are requested, and the
+same seed always produces the same data.
+"""
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .caching import bump_version
+from .models import CarDealer, CarMake, CarModel, DealerReview
+from .review_stats import rebuild_review_stats
+
+# (state, abbreviation, latitude, longitude) near the middle of each state
+STATES = [
+    ('Alabama', 'AL', 32.8, -86.8), ('Arizona', 'AZ', 34.2, -111.7),
+    ('California', 'CA', 36.8, -119.4), ('Colorado', 'CO', 39.0, -105.5),
+    ('Florida', 'FL', 28.1, -81.6), ('Georgia', 'GA', 32.7, -83.4),
+    ('Illinois', 'IL', 40.0, -89.2), ('Indiana', 'IN', 39.9, -86.3),
+    ('Kansas', 'KS', 38.5, -98.4), ('Kentucky', 'KY', 37.5, -85.3),
+    ('Louisiana', 'LA', 31.1, -92.0), ('Massachusetts', 'MA', 42.3, -71.8),
+    ('Michigan', 'MI', 44.3, -85.4), ('Minnesota', 'MN', 46.3, -94.3),
+    ('Missouri', 'MO', 38.4, -92.5), ('Nevada', 'NV', 39.3, -116.6),
+    ('New Jersey', 'NJ', 40.2, -74.7), ('New York', 'NY', 42.9, -75.5),
+    ('North Carolina', 'NC', 35.6, -79.4), ('Ohio', 'OH', 40.3, -82.8),
+    ('Oregon', 'OR', 43.9, -120.6), ('Pennsylvania', 'PA', 40.9, -77.8),
+    ('Tennessee', 'TN', 35.9, -86.4), ('Texas', 'TX', 31.5, -99.3),
+    ('Utah', 'UT', 39.3, -111.7), ('Virginia', 'VA', 37.5, -78.9),
+    ('Washington', 'WA', 47.4, -120.5), ('Wisconsin', 'WI', 44.6, -89.9),
+]
+MAKE_NAMES = [
+    'Toyota', 'Honda', 'Ford', 'Chevrolet', 'Nissan', 'Hyundai', 'Kia',
+    'Subaru', 'Mazda', 'Volkswagen', 'BMW', 'Mercedes-Benz', 'Audi', 'Lexus',
+    'Jeep', 'Ram', 'GMC', 'Dodge', 'Buick', 'Cadillac', 'Acura', 'Infiniti',
+    'Volvo', 'Tesla', 'Lincoln', 'Chrysler', 'Mitsubishi', 'Porsche',
+]
+MODEL_SYLLABLES = ['ca', 'mi', 'ro', 'va', 'tra', 'lo', 'zen', 'ta', 'ri', 'on',
+                   'ex', 'so', 'ma', 'ster', 'lu', 'na', 'vi', 'co']
+CITY_PREFIXES = ['Spring', 'Oak', 'River', 'Lake', 'Fair', 'Green', 'Maple',
+                 'Cedar', 'Mill', 'Clear', 'Pine', 'Rock', 'Sun', 'West', 'North']
+CITY_SUFFIXES = ['field', 'ville', 'ton', 'wood', 'view', 'dale', 'port', 'burg']
+STREETS = ['Main St', 'Oak Ave', 'Broadway', 'Market St', 'Highway 9',
+           'Commerce Dr', 'Park Blvd', 'Elm St', 'Auto Mall Pkwy']
+DEALER_SUFFIXES = ['Motors', 'Auto Center', 'Auto Sales', 'Cars', 'Automotive']
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer',
+               'Michael', 'Linda', 'David', 'Elizabeth', 'Maria', 'Wei', 'Aisha']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia',
+              'Miller', 'Davis', 'Lopez', 'Nguyen', 'Patel', 'Kim', 'Khan']
+REVIEW_TEXTS = {
+    'positive': [
+        'Fantastic service! The staff was very professional and helpful.',
+        'Great experience buying my new car. Highly recommend!',
+        'Friendly team, fast paperwork and a fair price. Very satisfied.',
+        'Excellent dealership, the best buying experience I have had.',
+    ],
+    'negative': [
+        'Poor customer service. Had to wait too long.',
+        'Rude salesperson and overpriced add-ons. Would avoid.',
+        'Terrible financing experience, I regret buying here.',
+        'The car had a problem on day one and service was slow.',
+    ],
+    'neutral': [
+        'Bought a car here. The process took about three hours.',
+        'Average visit, nothing special to report.',
+        'They had the model I wanted in stock.',
+    ],
+}
+SENTIMENT_WEIGHTS = [('positive', 0.55), ('negative', 0.25), ('neutral', 0.2)]
+CAR_TYPES = [choice for choice, _ in CarModel.CAR_TYPES]
+FIRST_PURCHASE_DATE = date(2018, 1, 1)
+PURCHASE_DAYS = 8 * 365
+PROGRESS_EVERY = 20  # batches
+
+
+def _batches(objects, size):
+    iterator = iter(objects)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _bulk_load(model, objects, batch_size, report):
+    started = time.perf_counter()
+    count = 0
+    for number, batch in enumerate(_batches(objects, batch_size), start=1):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        count += len(batch)
+        if number % PROGRESS_EVERY == 0:
+            report(f'  {model.__name__}: {count:,} rows...')
+    elapsed = time.perf_counter() - started
+    if count:
+        report(f'{model.__name__}: {count:,} rows in {elapsed:.1f}s ({count / elapsed:,.0f}/s)')
+    return count
+
+
+def _make_name(rng, index):
+    if index < len(MAKE_NAMES):
+        return MAKE_NAMES[index]
+    return ''.join(rng.choice(MODEL_SYLLABLES) for _ in range(3)).capitalize() + ' Motors'
+
+
+def _generate_makes(rng, count):
+    for index in range(count):
+        name = _make_name(rng, index)
+        yield CarMake(name=name, description=f'{name} vehicles and parts')
+
+
+def _generate_models(rng, make_ids, per_make):
+    for make_id in make_ids:
+        for _ in range(per_make):
+            name = ''.join(rng.choice(MODEL_SYLLABLES) for _ in range(rng.randint(2, 3)))
+            yield CarModel(
+                car_make_id=make_id,
+                name=name.capitalize(),
+                type=rng.choice(CAR_TYPES),
+                year=rng.randint(2005, 2025),
+            )
+
+
+def _generate_dealers(rng, count):
+    for _ in range(count):
+        state, st, lat, lon = rng.choice(STATES)
+        city = rng.choice(CITY_PREFIXES) + rng.choice(CITY_SUFFIXES)
+        short_name = f'{city} {rng.choice(DEALER_SUFFIXES)}'
+        yield CarDealer(
+            city=city,
+            state=state,
+            st=st,
+            address=f'{rng.randint(1, 9999)} {rng.choice(STREETS)}',
+            zip=f'{rng.randint(10000, 99999)}',
+            lat=round(lat + rng.uniform(-2, 2), 4),
+            long=round(lon + rng.uniform(-3, 3), 4),
+            short_name=short_name,
+            full_name=f'{short_name} of {state}',
+        )
+
+
+def _generate_reviews(rng, count, dealer_ids, catalog):
+    # A few dealers attract most reviews, like real listings
+    weights = list(itertools.accumulate(
+        1 / (rank + 1) ** 0.8 for rank in range(len(dealer_ids))
+    ))
+    shuffled = list(dealer_ids)
+    rng.shuffle(shuffled)
+    sentiments = [label for label, _ in SENTIMENT_WEIGHTS]
+    sentiment_weights = list(itertools.accumulate(w for _, w in SENTIMENT_WEIGHTS))
+
+    for _ in range(count):
+        dealer_id = rng.choices(shuffled, cum_weights=weights)[0]
+        sentiment = rng.choices(sentiments, cum_weights=sentiment_weights)[0]
+        purchase = rng.random() < 0.7
+        make, model, year = rng.choice(catalog) if catalog and purchase else (None, None, None)
+        yield DealerReview(
+            name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            dealership=dealer_id,
+            dealer_id=dealer_id,
+            review=rng.choice(REVIEW_TEXTS[sentiment]),
+            purchase=purchase,
+            purchase_date=(
+                FIRST_PURCHASE_DATE + timedelta(days=rng.randrange(PURCHASE_DAYS))
+                if purchase else None
+            ),
+            car_make=make,
+            car_model=model,
+            car_year=year,
+            sentiment=sentiment,
+        )
+
+
+def generate(options, stdout, style):
+    """Generate and bulk load the data requested by populate_data's options"""
+    rng = random.Random(options['seed'])
+    batch_size = options['batch_size']
+
+    def report(message):
+        stdout.write(message)
+
+    stdout.write(
+        f"Generating {options['makes']:,} makes, {options['dealers']:,} dealers and "
+        f"{options['reviews']:,} reviews (seed {options['seed']})..."
+    )
+    started = time.perf_counter()
+
+    if options['makes']:
+        first_make_id = (CarMake.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        _bulk_load(CarMake, _generate_makes(rng, options['makes']), batch_size, report)
+        make_ids = list(
+            CarMake.objects.filter(id__gte=first_make_id).order_by('id').values_list('id', flat=True)
+        )
+        _bulk_load(
+            CarModel, _generate_models(rng, make_ids, options['models_per_make']),
+            batch_size, report
+        )
+        bump_version('catalog')
+
+    if options['dealers']:
+        _bulk_load(CarDealer, _generate_dealers(rng, options['dealers']), batch_size, report)
+        bump_version('dealers')
+
+    if options['reviews']:
+        dealer_ids = list(CarDealer.objects.order_by('id').values_list('id', flat=True))
+        if not dealer_ids:
+            stdout.write(style.WARNING('No dealers to review; pass --dealers as well'))
+        else:
+            catalog = list(
+                CarModel.objects.order_by('id')
+                .values_list('car_make__name', 'name', 'year')
+            )
+            _bulk_load(
+                DealerReview,
+                _generate_reviews(rng, options['reviews'], dealer_ids, catalog),
+                batch_size, report
+            )
+            rebuild_review_stats()
+
+    stdout.write(style.SUCCESS(
+        f'Successfully generated synthetic data in {time.perf_counter() - started:.1f}s!'
+    ))
@@ -0,0 +1,713 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import async_views, catalog, geo
+from .caching import bump_version, versioned_key
+from .catalog import FacetFilter, catalog_index
+from .checks import check_search_triggers
+from .export import parse_watermark
+from .geo import dealer_index
+from .models import CarDealer, CarMake, CarModel, DealerReview, DealerReviewStats
+from .search import FTS_TABLE, missing_triggers, search_reviews
+from .sentiment_cache import SentimentCache
+from .sentiment_client import SentimentClient
+from .sentiment_queue import PENDING_SENTIMENT, score_pending, score_reviews
+
+
+def build_dealer(**fields):
+    values = {
+        'city': 'Springfield', 'state': 'Texas', 'st': 'TX', 'address': '1 Main St',
+        'zip': '75001', 'lat': 32.9, 'long': -96.8, 'short_name': 'Springfield Auto',
+        'full_name': 'Springfield Auto of Texas',
+    }
+    values.update(fields)
+    return CarDealer(**values)
+
+
+def make_dealer(**fields):
+    dealer = build_dealer(**fields)
+    dealer.save()
+    return dealer
+
+
+def make_review(**fields):
+    values = {
+        'name': 'Pat Lee', 'dealership': 1, 'review': 'Friendly staff and a fair price',
+        'purchase': False, 'sentiment': 'positive',
+    }
+    values.update(fields)
+    return DealerReview.objects.create(**values)
+
+
+class ReviewSearchTests(TestCase):
+    """Search on the fully migrated schema, where the FTS triggers must exist"""
+
+    def setUp(self):
+        cache.clear()
+
+    def search_ids(self, text):
+        rows, _ = search_reviews(text, ['id'])
+        return [row['id'] for row in rows]
+
+    def test_new_review_is_searchable(self):
+        review = make_review(review='The mechanic fixed the transmission quickly')
+        self.assertEqual(self.search_ids('transmission'), [review.id])
+        self.assertEqual(self.search_ids('transmi*'), [review.id])
+
+    def test_edited_and_deleted_reviews_leave_the_index(self):
+        review = make_review(review='Spotless showroom')
+        review.review = 'Cluttered showroom'
+        review.save()
+        self.assertEqual(self.search_ids('spotless'), [])
+        self.assertEqual(self.search_ids('cluttered'), [review.id])
+        review.delete()
+        self.assertEqual(self.search_ids('cluttered'), [])
+
+    def test_search_endpoint_ranks_and_pages(self):
+        for n in range(3):
+            make_review(review=f'Great service number {n}')
+        first = self.client.get('/djangoapp/reviews/search/', {'q': 'service', 'limit': 2}).json()
+        self.assertEqual(len(first['reviews']), 2)
+        rest = self.client.get(
+            '/djangoapp/reviews/search/', {'q': 'service', 'limit': 2, 'after': first['next']}
+        ).json()
+        self.assertEqual(len(rest['reviews']), 1)
+        self.assertIsNone(rest['next'])
+
+    def test_check_reports_and_rebuild_restores_missing_triggers(self):
+        self.assertEqual(check_search_triggers(None, databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_insert')
+        warnings = check_search_triggers(None, databases=['default'])
+        self.assertEqual([warning.id for warning in warnings], ['djangoapp.W001'])
+
+        call_command('rebuild_review_search', stdout=io.StringIO())
+        self.assertEqual(missing_triggers(connection), [])
+        review = make_review(review='Restored trigger')
+        self.assertEqual(self.search_ids('restored'), [review.id])
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.reviews = [make_review(review=f'Review {n}') for n in range(3)]
+        # Written hours apart, so only the newest is inside the overlap
+        # below the first export's watermark
+        for hours, review in zip((3, 2, 1), self.reviews):
+            DealerReview.objects.filter(id=review.id).update(
+                updated_at=timezone.now() - timedelta(hours=hours)
+            )
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+
+    def export_ids(self, **params):
+        response = self.client.get('/djangoapp/export/reviews/', {'gzip': '0', **params})
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return sorted(row['id'] for row in rows), response.get('X-Export-Watermark')
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get('/djangoapp/export/reviews/').status_code, 403)
+
+    def test_incremental_export_picks_up_changed_rows(self):
+        self.client.force_login(self.staff)
+        ids, watermark = self.export_ids()
+        self.assertEqual(ids, sorted(review.id for review in self.reviews))
+
+        edited = self.reviews[0]
+        edited.review = 'Edited'
+        edited.save()
+        added = make_review(review='New')
+        ids, next_watermark = self.export_ids(since=watermark)
+        # reviews[2] carries the old watermark, so the overlap reads it again
+        self.assertEqual(ids, sorted([edited.id, added.id, self.reviews[2].id]))
+        self.assertGreater(parse_watermark(next_watermark), parse_watermark(watermark))
+
+    def test_late_commit_inside_the_overlap_is_exported(self):
+        self.client.force_login(self.staff)
+        _, watermark = self.export_ids()
+        # Stamped just before the watermark, but committed after that export
+        late = make_review(review='Late')
+        DealerReview.objects.filter(id=late.id).update(
+            updated_at=parse_watermark(watermark) - timedelta(milliseconds=500)
+        )
+        ids, next_watermark = self.export_ids(since=watermark)
+        self.assertEqual(ids, sorted([self.reviews[2].id, late.id]))
+        # The watermark never moves back
+        self.assertEqual(next_watermark, watermark)
+
+    def test_overlap_covers_the_busy_timeout(self):
+        self.client.force_login(self.staff)
+        _, watermark = self.export_ids()
+        # Stamped before the watermark, then waited most of the busy
+        # timeout for the write lock
+        late = make_review(review='Late')
+        DealerReview.objects.filter(id=late.id).update(
+            updated_at=parse_watermark(watermark) - timedelta(milliseconds=4500)
+        )
+        with override_settings(SQLITE_BUSY_TIMEOUT=5000):
+            ids, _ = self.export_ids(since=watermark)
+        self.assertEqual(ids, sorted([self.reviews[2].id, late.id]))
+        with override_settings(SQLITE_BUSY_TIMEOUT=0):
+            ids, _ = self.export_ids(since=watermark)
+        self.assertEqual(ids, [self.reviews[2].id])
+
+    def test_deleted_rows_are_exported_from_tombstones(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.export_ids(deleted='1'), ([], None))
+
+        first, second, third = [review.id for review in self.reviews]
+        self.reviews[0].delete()
+        ids, watermark = self.export_ids(deleted='1')
+        self.assertEqual(ids, [first])
+        self.assertNotIn(first, self.export_ids()[0])
+
+        DealerReview.objects.filter(id__in=[second, third]).delete()
+        ids, next_watermark = self.export_ids(deleted='1', since=watermark)
+        # The first delete is still inside the overlap
+        self.assertEqual(ids, [first, second, third])
+        self.assertGreater(parse_watermark(next_watermark), parse_watermark(watermark))
+        self.assertEqual(self.export_ids()[0], [])
+
+    def test_export_command_keeps_the_watermark_file(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            output = os.path.join(workdir, 'reviews.csv')
+            watermark_file = os.path.join(workdir, 'reviews.wm')
+            options = {'format': 'csv', 'no_gzip': True, 'output': output,
+                       'watermark_file': watermark_file, 'stdout': io.StringIO()}
+            call_command('export_data', 'reviews', **options)
+            with open(output) as handle:
+                self.assertEqual(len(list(csv.DictReader(handle))), 3)
+
+            call_command('export_data', 'reviews', **options)
+            with open(output) as handle:
+                # Nothing changed; only the overlap row at the watermark
+                rows = list(csv.DictReader(handle))
+            self.assertEqual([int(row['id']) for row in rows], [self.reviews[2].id])
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.dealer = make_dealer()
+        make_review(dealership=self.dealer.id, dealer=self.dealer)
+        self.url = f'/djangoapp/reviews/dealer/{self.dealer.id}/'
+
+    def test_304_until_a_write_then_the_new_body(self):
+        first = self.client.get(self.url)
+        self.assertEqual(len(first.json()['reviews']), 1)
+        etag = first['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # bulk_create skips the signals that bump cache versions, like a
+        # write made by another worker process with its own locmem cache
+        DealerReview.objects.bulk_create([DealerReview(
+            name='Sam', dealership=self.dealer.id, dealer=self.dealer, review='Second'
+        )])
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], etag)
+        self.assertEqual(len(second.json()['reviews']), 2)
+        self.assertEqual(
+            self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag']).status_code, 304
+        )
+
+    def test_dealer_details_after_an_unsignalled_update(self):
+        url = f'/djangoapp/dealer/{self.dealer.id}/'
+        etag = self.client.get(url)['ETag']
+        CarDealer.objects.filter(id=self.dealer.id).update(
+            city='Elsewhere', updated_at=timezone.now()
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['dealer']['city'], 'Elsewhere')
+
+    def test_warm_car_catalog_runs_no_queries(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        etag = self.client.get('/djangoapp/get_cars/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/djangoapp/get_cars/').status_code, 200)
+            response = self.client.get('/djangoapp/get_cars/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_car_catalog_after_a_write(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        etag = self.client.get('/djangoapp/get_cars/')['ETag']
+        CarModel.objects.create(car_make=make, name='Sorento', type='SUV', year=2021)
+        response = self.client.get('/djangoapp/get_cars/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [car['CarModel'] for car in response.json()['CarModels']], ['Rio', 'Sorento']
+        )
+
+    def test_car_catalog_after_an_unsignalled_write_expires(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        etag = self.client.get('/djangoapp/get_cars/')['ETag']
+        # bulk_create bumps no version, like another worker's write with a
+        # per-process cache; the old body is served until it expires
+        CarModel.objects.bulk_create([
+            CarModel(car_make=make, name='Sorento', type='SUV', year=2021)
+        ])
+        response = self.client.get('/djangoapp/get_cars/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        cache.delete(versioned_key('catalog', 'body'))
+        response = self.client.get('/djangoapp/get_cars/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['CarModels']), 2)
+
+    def test_deleting_a_review_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        DealerReview.objects.filter(dealership=self.dealer.id).delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deleting_an_older_review_changes_the_etag(self):
+        older = make_review(dealership=self.dealer.id, dealer=self.dealer)
+        DealerReview.objects.filter(id=older.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        etag = self.client.get(self.url)['ETag']
+        # The newest updated_at stays put; only the tombstone moves
+        older.delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['reviews']), 1)
+
+    def test_a_review_leaving_the_sentiment_filter_changes_the_etag(self):
+        leaving = make_review(dealership=self.dealer.id, dealer=self.dealer)
+        DealerReview.objects.filter(id=leaving.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        url = self.url + '?sentiment=positive'
+        etag = self.client.get(url)['ETag']
+        DealerReview.objects.filter(id=leaving.id).update(
+            sentiment='negative', updated_at=timezone.now()
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['reviews']), 1)
+
+    def test_stamps_do_not_count_rows(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q['sql'] for q in queries if 'COUNT(' in q['sql'].upper()])
+
+    async def test_async_view_pairs_the_etag_with_a_fresh_body(self):
+        factory = AsyncRequestFactory()
+        first = await async_views.get_dealer_reviews(factory.get(self.url), self.dealer.id)
+        await DealerReview.objects.abulk_create([DealerReview(
+            name='Sam', dealership=self.dealer.id, dealer=self.dealer, review='Second'
+        )])
+        second = await async_views.get_dealer_reviews(
+            factory.get(self.url, headers={'If-None-Match': first['ETag']}), self.dealer.id
+        )
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(json.loads(second.content)['reviews']), 2)
+
+
+class DealerIndexTests(TestCase):
+
+    def nearest_ids(self, lat, lon, k=3):
+        return [dealer_id for dealer_id, _ in dealer_index.nearest(lat, lon, k=k)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_writes_that_bump_the_version_are_picked_up(self):
+        near = make_dealer(lat=40.0, long=-100.0)
+        self.assertEqual(self.nearest_ids(40.0, -100.0, k=1), [near.id])
+        # bulk_create skips the signals; another worker sharing the cache
+        # would still bump the version
+        closer, = CarDealer.objects.bulk_create([build_dealer(lat=40.001, long=-100.0)])
+        bump_version('dealers')
+        self.assertEqual(self.nearest_ids(40.001, -100.0, k=1), [closer.id])
+
+    def test_a_current_index_answers_without_queries(self):
+        near = make_dealer(lat=40.0, long=-100.0)
+        self.nearest_ids(0, 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.nearest_ids(40.0, -100.0, k=1), [near.id])
+
+    def test_unversioned_writes_are_picked_up_by_the_periodic_check(self):
+        near = make_dealer(lat=40.0, long=-100.0)
+        self.nearest_ids(0, 0)
+        # bulk_create and update() skip the signals, like another worker's
+        # write with a per-process cache
+        closer, = CarDealer.objects.bulk_create([build_dealer(lat=40.001, long=-100.0)])
+        with mock.patch.object(geo, 'STAMP_CHECK_INTERVAL', 0):
+            self.assertEqual(self.nearest_ids(40.001, -100.0, k=1), [closer.id])
+            CarDealer.objects.filter(id=closer.id).update(
+                lat=10.0, long=10.0, updated_at=timezone.now()
+            )
+            self.assertEqual(self.nearest_ids(40.001, -100.0, k=1), [near.id])
+
+    def test_changes_in_this_process_do_not_rebuild(self):
+        dealer = make_dealer(lat=35.0, long=-90.0)
+        self.nearest_ids(0, 0)
+        with mock.patch.object(dealer_index, 'rebuild', wraps=dealer_index.rebuild) as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                moved = make_dealer(lat=35.5, long=-90.0)
+            with self.captureOnCommitCallbacks(execute=True):
+                dealer.lat = 50.0
+                dealer.save()
+            self.assertEqual(self.nearest_ids(35.4, -90.0, k=1), [moved.id])
+            with self.captureOnCommitCallbacks(execute=True):
+                moved.delete()
+            self.assertEqual(self.nearest_ids(35.4, -90.0, k=1), [dealer.id])
+        rebuild.assert_not_called()
+
+
+class CatalogIndexTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_a_current_index_answers_without_queries(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        catalog_index.facets(FacetFilter())
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog_index.facets(FacetFilter())[1]['make'], {'Kia': 1})
+
+    def test_rows_written_by_another_process_are_picked_up(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        self.assertEqual(catalog_index.facets(FacetFilter())[1]['make'], {'Kia': 1})
+        # Neither bulk_create nor update() sends the signals, so only the
+        # periodic stamp check sees them
+        model, = CarModel.objects.bulk_create([
+            CarModel(car_make=make, name='Sorento', type='SUV', year=2021)
+        ])
+        with mock.patch.object(catalog, 'STAMP_CHECK_INTERVAL', 0):
+            total, facets = catalog_index.facets(FacetFilter(types=['SUV']))
+            self.assertEqual((total, facets['type']), (1, {'SEDAN': 1, 'SUV': 1}))
+            CarMake.objects.filter(id=make.id).update(name='KIA', updated_at=timezone.now())
+            self.assertEqual(catalog_index.make_ids(['kia']), [make.id])
+            self.assertEqual(catalog_index.facets(FacetFilter())[1]['make'], {'KIA': 2})
+
+    def test_deletes_are_picked_up(self):
+        make = CarMake.objects.create(name='Kia', description='')
+        rio = CarModel.objects.create(car_make=make, name='Rio', type='SEDAN', year=2020)
+        CarModel.objects.create(car_make=make, name='Sorento', type='SUV', year=2021)
+        self.assertEqual(catalog_index.facets(FacetFilter())[0], 2)
+        rio.delete()
+        self.assertEqual(catalog_index.facets(FacetFilter())[0], 1)
+
+
+class SentimentCacheTests(TestCase):
+
+    def test_normalized_text_hits_the_local_then_the_shared_cache(self):
+        shared = caches['default']
+        shared.clear()
+        first = SentimentCache(10, 60, shared=shared)
+        first.set('Great  service', 'positive')
+        self.assertEqual(first.get('great service'), 'positive')
+        # Another worker's empty LRU falls through to the shared cache
+        second = SentimentCache(10, 60, shared=shared)
+        self.assertEqual(second.get_many(['GREAT service', 'Slow']), {0: 'positive'})
+        # ...and keeps the label locally from then on
+        self.assertEqual(second.get('great service'), 'positive')
+        self.assertEqual(second.local.hits, 1)
+
+
+class DeferredScoringTests(TestCase):
+
+    def setUp(self):
+        self.dealer = make_dealer()
+        self.reviews = [
+            make_review(dealership=self.dealer.id, review=text, sentiment=PENDING_SENTIMENT)
+            for text in ('Great', 'Awful', 'Fine')
+        ]
+
+    def score(self, sentiments, score=None):
+        client = mock.Mock()
+        client.analyze_many.return_value = sentiments
+        with mock.patch('djangoapp.sentiment_queue.get_client', return_value=client), \
+                CaptureQueriesContext(connection) as queries:
+            if score is None:
+                score_pending([review.id for review in self.reviews])
+            else:
+                score()
+        # Adjusted in place, never deleted and rebuilt
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('DELETE') and 'dealerreviewstats' in query['sql']
+        ])
+
+    def counts(self):
+        stats = DealerReviewStats.objects.get(dealer=self.dealer)
+        return [getattr(stats, field) for field in (
+            'review_count', 'positive_count', 'negative_count', 'neutral_count'
+        )]
+
+    def test_scoring_moves_pending_reviews_into_sentiment_counts(self):
+        self.assertEqual(self.counts(), [3, 0, 0, 0])
+        self.score(['positive', 'negative', 'positive'])
+        self.assertEqual(self.counts(), [3, 2, 1, 0])
+        self.assertEqual(
+            list(DealerReview.objects.order_by('id').values_list('sentiment', flat=True)),
+            ['positive', 'negative', 'positive']
+        )
+
+    def test_counts_follow_labels_written_meanwhile(self):
+        pending = list(DealerReview.objects.order_by('id').only('id', 'review', 'dealer_id'))
+        # Another scorer labels the first review after this batch was read
+        DealerReview.objects.filter(id=self.reviews[0].id).update(sentiment='neutral')
+        DealerReviewStats.objects.filter(dealer=self.dealer).update(neutral_count=1)
+        self.score(['positive', 'negative', 'positive'], lambda: score_reviews(pending))
+        self.assertEqual(self.counts(), [3, 2, 1, 0])
+        self.assertEqual(DealerReview.objects.get(id=self.reviews[0].id).sentiment, 'positive')
+
+
+class ReviewImportTests(TestCase):
+
+    def setUp(self):
+        self.dealer = make_dealer()
+        self.staff = User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.staff)
+        self.client.cookies['csrftoken'] = self.token = 'a' * 32
+
+    def post(self, body, content_type, **headers):
+        return self.client.post(
+            '/djangoapp/reviews/bulk/?score=0&batch_size=2', body,
+            content_type=content_type, headers={'X-CSRFToken': self.token, **headers}
+        )
+
+    def test_requires_the_csrf_token(self):
+        response = self.post('name,dealership,review\n', 'text/csv', **{'X-CSRFToken': ''})
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_content_types_are_rejected(self):
+        response = self.post('{"name": "Pat"}', 'application/json')
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(DealerReview.objects.count(), 0)
+
+    def test_batch_size_is_capped(self):
+        response = self.client.post(
+            '/djangoapp/reviews/bulk/?score=0&batch_size=10001', 'name,dealership,review\n',
+            content_type='text/csv', headers={'X-CSRFToken': self.token}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'batch_size must be at most 10000')
+        with self.assertRaises(CommandError):
+            call_command('import_reviews', 'reviews.csv', batch_size=10001)
+
+    def test_csv_errors_are_reported_by_line(self):
+        body = '\n'.join([
+            'name,dealership,review,purchase_date',
+            f'Pat,{self.dealer.id},Great service,',
+            f',{self.dealer.id},No name,',
+            f'Sam,{self.dealer.id},Bad date,2024-13-01',
+            'Lee,999,Unknown dealer,2024-01-02',
+        ])
+        report = self.post(body, 'text/csv').json()
+        self.assertEqual((report['imported'], report['failed'], report['pending_sentiment']),
+                         (2, 2, 2))
+        self.assertEqual(report['errors'], [
+            {'line': 3, 'error': 'name is required'},
+            {'line': 4, 'error': 'purchase_date must be YYYY-MM-DD'},
+        ])
+        self.assertEqual(DealerReviewStats.objects.get(dealer=self.dealer).review_count, 1)
+
+    def test_ndjson_errors_are_reported_by_line(self):
+        body = '\n'.join([
+            json.dumps({'name': 'Pat', 'dealership': self.dealer.id, 'review': 'Fine'}),
+            '{not json',
+            '[1, 2]',
+            json.dumps({'name': 'Sam', 'dealership': 'x', 'review': 'Fine'}),
+        ])
+        report = self.post(body, 'application/x-ndjson').json()
+        self.assertEqual((report['imported'], report['failed']), (1, 3))
+        self.assertEqual([error['line'] for error in report['errors']], [2, 3, 4])
+        self.assertTrue(report['errors'][0]['error'].startswith('Invalid JSON'))
+        self.assertEqual(report['errors'][2]['error'], 'dealership must be an integer')
+
+
+class SentimentClientTests(SimpleTestCase):
+
+    def test_each_event_loop_keeps_its_own_async_client(self):
+        client = SentimentClient('http://127.0.0.1:9')
+        both_started = threading.Barrier(2)
+        seen = {}
+
+        async def use(name):
+            first = client._get_async_client()
+            # Both loops are running when the second lookup happens
+            await asyncio.get_running_loop().run_in_executor(None, both_started.wait)
+            seen[name] = (first, client._get_async_client())
+
+        threads = [threading.Thread(target=asyncio.run, args=(use(name),)) for name in 'ab']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        (a1, a2), (b1, b2) = seen['a'], seen['b']
+        self.assertIs(a1, a2)
+        self.assertIs(b1, b2)
+        self.assertIsNot(a1, b1)
+
+        # A new loop drops the clients of the two that have closed
+        async def current():
+            return client._get_async_client()
+        latest = asyncio.run(current())
+        self.assertEqual(list(client._async_clients.values()), [latest])
+
+
+class MetricsTests(TestCase):
+
+    def test_samples_are_labelled_with_the_worker_pid(self):
+        self.client.get('/djangoapp/get_cars/')
+        body = self.client.get('/metrics').content.decode()
+        samples = [line for line in body.splitlines() if line and not line.startswith('#')]
+        self.assertTrue(samples)
+        pid = f'pid="{os.getpid()}"'
+        self.assertEqual([line for line in samples if pid not in line], [])
+
+
+class DealerPagingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.texas = [make_dealer(st='TX') for _ in range(5)]
+        make_dealer(st='CA')
+
+    def walk(self, url, **params):
+        ids, after = [], None
+        while True:
+            page = self.client.get(url, {**params, **({'after': after} if after else {})}).json()
+            ids.extend(dealer['id'] for dealer in page['dealers'])
+            after = page['next']
+            if after is None:
+                return ids
+
+    def test_pages_cover_every_dealer_once(self):
+        self.assertEqual(self.walk('/djangoapp/get_dealers/TX/', limit=2),
+                         [dealer.id for dealer in self.texas])
+        self.assertEqual(len(self.walk('/djangoapp/get_dealers/', limit=4)), 6)
+
+    def test_fields_and_streaming(self):
+        page = self.client.get('/djangoapp/get_dealers/', {'fields': 'id,st', 'limit': 1}).json()
+        self.assertEqual(page['dealers'], [{'id': self.texas[0].id, 'st': 'TX'}])
+        response = self.client.get('/djangoapp/get_dealers/tx/', {'stream': '1', 'fields': 'id'})
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [dealer.id for dealer in self.texas])
+
+    def test_invalid_parameters(self):
+        for params in ({'after': 'x'}, {'limit': '0'}, {'fields': 'id,secret'}):
+            self.assertEqual(self.client.get('/djangoapp/get_dealers/', params).status_code, 400)
+
+
+class ReviewPagingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.dealer = make_dealer()
+        dates = [None, date(2024, 3, 1), date(2024, 1, 1), date(2024, 3, 1), None, date(2024, 2, 1)]
+        self.reviews = [
+            make_review(dealership=self.dealer.id, purchase_date=purchase_date,
+                        sentiment='negative' if n % 3 == 0 else 'positive')
+            for n, purchase_date in enumerate(dates)
+        ]
+        self.url = f'/djangoapp/reviews/dealer/{self.dealer.id}/'
+
+    def walk(self, **params):
+        ids, after = [], None
+        while True:
+            page = self.client.get(
+                self.url, {**params, 'limit': 2, **({'after': after} if after else {})}
+            ).json()
+            ids.extend(review['id'] for review in page['reviews'])
+            after = page['next']
+            if after is None:
+                return ids
+
+    def expected(self, key, reverse=False):
+        dated = sorted((r for r in self.reviews if r.purchase_date), key=key, reverse=reverse)
+        undated = sorted((r for r in self.reviews if not r.purchase_date),
+                         key=lambda r: r.id, reverse=reverse)
+        return [review.id for review in dated + undated]
+
+    def test_pages_follow_each_ordering_with_undated_reviews_last(self):
+        self.assertEqual(self.walk(), [review.id for review in self.reviews])
+        self.assertEqual(self.walk(order='date'),
+                         self.expected(lambda r: (r.purchase_date, r.id)))
+        self.assertEqual(self.walk(order='-date'),
+                         self.expected(lambda r: (r.purchase_date, r.id), reverse=True))
+
+    def test_sentiment_filter_and_dropped_cursor_column(self):
+        self.assertEqual(self.walk(sentiment='negative', order='-date'),
+                         [self.reviews[3].id, self.reviews[0].id])
+        page = self.client.get(self.url, {'order': 'date', 'fields': 'id', 'limit': 1}).json()
+        self.assertEqual(page['reviews'], [{'id': self.reviews[2].id}])
+        self.assertEqual(page['next'], f'2024-01-01:{self.reviews[2].id}')
+
+    def test_invalid_parameters(self):
+        for params in ({'order': 'name'}, {'sentiment': 'angry'},
+                       {'order': 'date', 'after': 'not-a-cursor'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+class ReviewStatsTests(TestCase):
+
+    def counts(self, dealer):
+        stats = DealerReviewStats.objects.get(dealer=dealer)
+        return [stats.review_count, stats.positive_count, stats.negative_count,
+                stats.neutral_count]
+
+    def test_saves_and_deletes_keep_the_counters_in_step(self):
+        first, second = make_dealer(), make_dealer()
+        review = make_review(dealership=first.id, sentiment='positive')
+        make_review(dealership=first.id, sentiment='neutral')
+        self.assertEqual(self.counts(first), [2, 1, 0, 1])
+
+        review = DealerReview.objects.get(id=review.id)
+        review.sentiment = 'negative'
+        review.save()
+        self.assertEqual(self.counts(first), [2, 0, 1, 1])
+
+        review.dealership = second.id
+        review.save()
+        self.assertEqual(self.counts(first), [1, 0, 0, 1])
+        self.assertEqual(self.counts(second), [1, 0, 1, 0])
+
+        review.delete()
+        self.assertEqual(self.counts(second), [0, 0, 0, 0])
+        details = self.client.get(f'/djangoapp/dealer/{first.id}/', {'stats': '1'}).json()
+        self.assertEqual(details['dealer']['review_stats']['neutral'], 1)
+
+
+class PasswordHasherTests(TestCase):
+
+    @override_settings(PBKDF2_ITERATIONS=1000)
+    def test_login_upgrades_a_hash_made_at_another_cost(self):
+        user = User.objects.create_user('pat', password='pw-123456')
+        self.assertEqual(user.password.split('$')[1], '1000')
+        with self.settings(PBKDF2_ITERATIONS=2000):
+            response = self.client.post(
+                '/djangoapp/login/', json.dumps({'userName': 'pat', 'password': 'pw-123456'}),
+                content_type='application/json'
+            )
+        self.assertEqual(response.json()['status'], 'Authenticated')
+        user.refresh_from_db()
+        self.assertEqual(user.password.split('$')[1], '2000')
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# The I/O-bound API views have async variants for ASGI deployments
+api_views = async_views if settings.ASYNC_VIEWS else views
 
 app_name = 'djangoapp'
 
@@ -16,10 +20,15 @@ urlpatterns = [
     
     # API endpoints
     path('get_cars/', views.get_cars, name='get_cars'),
-    path('get_dealers/', views.get_dealerships, name='get_dealers'),
-    path('get_dealers/<str:state>/', views.get_dealerships, name='get_dealers_by_state'),
+    path('cars/search/', views.search_cars, name='search_cars'),
+    path('get_dealers/', api_views.get_dealerships, name='get_dealers'),
+    path('get_dealers/<str:state>/', api_views.get_dealerships, name='get_dealers_by_state'),
+    path('dealers/near/', views.get_nearby_dealers, name='dealers_near'),
     path('dealer/<int:dealer_id>/', views.get_dealer_details, name='dealer_details'),
-    path('reviews/dealer/<int:dealer_id>/', views.get_dealer_reviews, name='dealer_reviews'),
-    path('add_review/', views.add_review, name='add_review'),
-    path('analyzereview/', views.sentiment_analyzer, name='analyze_review'),
+    path('reviews/dealer/<int:dealer_id>/', api_views.get_dealer_reviews, name='dealer_reviews'),
+    path('reviews/search/', views.search_dealer_reviews, name='search_reviews'),
+    path('add_review/', api_views.add_review, name='add_review'),
+    path('reviews/bulk/', views.bulk_import_reviews, name='bulk_import_reviews'),
+    path('export/<str:table>/', views.export_data, name='export_data'),
+    path('analyzereview/', api_views.sentiment_analyzer, name='analyze_review'),
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
@@ -8,9 +8,33 @@ from django.contrib.auth.decorators import login_required
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.cache import get_conditional_response
+from collections import namedtuple
+from datetime import date
+import hashlib
 import json
-import requests
-from .models import CarMake, CarModel, CarDealer, DealerReview
+import math
+from .caching import (
+    REVIEW_STATS_VERSION_NAME, dependent_key, get_or_build, review_version_names, versioned_key
+)
+from .catalog import FacetFilter, catalog_index
+from .conditional import add_stamp, deletes, not_modified, stamp, stamp_key
+from .export import Export, format_watermark, parse_watermark
+from .geo import dealer_index
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
+from .models import CarModel, CarDealer, DealerReview, DealerReviewStats
+from .review_import import DEFAULT_BATCH_SIZE as DEFAULT_IMPORT_BATCH_SIZE
+from .review_import import MAX_BATCH_SIZE as MAX_IMPORT_BATCH_SIZE
+from .review_import import import_reviews, read_csv, read_ndjson
+from .review_stats import STATS_FIELDS, summarize
+from .search import parse_cursor as parse_search_cursor, search_reviews
+from .sentiment_client import get_client
+from .sentiment_queue import PENDING_SENTIMENT, get_worker
 
 
 def index(request):
@@ -98,48 +122,347 @@ def registration(request):
         return JsonResponse({"error": str(e)}, status=400)
 
 
+# Short, since it bounds staleness after writes no version bump reached
+CATALOG_CACHE_TIMEOUT = 60
+
+
+def _build_catalog():
+    """Serialize the whole catalog with a single joined query"""
+    rows = (
+        CarModel.objects
+        .order_by('car_make_id', 'id')
+        .values_list('car_make__name', 'name', 'year', 'type')
+    )
+    car_models = [
+        {
+            "CarMake": make_name,
+            "CarModel": model_name,
+            "CarYear": year,
+            "CarType": car_type
+        }
+        for make_name, model_name, year, car_type in rows
+    ]
+    body = json.dumps({"CarModels": car_models}).encode()
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    return body, etag
+
+
 @api_view(['GET'])
 def get_cars(request):
-    """Get all car makes and models"""
+    """Get all car makes and models
+
+    The body and its ETag are cached under the 'catalog' version, so a
+    warm request, 304 or not, runs no queries. Entries expire after
+    CATALOG_CACHE_TIMEOUT, which bounds how long a worker whose version
+    missed an unsignalled or other-worker write serves the old catalog.
+    """
+    try:
+        key = versioned_key('catalog', 'body')
+        body, etag = get_or_build(key, _build_catalog, CATALOG_CACHE_TIMEOUT)
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        return get_conditional_response(request, etag=etag, response=response)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+CAR_TYPES = tuple(value for value, _ in CarModel.CAR_TYPES)
+CAR_SEARCH_DEFAULT_LIMIT = 50
+
+
+def _parse_list(value):
+    """Parse a comma separated query parameter into its non-empty items"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+@api_view(['GET'])
+def search_cars(request):
+    """Filter the car catalog, with match counts per make, type and year
+
+    Query parameters:
+        make: comma separated make names (case-insensitive)
+        type: comma separated car types, e.g. SUV,SEDAN
+        year_min/year_max: inclusive model year range
+        limit/after: keyset pagination over car model ids
+
+    The facet counts come from the in-memory catalog index; each facet's
+    counts apply every filter except its own.
+    """
+    try:
+        makes = _parse_list(request.GET.get('make'))
+        types = [car_type.upper() for car_type in _parse_list(request.GET.get('type'))]
+        for car_type in types:
+            if car_type not in CAR_TYPES:
+                raise ValueError(f"type must be one of {', '.join(CAR_TYPES)}")
+        year_min = _parse_int(request.GET.get('year_min'), 'year_min')
+        year_max = _parse_int(request.GET.get('year_max'), 'year_max')
+        limit = _parse_int(request.GET.get('limit'), 'limit', minimum=1) or CAR_SEARCH_DEFAULT_LIMIT
+        after = _parse_int(request.GET.get('after'), 'after')
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
     try:
-        car_models = []
-        for make in CarMake.objects.all():
-            for model in CarModel.objects.filter(car_make=make):
-                car_models.append({
-                    "CarMake": make.name,
-                    "CarModel": model.name,
-                    "CarYear": model.year,
-                    "CarType": model.type
-                })
-        return JsonResponse({"CarModels": car_models})
+        selection = FacetFilter(makes, types, year_min, year_max)
+        total, facets = catalog_index.facets(selection)
+
+        car_models = CarModel.objects.order_by('id')
+        if makes:
+            car_models = car_models.filter(car_make_id__in=catalog_index.make_ids(makes))
+        if types:
+            car_models = car_models.filter(type__in=types)
+        if year_min is not None:
+            car_models = car_models.filter(year__gte=year_min)
+        if year_max is not None:
+            car_models = car_models.filter(year__lte=year_max)
+        if after is not None:
+            car_models = car_models.filter(id__gt=after)
+        limit = min(limit, MAX_PAGE_LIMIT)
+        rows = list(
+            car_models.values_list('id', 'car_make__name', 'name', 'year', 'type')[:limit + 1]
+        )
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return JsonResponse({
+            "status": 200,
+            "total": total,
+            "facets": facets,
+            "CarModels": [
+                {
+                    "id": model_id,
+                    "CarMake": make_name,
+                    "CarModel": model_name,
+                    "CarYear": year,
+                    "CarType": car_type
+                }
+                for model_id, make_name, model_name, year, car_type in rows[:limit]
+            ],
+            "next": next_cursor,
+        })
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
+DEALER_FIELDS = (
+    'id', 'city', 'state', 'st', 'address', 'zip',
+    'lat', 'long', 'short_name', 'full_name'
+)
+REVIEW_STATS_LOOKUPS = tuple('review_stats__' + field for field in STATS_FIELDS)
+MAX_PAGE_LIMIT = 1000
+STREAM_CHUNK_SIZE = 2000
+
+
+def _parse_fields(value, allowed):
+    """Parse a comma separated ``fields=`` projection, always keeping id"""
+    if not value:
+        return list(allowed)
+    fields = ['id']
+    for field in value.split(','):
+        field = field.strip()
+        if field not in allowed:
+            raise ValueError(f"Unknown field: {field}")
+        if field not in fields:
+            fields.append(field)
+    return fields
+
+
+def _parse_int(value, name, minimum=None, maximum=None):
+    if value is None or value == '':
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{name} must be at most {maximum}")
+    return number
+
+
+def _add_review_stats(row):
+    """Replace the joined review_stats__* columns with a review_stats object"""
+    row["review_stats"] = summarize(*(row.pop(lookup) for lookup in REVIEW_STATS_LOOKUPS))
+    return row
+
+
+def _unchanged(row):
+    return row
+
+
+def _ndjson_response(rows):
+    """Stream rows as newline delimited JSON while they are fetched"""
+    lines = (json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+    return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+
+def _cached_json(key, build):
+    """JSON response for ``build()``, serialized once per cache key and version"""
+    def serialize():
+        return json.dumps(build(), cls=DjangoJSONEncoder).encode()
+
+    timeout = settings.VIEW_CACHE_TIMEOUT
+    body = get_or_build(key, serialize, timeout) if timeout else serialize()
+    return HttpResponse(body, content_type='application/json')
+
+
+# A parsed list request, shared by the sync views and their async
+# variants in async_views. ``rows`` is the values() queryset (already
+# cut to ``limit`` when streaming), ``present`` finishes one row and
+# ``cursor_of`` turns the last row of a page into its ``next`` cursor;
+# the cache key is built from ``versions`` and ``key_parts``, and the
+# ETag from the ``sources`` querysets the rows come from.
+ListQuery = namedtuple(
+    'ListQuery',
+    'name label rows present limit stream cursor_of versions key_parts sources'
+)
+
+
+def _page_rows(query):
+    """The rows a page needs: one past ``limit`` to tell whether there is a next page"""
+    return query.rows if query.limit is None else query.rows[:query.limit + 1]
+
+
+def _page(query, rows):
+    """Response body for the page of ``rows`` fetched from ``_page_rows``"""
+    if query.limit is None:
+        return {"status": 200, query.name: [query.present(row) for row in rows]}
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[:query.limit]
+        next_cursor = query.cursor_of(rows[-1])
+    return {
+        "status": 200,
+        query.name: [query.present(row) for row in rows],
+        "next": next_cursor
+    }
+
+
+def _list_response(request, query):
+    response_stamp = stamp(query.label, query.sources, query.stream, *query.key_parts)
+    response = not_modified(request, response_stamp)
+    if response is not None:
+        return response
+    if query.stream:
+        response = _ndjson_response(
+            map(query.present, query.rows.iterator(chunk_size=STREAM_CHUNK_SIZE))
+        )
+    else:
+        key = dependent_key(
+            query.label, query.versions, *query.key_parts, stamp_key(response_stamp)
+        )
+        response = _cached_json(key, lambda: _page(query, list(_page_rows(query))))
+    return add_stamp(response, response_stamp)
+
+
+def _dealer_list_query(request, state):
+    """Parse a dealer list request into a ListQuery; raises ValueError"""
+    fields = _parse_fields(request.GET.get('fields'), DEALER_FIELDS)
+    limit = _parse_int(request.GET.get('limit'), 'limit', minimum=1)
+    after = _parse_int(request.GET.get('after'), 'after')
+    with_stats = request.GET.get('stats') == '1'
+    stream = request.GET.get('stream') == '1'
+
+    dealers = CarDealer.objects.order_by('id')
+    if state:
+        dealers = dealers.filter(st=state.upper())
+    if after is not None:
+        dealers = dealers.filter(id__gt=after)
+    if with_stats:
+        rows = dealers.values(*fields, *REVIEW_STATS_LOOKUPS)
+        present = _add_review_stats
+    else:
+        rows = dealers.values(*fields)
+        present = _unchanged
+
+    if stream:
+        if limit is not None:
+            rows = rows[:limit]
+    elif limit is not None:
+        limit = min(limit, MAX_PAGE_LIMIT)
+    versions = ['dealers', REVIEW_STATS_VERSION_NAME] if with_stats else ['dealers']
+    # Unfiltered: a dealer moving to another state must move both lists
+    sources = [CarDealer.objects.all(), deletes('dealers')]
+    if with_stats:
+        sources.append(DealerReviewStats.objects.all())
+    return ListQuery(
+        name='dealers', label='dealer_list', rows=rows, present=present, limit=limit,
+        stream=stream, cursor_of=lambda row: row['id'], versions=versions,
+        key_parts=(state.upper() if state else None, fields, limit, after, with_stats),
+        sources=sources,
+    )
+
+
 @api_view(['GET'])
 def get_dealerships(request, state=None):
-    """Get dealerships, optionally filtered by state"""
+    """Get dealerships, optionally filtered by state
+
+    Query parameters:
+        fields: comma separated subset of DEALER_FIELDS
+        limit/after: keyset pagination on dealer id
+        stream=1: stream every matching row as NDJSON
+        stats=1: include each dealer's review_stats
+    """
     try:
-        if state:
-            dealers = CarDealer.objects.filter(st=state.upper())
-        else:
-            dealers = CarDealer.objects.all()
-        
+        query = _dealer_list_query(request, state)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _list_response(request, query)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+NEAREST_DEFAULT_K = 10
+NEAREST_MAX_K = 100
+
+
+def _parse_float(value, name, minimum=None, maximum=None):
+    if value is None or value == '':
+        raise ValueError(f"{name} is required")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a number")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    if maximum is not None and number > maximum:
+        raise ValueError(f"{name} must be at most {maximum}")
+    return number
+
+
+@api_view(['GET'])
+def get_nearby_dealers(request):
+    """Get the dealers closest to a point, nearest first
+
+    Query parameters:
+        lat/long: the point to search around
+        radius: optional search radius in km
+        k: maximum number of dealers to return
+        fields: comma separated subset of DEALER_FIELDS
+    """
+    try:
+        lat = _parse_float(request.GET.get('lat'), 'lat', -90, 90)
+        lon = _parse_float(request.GET.get('long'), 'long', -180, 180)
+        radius = None
+        if request.GET.get('radius'):
+            radius = _parse_float(request.GET.get('radius'), 'radius', minimum=0)
+        k = _parse_int(request.GET.get('k'), 'k', minimum=1) or NEAREST_DEFAULT_K
+        fields = _parse_fields(request.GET.get('fields'), DEALER_FIELDS)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        matches = dealer_index.nearest(lat, lon, k=min(k, NEAREST_MAX_K), radius_km=radius)
+        rows = CarDealer.objects.filter(id__in=[dealer_id for dealer_id, _ in matches])
+        by_id = {row['id']: row for row in rows.values(*fields)}
         dealer_list = []
-        for dealer in dealers:
-            dealer_list.append({
-                "id": dealer.id,
-                "city": dealer.city,
-                "state": dealer.state,
-                "st": dealer.st,
-                "address": dealer.address,
-                "zip": dealer.zip,
-                "lat": dealer.lat,
-                "long": dealer.long,
-                "short_name": dealer.short_name,
-                "full_name": dealer.full_name
-            })
-        
+        for dealer_id, distance in matches:
+            row = by_id.get(dealer_id)
+            if row is not None:
+                row['distance_km'] = round(distance, 3)
+                dealer_list.append(row)
         return JsonResponse({"status": 200, "dealers": dealer_list})
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -147,8 +470,10 @@ def get_dealerships(request, state=None):
 
 @api_view(['GET'])
 def get_dealer_details(request, dealer_id):
-    """Get dealer details by ID"""
-    try:
+    """Get dealer details by ID, with review_stats when stats=1"""
+    with_stats = request.GET.get('stats') == '1'
+
+    def details():
         dealer = CarDealer.objects.get(id=dealer_id)
         dealer_data = {
             "id": dealer.id,
@@ -162,38 +487,204 @@ def get_dealer_details(request, dealer_id):
             "short_name": dealer.short_name,
             "full_name": dealer.full_name
         }
-        return JsonResponse({"status": 200, "dealer": dealer_data})
+        if with_stats:
+            counts = (
+                DealerReviewStats.objects.filter(dealer_id=dealer.id)
+                .values_list(*STATS_FIELDS).first()
+            )
+            dealer_data["review_stats"] = summarize(*(counts or (0, 0, 0, 0)))
+        return {"status": 200, "dealer": dealer_data}
+
+    try:
+        sources = [CarDealer.objects.filter(id=dealer_id)]
+        if with_stats:
+            sources.append(DealerReviewStats.objects.filter(dealer_id=dealer_id))
+        response_stamp = stamp('dealer', sources, dealer_id, with_stats)
+        response = not_modified(request, response_stamp)
+        if response is not None:
+            return response
+        versions = ['dealers'] + (review_version_names(dealer_id) if with_stats else [])
+        key = dependent_key('dealer', versions, dealer_id, with_stats, stamp_key(response_stamp))
+        response = _cached_json(key, details)
+        return add_stamp(response, response_stamp)
     except CarDealer.DoesNotExist:
         return JsonResponse({"error": "Dealer not found"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
+REVIEW_FIELDS = (
+    'id', 'name', 'dealership', 'review', 'purchase', 'purchase_date',
+    'car_make', 'car_model', 'car_year', 'sentiment'
+)
+REVIEW_SENTIMENTS = ('positive', 'negative', 'neutral', PENDING_SENTIMENT)
+REVIEW_ORDERINGS = {
+    'id': ('id',),
+    'date': (F('purchase_date').asc(nulls_last=True), 'id'),
+    '-date': (F('purchase_date').desc(nulls_last=True), '-id'),
+}
+
+
+def _parse_review_cursor(value, order):
+    """Decode ``after``: a review id, or "<purchase_date>:<id>" for date orderings"""
+    if not value:
+        return None
+    if order == 'id':
+        return (None, _parse_int(value, 'after'))
+    purchase_date, _, review_id = value.rpartition(':')
+    try:
+        return (
+            date.fromisoformat(purchase_date) if purchase_date else None,
+            int(review_id)
+        )
+    except ValueError:
+        raise ValueError("after must be a cursor returned as next")
+
+
+def _review_cursor(row, order):
+    if order == 'id':
+        return row['id']
+    purchase_date = row['purchase_date']
+    return f"{purchase_date.isoformat() if purchase_date else ''}:{row['id']}"
+
+
+def _reviews_after(reviews, order, cursor):
+    """Keyset filter for rows that sort after ``cursor``; undated reviews sort last"""
+    purchase_date, review_id = cursor
+    if order == 'id':
+        return reviews.filter(id__gt=review_id)
+    beyond = 'lt' if order == '-date' else 'gt'
+    if purchase_date is None:
+        return reviews.filter(purchase_date__isnull=True, **{f'id__{beyond}': review_id})
+    return reviews.filter(
+        Q(**{f'purchase_date__{beyond}': purchase_date})
+        | Q(purchase_date=purchase_date, **{f'id__{beyond}': review_id})
+        | Q(purchase_date__isnull=True)
+    )
+
+
+def _dropping(fields):
+    """Drop columns that were only selected to build the cursor"""
+    def present(row):
+        for field in fields:
+            del row[field]
+        return row
+    return present
+
+
+def _dealer_reviews_query(request, dealer_id):
+    """Parse a dealer reviews request into a ListQuery; raises ValueError"""
+    fields = _parse_fields(request.GET.get('fields'), REVIEW_FIELDS)
+    limit = _parse_int(request.GET.get('limit'), 'limit', minimum=1)
+    sentiment = request.GET.get('sentiment')
+    if sentiment and sentiment not in REVIEW_SENTIMENTS:
+        raise ValueError(f"sentiment must be one of {', '.join(REVIEW_SENTIMENTS)}")
+    order = request.GET.get('order') or 'id'
+    if order not in REVIEW_ORDERINGS:
+        raise ValueError(f"order must be one of {', '.join(REVIEW_ORDERINGS)}")
+    cursor = _parse_review_cursor(request.GET.get('after'), order)
+    stream = request.GET.get('stream') == '1'
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_LIMIT)
+    key_parts = (dealer_id, sentiment or None, order, tuple(fields), limit, cursor)
+
+    reviews = DealerReview.objects.filter(dealership=dealer_id)
+    # Every review of the dealer, whatever the sentiment and cursor filters,
+    # so any change moves the ETag of every page; the stats row also moves
+    # when a review is reassigned to another dealer
+    sources = [
+        reviews, deletes('reviews', dealer_id),
+        DealerReviewStats.objects.filter(dealer_id=dealer_id),
+    ]
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    reviews = reviews.order_by(*REVIEW_ORDERINGS[order])
+    if cursor is not None:
+        reviews = _reviews_after(reviews, order, cursor)
+
+    present = _unchanged
+    if order != 'id' and 'purchase_date' not in fields:
+        fields.append('purchase_date')
+        present = _dropping(['purchase_date'])
+    rows = reviews.values(*fields)
+    if stream and limit is not None:
+        rows = rows[:limit]
+    return ListQuery(
+        name='reviews', label='reviews', rows=rows, present=present, limit=limit,
+        stream=stream, cursor_of=lambda row: _review_cursor(row, order),
+        versions=review_version_names(dealer_id), key_parts=key_parts, sources=sources,
+    )
+
+
 @api_view(['GET'])
 def get_dealer_reviews(request, dealer_id):
-    """Get reviews for a specific dealer"""
+    """Get reviews for a specific dealer
+
+    Query parameters:
+        sentiment: only reviews with this sentiment
+        order: id (default), date (oldest purchase first) or -date
+        fields: comma separated subset of REVIEW_FIELDS
+        limit/after: keyset pagination in the chosen order
+        stream=1: stream every matching row as NDJSON
+    """
     try:
-        reviews = DealerReview.objects.filter(dealership=dealer_id)
-        review_list = []
-        for review in reviews:
-            review_list.append({
-                "id": review.id,
-                "name": review.name,
-                "dealership": review.dealership,
-                "review": review.review,
-                "purchase": review.purchase,
-                "purchase_date": review.purchase_date.isoformat() if review.purchase_date else None,
-                "car_make": review.car_make,
-                "car_model": review.car_model,
-                "car_year": review.car_year,
-                "sentiment": review.sentiment
-            })
-        
-        return JsonResponse({"status": 200, "reviews": review_list})
+        query = _dealer_reviews_query(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return _list_response(request, query)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
 
 
+SEARCH_DEFAULT_LIMIT = 20
+
+
+@api_view(['GET'])
+def search_dealer_reviews(request):
+    """Full-text search over review text, best matches first
+
+    Query parameters:
+        q: words that must all appear (a trailing * matches a prefix)
+        dealer: only this dealer's reviews
+        sentiment: only reviews with this sentiment
+        fields: comma separated subset of REVIEW_FIELDS
+        limit/after: keyset pagination in rank order
+    """
+    try:
+        fields = _parse_fields(request.GET.get('fields'), REVIEW_FIELDS)
+        limit = _parse_int(request.GET.get('limit'), 'limit', minimum=1) or SEARCH_DEFAULT_LIMIT
+        dealer_id = _parse_int(request.GET.get('dealer'), 'dealer')
+        sentiment = request.GET.get('sentiment')
+        if sentiment and sentiment not in REVIEW_SENTIMENTS:
+            raise ValueError(f"sentiment must be one of {', '.join(REVIEW_SENTIMENTS)}")
+        cursor = parse_search_cursor(request.GET.get('after'))
+        rows, next_cursor = search_reviews(
+            request.GET.get('q'), fields, dealer_id=dealer_id, sentiment=sentiment,
+            limit=min(limit, MAX_PAGE_LIMIT), cursor=cursor
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    return JsonResponse({"status": 200, "reviews": rows, "next": next_cursor})
+
+
+def _review_fields(data):
+    """DealerReview fields taken from an add_review request body"""
+    return {
+        'name': data.get('name'),
+        'dealership': data.get('dealership'),
+        'review': data.get('review'),
+        'purchase': data.get('purchase', False),
+        'purchase_date': data.get('purchase_date'),
+        'car_make': data.get('car_make'),
+        'car_model': data.get('car_model'),
+        'car_year': data.get('car_year'),
+    }
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def add_review(request):
@@ -201,20 +692,15 @@ def add_review(request):
     try:
         data = json.loads(request.body)
         
-        # Get sentiment analysis
-        sentiment = analyze_review_sentiment(data.get('review', ''))
+        # Get sentiment analysis, or leave it to the background worker
+        if settings.SENTIMENT_MODE == 'deferred':
+            sentiment = PENDING_SENTIMENT
+        else:
+            sentiment = analyze_review_sentiment(data.get('review', ''))
         
-        review = DealerReview.objects.create(
-            name=data.get('name'),
-            dealership=data.get('dealership'),
-            review=data.get('review'),
-            purchase=data.get('purchase', False),
-            purchase_date=data.get('purchase_date'),
-            car_make=data.get('car_make'),
-            car_model=data.get('car_model'),
-            car_year=data.get('car_year'),
-            sentiment=sentiment
-        )
+        review = DealerReview.objects.create(**_review_fields(data), sentiment=sentiment)
+        if sentiment == PENDING_SENTIMENT:
+            transaction.on_commit(lambda: get_worker().enqueue(review.id))
         
         return JsonResponse({
             "status": 200,
@@ -225,20 +711,98 @@ def add_review(request):
         return JsonResponse({"error": str(e)}, status=500)
 
 
-def analyze_review_sentiment(review_text):
-    """Analyze sentiment of review text using Flask microservice"""
+def _request_lines(request):
+    for line in request:
+        yield line.decode('utf-8')
+
+
+IMPORT_READERS = {
+    'text/csv': read_csv,
+    'application/x-ndjson': read_ndjson,
+}
+
+
+@require_http_methods(["POST"])
+def bulk_import_reviews(request):
+    """Import many reviews from a CSV or NDJSON request body; staff only
+
+    The Content-Type picks the reader (text/csv or application/x-ndjson);
+    any other type gets 415. Being session authenticated, the request needs
+    the CSRF token like any other form post.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+    reader = IMPORT_READERS.get(request.content_type)
+    if reader is None:
+        return JsonResponse({
+            "error": f"Content-Type must be one of {', '.join(IMPORT_READERS)}"
+        }, status=415)
     try:
-        response = requests.post(
-            'http://localhost:5000/analyzereview',
-            json={'review': review_text},
-            timeout=5
+        batch_size = _parse_int(
+            request.GET.get('batch_size'), 'batch_size', minimum=1, maximum=MAX_IMPORT_BATCH_SIZE
         )
-        if response.status_code == 200:
-            return response.json().get('sentiment', 'neutral')
-        else:
-            return 'neutral'
-    except:
-        return 'neutral'
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        report = import_reviews(
+            reader(_request_lines(request)),
+            batch_size=batch_size or DEFAULT_IMPORT_BATCH_SIZE,
+            score=request.GET.get('score') != '0',
+        )
+        return JsonResponse({"status": 200, **report.as_dict()})
+    except UnicodeDecodeError:
+        return JsonResponse({"error": "Request body must be UTF-8"}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+def export_data(request, table):
+    """Download every dealer or review as a streamed file; staff only
+
+    Query parameters:
+        format: ndjson (default), csv or parquet
+        gzip=0: leave NDJSON or CSV uncompressed
+        since: only rows changed after this watermark (ISO 8601)
+        deleted=1: ids of the rows deleted since the watermark instead
+
+    The X-Export-Watermark header holds the ``since`` for the next
+    incremental export.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+    try:
+        export = Export(
+            table, request.GET.get('format', 'ndjson'),
+            since=parse_watermark(request.GET.get('since')),
+            compress=request.GET.get('gzip') != '0',
+            deleted=request.GET.get('deleted') == '1'
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(export.chunks(), content_type=export.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export.filename}"'
+    watermark = format_watermark(export.next_since)
+    if watermark:
+        response['X-Export-Watermark'] = watermark
+    return response
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """Process metrics in the Prometheus text exposition format
+
+    Only this worker's metrics: under gunicorn or uvicorn with several
+    workers each scrape sees one of them, told apart by the pid label.
+    """
+    return HttpResponse(metrics_registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+def analyze_review_sentiment(review_text):
+    """Analyze sentiment of review text using Flask microservice"""
+    return get_client().analyze(review_text)
 
 
 @api_view(['POST'])
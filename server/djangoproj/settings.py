@@ -3,7 +3,9 @@ Django settings for djangoproj project.
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,8 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'djangoapp.performance.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'djangoapp.middleware.AsyncWhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,14 +63,151 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'djangoproj.wsgi.application'
+ASGI_APPLICATION = 'djangoproj.asgi.application'
+
+# How start.sh serves the project: 'wsgi' (sync gunicorn workers), 'asgi'
+# (uvicorn workers under gunicorn) or 'dev' (runserver). ASYNC_VIEWS routes
+# the I/O-bound API views to djangoapp.async_views; it defaults to on for asgi.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', str(SERVER_MODE == 'asgi')) == 'True'
 
 # Database
+# SQLITE_PROFILE=wal (the default) runs SQLite in WAL mode so readers and
+# the writer do not block each other, syncs only at checkpoints, waits up
+# to SQLITE_BUSY_TIMEOUT ms for locks and begins atomic() blocks with
+# BEGIN IMMEDIATE; SQLITE_PROFILE=default keeps SQLite's stock settings.
+SQLITE_PATH = str(os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'))
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'wal')
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))
+SQLITE_PROFILES = {
+    'default': {},
+    'wal': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': SQLITE_BUSY_TIMEOUT,
+            'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+            'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', '20000')),
+            'temp_store': 'MEMORY',
+        },
+        'transaction_mode': 'IMMEDIATE',
+    },
+}
+_sqlite_options = SQLITE_PROFILES[SQLITE_PROFILE]
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'djangoapp.db.sqlite3',
+        'NAME': SQLITE_PATH,
+        'OPTIONS': dict(_sqlite_options),
+        # Seconds a worker keeps its connection between requests. Under ASGI
+        # each request runs its queries on its own thread, so persistent
+        # connections would pile up; they are off by default there.
+        'CONN_MAX_AGE': int(os.environ.get(
+            'SQLITE_CONN_MAX_AGE', '0' if SERVER_MODE == 'asgi' else '600'
+        )),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Route djangoapp reads to a second, read-only connection (djangoapp.routers)
+if os.environ.get('SQLITE_READ_ONLY_ROUTING', 'False') == 'True':
+    _read_pragmas = {
+        name: value for name, value in _sqlite_options.get('pragmas', {}).items()
+        if name not in ('journal_mode', 'synchronous')
+    }
+    DATABASES['readonly'] = {
+        **DATABASES['default'],
+        'NAME': f'file:{SQLITE_PATH}?mode=ro',
+        'OPTIONS': {'pragmas': _read_pragmas},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['djangoapp.routers.ReadOnlyRouter']
+
+# Cache backend: 'locmem' (per process), 'file' (shared by every worker on
+# the host) or 'redis' (shared across hosts; needs the redis package).
+# Cache versions live here too, so only a shared backend makes a write
+# in one worker invalidate the others immediately; with locmem other
+# workers catch up within VIEW_CACHE_TIMEOUT.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'djangoapp'),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(tempfile.gettempdir(), 'djangoapp-cache')
+    ),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': 300,
+    }
+}
+if CACHE_BACKEND != 'redis':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '10000')),
+    }
+# cached_db sessions. A logout must reach every worker, so a per-process
+# locmem default is swapped for the host-wide file cache.
+SESSION_CACHE_BACKEND = os.environ.get(
+    'SESSION_CACHE_BACKEND', 'file' if CACHE_BACKEND == 'locmem' else CACHE_BACKEND
+)
+if SESSION_CACHE_BACKEND == 'file':
+    _session_cache_location = os.path.join(tempfile.gettempdir(), 'djangoapp-sessions')
+elif SESSION_CACHE_BACKEND == CACHE_BACKEND:
+    _session_cache_location = CACHES['default']['LOCATION']
+else:
+    _session_cache_location = CACHE_BACKENDS[SESSION_CACHE_BACKEND][1]
+CACHES['sessions'] = {
+    'BACKEND': CACHE_BACKENDS[SESSION_CACHE_BACKEND][0],
+    'LOCATION': os.environ.get('SESSION_CACHE_LOCATION', _session_cache_location),
+}
+# Seconds a cached dealer/review response may be served (0 disables)
+VIEW_CACHE_TIMEOUT = int(os.environ.get('VIEW_CACHE_TIMEOUT', '300'))
+
+# AUTH_PROFILE=fast takes logins and session lookups off SQLite: sessions
+# use the cached_db backend (reads come from the 'sessions' cache, the
+# table is only written on login and logout) and new password hashes use
+# Argon2 when argon2-cffi is installed. AUTH_PROFILE=default keeps
+# database sessions and Django's PBKDF2. SESSION_BACKEND and
+# PASSWORD_HASHER override either choice.
+AUTH_PROFILE = os.environ.get('AUTH_PROFILE', 'default')
+AUTH_PROFILES = {
+    'default': {'session': 'db', 'hasher': 'pbkdf2'},
+    'fast': {
+        'session': 'cached_db',
+        'hasher': 'argon2' if importlib.util.find_spec('argon2') else 'pbkdf2',
+    },
+}
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    # No server-side state at all, but sessions cannot be revoked before
+    # they expire and their contents are readable (signed, not encrypted)
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', AUTH_PROFILES[AUTH_PROFILE]['session'])
+
+# Cost of new password hashes; hashes made at another cost are upgraded
+# on the user's next login. Stored hashes of every listed algorithm keep
+# verifying, so the preferred hasher can change at any time.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', AUTH_PROFILES[AUTH_PROFILE]['hasher'])
+PASSWORD_HASHER_CLASSES = {
+    'pbkdf2': 'djangoapp.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'djangoapp.hashers.TunedArgon2PasswordHasher',
+    'bcrypt': 'djangoapp.hashers.TunedBCryptSHA256PasswordHasher',
+}
+PASSWORD_HASHERS = [PASSWORD_HASHER_CLASSES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CLASSES.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', '600000'))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', '19456'))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '1'))
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -118,6 +258,56 @@ REST_FRAMEWORK = {
     ],
 }
 
-# Session settings
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
-SESSION_COOKIE_AGE = 86400  # 24 hours
\ No newline at end of file
+# Session settings (backend chosen by AUTH_PROFILE above). Expired rows
+# are pruned by `manage.py clearsessions`, run by the Procfile on start;
+# long-lived deployments should also run it daily.
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'sessions'
+SESSION_COOKIE_AGE = 86400  # 24 hours
+
+# Sentiment analyzer microservice
+SENTIMENT_ANALYZER_URL = os.environ.get('SENTIMENT_ANALYZER_URL', 'http://localhost:5000')
+SENTIMENT_CONNECT_TIMEOUT = float(os.environ.get('SENTIMENT_CONNECT_TIMEOUT', '1'))
+SENTIMENT_READ_TIMEOUT = float(os.environ.get('SENTIMENT_READ_TIMEOUT', '3'))
+SENTIMENT_POOL_SIZE = int(os.environ.get('SENTIMENT_POOL_SIZE', '10'))
+# Consecutive failures before calls are skipped, and how long they are skipped for
+SENTIMENT_BREAKER_THRESHOLD = int(os.environ.get('SENTIMENT_BREAKER_THRESHOLD', '5'))
+SENTIMENT_BREAKER_RESET_TIMEOUT = float(os.environ.get('SENTIMENT_BREAKER_RESET_TIMEOUT', '30'))
+# 'sync' scores a review before add_review stores it; 'deferred' stores it as
+# 'pending' and scores it in batches on a background thread
+SENTIMENT_MODE = os.environ.get('SENTIMENT_MODE', 'sync')
+SENTIMENT_BATCH_SIZE = int(os.environ.get('SENTIMENT_BATCH_SIZE', '100'))
+SENTIMENT_BATCH_WAIT = float(os.environ.get('SENTIMENT_BATCH_WAIT', '0.05'))
+# Memoized labels per normalized review text (0 disables); name a CACHES
+# alias in SENTIMENT_CACHE_ALIAS to share results between worker processes
+SENTIMENT_CACHE_SIZE = int(os.environ.get('SENTIMENT_CACHE_SIZE', '10000'))
+SENTIMENT_CACHE_TTL = float(os.environ.get('SENTIMENT_CACHE_TTL', '86400'))
+SENTIMENT_CACHE_ALIAS = os.environ.get('SENTIMENT_CACHE_ALIAS', '')
+
+# Per-request instrumentation (djangoapp.performance)
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', 'True') == 'True'
+# Opt-in log of sampled slow requests with their slowest SQL statements
+PERF_SLOW_LOG = os.environ.get('PERF_SLOW_LOG', 'False') == 'True'
+PERF_SLOW_REQUEST_MS = float(os.environ.get('PERF_SLOW_REQUEST_MS', '500'))
+PERF_SLOW_SAMPLE_RATE = float(os.environ.get('PERF_SLOW_SAMPLE_RATE', '1'))
+PERF_SLOW_TOP_QUERIES = int(os.environ.get('PERF_SLOW_TOP_QUERIES', '5'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'djangoapp': {
+            'handlers': ['console'],
+            'level': os.environ.get('DJANGOAPP_LOG_LEVEL', 'WARNING'),
+        },
+        # PERF_LOG_LEVEL=INFO logs one JSON line per request
+        'djangoapp.performance': {
+            'level': os.environ.get('PERF_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
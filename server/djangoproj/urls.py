@@ -3,9 +3,11 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from djangoapp.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('djangoapp/', include('djangoapp.urls')),
     path('', include('djangoapp.urls')),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
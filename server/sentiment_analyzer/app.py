@@ -1,6 +1,12 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import re
+import collections
+import json
+import time
+
+import metrics
+from cache import build_cache, text_key
+from lexicon import Lexicon, load_lexicon
 
 app = Flask(__name__)
 CORS(app)
@@ -20,28 +26,131 @@ NEGATIVE_WORDS = [
     'angry', 'frustrated', 'waste', 'regret', 'never', 'avoid'
 ]
 
-def analyze_sentiment(text):
-    """
-    Analyze sentiment of text using simple keyword matching
-    Returns: 'positive', 'negative', or 'neutral'
-    """
-    if not text:
-        return 'neutral'
-    
-    # Convert to lowercase and remove punctuation
-    text = re.sub(r'[^\w\s]', ' ', text.lower())
-    words = text.split()
-    
-    positive_score = sum(1 for word in words if word in POSITIVE_WORDS)
-    negative_score = sum(1 for word in words if word in NEGATIVE_WORDS)
-    
-    if positive_score > negative_score:
+# Multi-word phrases score as a unit instead of as their separate words
+PHRASES = {
+    'not good': -1, 'not great': -1, 'not happy': -1, 'not satisfied': -1,
+    'not recommend': -1, 'not helpful': -1, 'not professional': -1,
+    'not bad': 1, 'no problem': 1, 'no problems': 1, 'no issues': 1,
+    'highly recommend': 2, 'would recommend': 1, 'never again': -2,
+    'waste of time': -2, 'waste of money': -2,
+}
+
+# Built once at startup; set SENTIMENT_LEXICON to load a weighted lexicon file
+LEXICON = load_lexicon(
+    default=Lexicon.from_word_lists(POSITIVE_WORDS, NEGATIVE_WORDS, PHRASES)
+)
+
+# Labels memoized by normalized text; see cache.py
+SENTIMENT_CACHE = build_cache()
+
+MAX_BATCH_SIZE = 10000
+NDJSON_CHUNK_SIZE = 1000
+METRIC_METHODS = frozenset(['GET', 'HEAD', 'POST', 'OPTIONS'])
+
+
+def _label(score):
+    if score > 0:
         return 'positive'
-    elif negative_score > positive_score:
+    elif score < 0:
         return 'negative'
     else:
         return 'neutral'
 
+
+def analyze_sentiment(text):
+    """
+    Analyze sentiment of text using weighted keyword and phrase matching
+    Returns: 'positive', 'negative', or 'neutral'
+    Single reviews are memoized in SENTIMENT_CACHE; batches are mostly
+    distinct texts, where hashing would cost more than scoring.
+    """
+    cache = SENTIMENT_CACHE
+    if cache is None or not isinstance(text, str):
+        return analyze_sentiments([text])[0]
+    key = text_key(text)
+    sentiment = cache.get(key)
+    if sentiment is not None:
+        metrics.sentiment_cache.inc('hit')
+        metrics.sentiment_labels.inc(sentiment)
+        return sentiment
+    metrics.sentiment_cache.inc('miss')
+    sentiment = analyze_sentiments([text])[0]
+    evicted = cache.set(key, sentiment)
+    if evicted:
+        metrics.sentiment_cache_evictions.inc(amount=evicted)
+    return sentiment
+
+
+def analyze_sentiments(texts):
+    """
+    Analyze sentiment of a batch of texts in a single pass
+    Returns: list of 'positive', 'negative', or 'neutral' in input order
+    """
+    score = LEXICON.score
+    sentiments = [_label(score(text)) for text in texts]
+    for sentiment, count in collections.Counter(sentiments).items():
+        metrics.sentiment_labels.inc(sentiment, amount=count)
+    return sentiments
+
+
+def _review_text(item):
+    """Accept either a bare string or a {"review": "..."} object"""
+    if isinstance(item, dict):
+        item = item.get('review')
+    if item is None:
+        return ''
+    if not isinstance(item, str):
+        raise ValueError('Each review must be a string or {"review": "..."}')
+    return item
+
+
+def _stream_ndjson_sentiments(lines):
+    """Score an NDJSON request body chunk by chunk, one result per line"""
+    def score_chunk(chunk):
+        texts = []
+        errors = {}
+        for position, line in enumerate(chunk):
+            try:
+                texts.append(_review_text(json.loads(line)))
+            except ValueError as e:
+                texts.append('')
+                errors[position] = str(e)
+        for position, sentiment in enumerate(analyze_sentiments(texts)):
+            if position in errors:
+                yield json.dumps({'error': errors[position]}) + '\n'
+            else:
+                yield json.dumps({'sentiment': sentiment}) + '\n'
+
+    chunk = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        chunk.append(line)
+        if len(chunk) >= NDJSON_CHUNK_SIZE:
+            yield from score_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from score_chunk(chunk)
+
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    # Streamed responses are timed up to their headers
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.endpoint or '<unresolved>'
+        method = request.method if request.method in METRIC_METHODS else 'OTHER'
+        metrics.http_requests.inc(endpoint, method, str(response.status_code))
+        metrics.http_request_duration.observe(time.perf_counter() - started, endpoint)
+    return response
+
+
 @app.route('/analyzereview', methods=['POST'])
 def analyze_review():
     """
@@ -66,11 +175,57 @@ def analyze_review():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/analyzereviews', methods=['POST'])
+def analyze_reviews():
+    """
+    Analyze sentiment of a batch of reviews
+    Expected JSON: {"reviews": ["text", ...]} or ["text", ...]
+    Returns: {"sentiments": ["positive/negative/neutral", ...]} in input order
+    An application/x-ndjson body is answered with one {"sentiment": ...}
+    line per input line, streamed as the batch is scored.
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            lines = (line.decode('utf-8') for line in request.stream)
+            return Response(
+                stream_with_context(_stream_ndjson_sentiments(lines)),
+                mimetype='application/x-ndjson'
+            )
+
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('reviews')
+        if not isinstance(data, list):
+            return jsonify({'error': 'A list of reviews is required'}), 400
+        if len(data) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'At most {MAX_BATCH_SIZE} reviews per request; use NDJSON for larger batches'
+            }), 413
+
+        try:
+            texts = [_review_text(item) for item in data]
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({'sentiments': analyze_sentiments(texts)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'sentiment-analyzer'})
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Service metrics in the Prometheus text exposition format
+    Only this worker's metrics: with several workers each scrape sees one
+    of them, told apart by the pid label (see metrics.py).
+    """
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
     """Home endpoint with service information"""
@@ -79,7 +234,9 @@ def home():
         'version': '1.0.0',
         'endpoints': {
             '/analyzereview': 'POST - Analyze sentiment of review text',
-            '/health': 'GET - Health check'
+            '/analyzereviews': 'POST - Analyze sentiment of a batch of reviews',
+            '/health': 'GET - Health check',
+            '/metrics': 'GET - Prometheus metrics'
         }
     })
 
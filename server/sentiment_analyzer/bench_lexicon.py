@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: list-scan keyword matching vs the hashed lexicon scorer
+
+Usage: python bench_lexicon.py [--reviews 1000000] [--words 40] [--seed 7]
+                               [--lexicon-words 0]
+
+--lexicon-words pads both lexicons with that many synthetic terms to show
+how each implementation scales with lexicon size.
+
+The corpus cycles through a pool of generated reviews so that memory stays
+small even for millions of reviews.
+"""
+import argparse
+import itertools
+import random
+import re
+import time
+
+from app import NEGATIVE_WORDS, POSITIVE_WORDS, PHRASES, _label
+from lexicon import Lexicon
+
+FILLER_WORDS = [
+    'the', 'car', 'dealer', 'was', 'and', 'staff', 'price', 'service', 'my',
+    'new', 'sedan', 'they', 'very', 'not', 'no', 'highly', 'would', 'of',
+    'time', 'again', 'financing', 'test', 'drive', 'paperwork', 'trade',
+]
+POOL_SIZE = 10000
+BATCH_SIZE = 1000
+
+
+def legacy_analyze_sentiment(text, positive_words, negative_words):
+    """The original implementation: re.sub plus list membership checks"""
+    if not text:
+        return 'neutral'
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    words = text.split()
+    positive_score = sum(1 for word in words if word in positive_words)
+    negative_score = sum(1 for word in words if word in negative_words)
+    if positive_score > negative_score:
+        return 'positive'
+    elif negative_score > positive_score:
+        return 'negative'
+    else:
+        return 'neutral'
+
+
+def build_pool(words_per_review, seed):
+    rng = random.Random(seed)
+    vocabulary = FILLER_WORDS * 4 + POSITIVE_WORDS + NEGATIVE_WORDS
+    phrases = list(PHRASES)
+    pool = []
+    for _ in range(POOL_SIZE):
+        words = [rng.choice(vocabulary) for _ in range(words_per_review)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+        pool.append(' '.join(words).capitalize() + rng.choice(['.', '!', '?']))
+    return pool
+
+
+def corpus(pool, reviews):
+    return itertools.islice(itertools.cycle(pool), reviews)
+
+
+def run(name, score_batch, pool, reviews):
+    labels = {'positive': 0, 'negative': 0, 'neutral': 0}
+    started = time.perf_counter()
+    reviews_iter = corpus(pool, reviews)
+    while True:
+        batch = list(itertools.islice(reviews_iter, BATCH_SIZE))
+        if not batch:
+            break
+        for label in score_batch(batch):
+            labels[label] += 1
+    elapsed = time.perf_counter() - started
+    print(f'{name:<8} {elapsed:8.2f}s {reviews / elapsed:12,.0f} reviews/s  {labels}')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reviews', type=int, default=1000000)
+    parser.add_argument('--words', type=int, default=40, help='words per review')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--lexicon-words', type=int, default=0,
+                        help='synthetic terms added to each word list')
+    args = parser.parse_args()
+
+    padding = args.lexicon_words
+    positive = POSITIVE_WORDS + [f'positiveterm{i}' for i in range(padding)]
+    negative = NEGATIVE_WORDS + [f'negativeterm{i}' for i in range(padding)]
+    lexicon = Lexicon.from_word_lists(positive, negative, PHRASES)
+
+    pool = build_pool(args.words, args.seed)
+    print(f'{args.reviews:,} reviews, {args.words} words each, '
+          f'{len(positive) + len(negative):,} lexicon words')
+    legacy_seconds = run(
+        'legacy',
+        lambda batch: [legacy_analyze_sentiment(t, positive, negative) for t in batch],
+        pool, args.reviews
+    )
+    lexicon_seconds = run(
+        'lexicon',
+        lambda batch: [_label(lexicon.score(t)) for t in batch],
+        pool, args.reviews
+    )
+    print(f'speedup  {legacy_seconds / lexicon_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
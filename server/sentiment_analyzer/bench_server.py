@@ -0,0 +1,157 @@
+"""
+Benchmark: requests/sec of serve.py against its worker count
+
+Usage: python bench_server.py [--workers 1 2 4] [--clients 8] [--seconds 10]
+                              [--endpoint single|batch] [--batch-size 100]
+
+For each worker count a fresh `serve.py` is started on a free port and
+hammered by --clients client processes over keep-alive connections, each
+posting reviews from the bench_lexicon pool. The sentiment cache is
+disabled so every request is scored. Client processes compete with the
+server for CPU, so on a machine with C cores expect scaling up to
+roughly C workers; the table prints the core count for that reason.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_lexicon import build_pool
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('serve.py exited during startup')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'serve.py did not answer on port {port} within {timeout}s')
+
+
+def client(port, path, bodies, start_at, deadline, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/json'}
+    latencies = []
+    errors = 0
+    index = 0
+    while time.time() < start_at:
+        time.sleep(0.005)
+    while time.time() < deadline:
+        body = bodies[index % len(bodies)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    results.put((latencies, errors))
+
+
+def request_bodies(args):
+    pool = build_pool(args.words, args.seed)
+    if args.endpoint == 'single':
+        return '/analyzereview', [json.dumps({'review': text}) for text in pool]
+    batches = [pool[i:i + args.batch_size] for i in range(0, len(pool), args.batch_size)]
+    return '/analyzereviews', [json.dumps({'reviews': batch}) for batch in batches]
+
+
+def run_workers(workers, path, bodies, args):
+    port = _free_port()
+    env = dict(os.environ, SENTIMENT_CACHE_SIZE='0')
+    process = subprocess.Popen(
+        [sys.executable, 'serve.py', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--log-level', 'warning'],
+        cwd=SERVICE_DIR, env=env,
+    )
+    try:
+        _wait_for(port, process)
+        results = multiprocessing.Queue()
+        start_at = time.time() + 1
+        deadline = start_at + args.seconds
+        clients = [
+            multiprocessing.Process(
+                target=client,
+                args=(port, path, bodies[n::args.clients] or bodies, start_at, deadline, results)
+            )
+            for n in range(args.clients)
+        ]
+        for proc in clients:
+            proc.start()
+        collected = [results.get() for _ in clients]
+        for proc in clients:
+            proc.join()
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    latencies = sorted(latency for batch, _ in collected for latency in batch)
+    return {
+        'requests_per_second': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)], 2) if latencies else None,
+        'errors': sum(errors for _, errors in collected),
+    }
+
+
+def main():
+    cores = multiprocessing.cpu_count()
+    default_workers = sorted({1 << i for i in range(cores.bit_length())} | {2, cores})
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=default_workers)
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--endpoint', choices=['single', 'batch'], default='single')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--words', type=int, default=40, help='words per review')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='also write the results to this JSON file')
+    args = parser.parse_args()
+
+    path, bodies = request_bodies(args)
+    print(f'{cores} cores, {args.clients} clients, {args.endpoint} requests, {args.seconds:g}s each')
+    results = {}
+    for workers in args.workers:
+        results[workers] = run_workers(workers, path, bodies, args)
+
+    baseline = results[args.workers[0]]['requests_per_second'] or 1
+    print(f"\n{'workers':>7}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}{'scaling':>9}")
+    for workers, result in results.items():
+        print(f"{workers:>7}{result['requests_per_second']:>10}{result['p50_ms']!s:>9}"
+              f"{result['p95_ms']!s:>9}{result['errors']:>8}"
+              f"{result['requests_per_second'] / baseline:>8.2f}x")
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump({'cores': cores, 'args': vars(args), 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
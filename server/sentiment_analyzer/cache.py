@@ -0,0 +1,70 @@
+"""
+Bounded LRU/TTL memo of sentiment labels keyed by normalized review text.
+
+The same text scores the same until the lexicon changes, which only
+happens on restart, so a review the UI re-checks as the user types and
+re-submits is answered from memory. Case and runs of whitespace never
+change a score, so texts are normalized before hashing; the hash keeps
+long reviews from pinning large keys. Set SENTIMENT_CACHE_SIZE=0 to
+disable.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def text_key(text):
+    return hashlib.blake2b(normalize(text).encode('utf-8'), digest_size=16).digest()
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL, counting hits, misses and evictions"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+
+def build_cache():
+    """The cache configured by SENTIMENT_CACHE_SIZE/SENTIMENT_CACHE_TTL, or None"""
+    size = int(os.environ.get('SENTIMENT_CACHE_SIZE', '10000'))
+    if size <= 0:
+        return None
+    return LRUCache(size, float(os.environ.get('SENTIMENT_CACHE_TTL', '86400')))
@@ -0,0 +1,141 @@
+"""
+Weighted sentiment lexicons for the analyzer.
+
+A lexicon maps single words and multi-word phrases ("not good",
+"highly recommend") to weights. Everything is frozen into hashed lookups
+when the lexicon is built. Scoring a review is one tokenizer pass and a dict
+lookup per token; only reviews containing a word that can start a phrase
+get their phrase positions checked against the phrase table (longest
+phrase first), and a matched phrase replaces the weights of its words.
+
+Lexicon files are either JSON:
+
+    {"words": {"great": 1, "awful": -2}, "phrases": {"not good": -1}}
+
+or tab separated ``term<TAB>weight`` lines, where a term containing
+spaces is a phrase. Lines starting with ``#`` are ignored.
+"""
+import json
+import os
+import re
+from types import MappingProxyType
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# ASCII characters that are neither word characters nor whitespace
+_ASCII_SEPARATORS = {
+    code: ' ' for code in range(128) if not re.match(r'[\w\s]', chr(code))
+}
+
+
+def tokenize(text):
+    """Lowercase word tokens, matching the analyzer's punctuation handling"""
+    text = text.lower()
+    if text.isascii():
+        # Same tokens as TOKEN_PATTERN, without running the regex engine
+        return text.translate(_ASCII_SEPARATORS).split()
+    return TOKEN_PATTERN.findall(text)
+
+
+class Lexicon:
+    """Immutable word and phrase weights with a single-pass scorer"""
+
+    def __init__(self, words, phrases=None):
+        self._words = dict(words)
+        self.words = MappingProxyType(self._words)
+        phrase_table = {}
+        for phrase, weight in (phrases or {}).items():
+            tokens = tuple(tokenize(phrase))
+            if len(tokens) == 1:
+                raise ValueError(f'Phrase "{phrase}" has a single word; add it to words')
+            if tokens:
+                phrase_table[tokens] = weight
+        self.phrases = MappingProxyType(phrase_table)
+
+        # A matched phrase replaces the weights its words already added
+        self._phrase_adjustments = {
+            tokens: weight - sum(self._words.get(token, 0) for token in tokens)
+            for tokens, weight in phrase_table.items()
+        }
+        self.phrase_heads = frozenset(tokens[0] for tokens in phrase_table)
+        self._phrase_lengths = tuple(sorted({len(t) for t in phrase_table}, reverse=True))
+
+    @classmethod
+    def from_word_lists(cls, positive, negative, phrases=None):
+        """Build a lexicon weighting positive words +1 and negative words -1"""
+        words = {word: 1 for word in positive}
+        words.update({word: -1 for word in negative})
+        return cls(words, phrases)
+
+    def __len__(self):
+        return len(self.words) + len(self.phrases)
+
+    def score(self, text):
+        """Sum of the weights of every word and phrase in ``text``"""
+        if not text:
+            return 0
+        tokens = tokenize(text)
+        words = self._words
+        total = sum([words[token] for token in tokens if token in words])
+        if self.phrase_heads and not self.phrase_heads.isdisjoint(tokens):
+            total += self._phrase_adjustment(tokens)
+        return total
+
+    def _phrase_adjustment(self, tokens):
+        heads = self.phrase_heads
+        adjustments = self._phrase_adjustments
+        count = len(tokens)
+        adjustment = 0
+        next_free = 0
+        for i in [i for i, token in enumerate(tokens) if token in heads]:
+            if i < next_free:
+                continue
+            for length in self._phrase_lengths:
+                if i + length <= count:
+                    value = adjustments.get(tuple(tokens[i:i + length]))
+                    if value is not None:
+                        adjustment += value
+                        next_free = i + length
+                        break
+        return adjustment
+
+
+def _read_lexicon_file(path):
+    with open(path, encoding='utf-8') as handle:
+        if path.endswith('.json'):
+            data = json.load(handle)
+            return data.get('words', {}), data.get('phrases', {})
+
+        words = {}
+        phrases = {}
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                term, weight = line.rsplit('\t', 1)
+                weight = float(weight)
+            except ValueError:
+                raise ValueError(f'{path}:{line_number}: expected "term<TAB>weight"')
+            term = ' '.join(tokenize(term))
+            if not term:
+                continue
+            if ' ' in term:
+                phrases[term] = weight
+            else:
+                words[term] = weight
+        return words, phrases
+
+
+def load_lexicon(path=None, default=None):
+    """
+    Load the lexicon named by ``path`` or the SENTIMENT_LEXICON variable
+    Falls back to ``default`` when neither is set.
+    """
+    path = path or os.environ.get('SENTIMENT_LEXICON')
+    if not path:
+        if default is None:
+            raise ValueError('No lexicon path given and no default lexicon')
+        return default
+    words, phrases = _read_lexicon_file(path)
+    return Lexicon(words, phrases)
@@ -0,0 +1,34 @@
+"""
+The sentiment service's metrics, served at /metrics.
+
+The registry comes from metrics_core, which the Django app imports too.
+Under serve.py each worker process has its own registry, and a scrape
+reaches whichever worker accepts it. Every sample is labelled with that
+worker's pid, so sum without the pid label for totals.
+"""
+from metrics_core import CONTENT_TYPE, Registry
+
+# Scoring a review takes well under a millisecond
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+registry = Registry(buckets=DEFAULT_BUCKETS)
+
+http_requests = registry.counter(
+    'sentiment_http_requests_total', 'HTTP requests by endpoint, method and status',
+    labels=('endpoint', 'method', 'status')
+)
+http_request_duration = registry.histogram(
+    'sentiment_http_request_duration_seconds', 'Time to produce a response by endpoint',
+    labels=('endpoint',)
+)
+sentiment_labels = registry.counter(
+    'sentiment_labels_total', 'Reviews scored, by resulting sentiment label',
+    labels=('sentiment',)
+)
+sentiment_cache = registry.counter(
+    'sentiment_cache_requests_total', 'Sentiment cache lookups by result (hit, miss)',
+    labels=('result',)
+)
+sentiment_cache_evictions = registry.counter(
+    'sentiment_cache_evictions_total', 'Entries evicted from the sentiment cache'
+)
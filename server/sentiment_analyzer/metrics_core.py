@@ -0,0 +1,140 @@
+"""
+Counter and histogram registry in the Prometheus text exposition format,
+shared by the sentiment service (metrics.py) and the Django app
+(djangoapp/metrics.py). Stdlib only, so the service can run on its own.
+
+Counters and histograms are plain dicts keyed by label values behind one
+lock per metric, so recording is a dict update and a scrape only walks
+the series that exist. Histograms keep per-bucket counts and make them
+cumulative when rendered. Label values must come from small fixed sets
+(URL names, sentiment labels), never from user input.
+
+Each worker process has its own registry, and a scrape through the
+server reaches whichever worker accepts it. Every sample is labelled with
+that worker's pid, so the workers' series stay apart instead of seeming
+to jump back and forth; sum them without the pid label for totals. A
+worker's series start again from zero when it is restarted.
+"""
+import bisect
+import os
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self, extra=()):
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in sorted(values):
+            yield self.name + _format_labels(self.label_names, label_values, extra), value
+
+
+class Histogram:
+    """Observation counts per bucket, plus their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self, extra=()):
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        bounds = self.buckets + (float('inf'),)
+        for label_values, series in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                labels = _format_labels(self.label_names, label_values,
+                                        [*extra, ('le', _format_value(float(bound)))])
+                yield f'{self.name}_bucket{labels}', cumulative
+            labels = _format_labels(self.label_names, label_values, extra)
+            yield f'{self.name}_sum{labels}', series[-1]
+            yield f'{self.name}_count{labels}', cumulative
+
+
+class Registry:
+    """A named set of metrics rendered together"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=None):
+        """A histogram with the registry's buckets unless given others"""
+        return self._register(Histogram(name, documentation, labels, buckets or self.buckets))
+
+    def render(self):
+        """Every series, labelled with the pid of the process that recorded it"""
+        extra = (('pid', os.getpid()),)
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{sample} {_format_value(value)}'
+                         for sample, value in metric.samples(extra))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,74 @@
+"""
+Production entry point: the Flask app behind a pre-fork gunicorn server
+
+Usage: python serve.py [--bind 0.0.0.0:5000] [--workers N] [--threads 1]
+
+Scoring is CPU-bound pure Python, so throughput scales with processes,
+not threads: run one worker per core (the default). The app module, and
+with it the lexicon, is imported once in the master before forking, so
+workers start instantly and share the lexicon pages copy-on-write.
+Each worker keeps its own sentiment cache and /metrics counters; the
+latter carry a pid label so scrapes of different workers stay apart.
+
+Every option can also come from the environment: SENTIMENT_BIND (or
+PORT), SENTIMENT_WORKERS, SENTIMENT_THREADS, SENTIMENT_TIMEOUT and
+SENTIMENT_LOG_LEVEL. `python app.py` remains the single-process
+development server.
+"""
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+def default_bind():
+    return os.environ.get('SENTIMENT_BIND') or f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+
+def default_workers():
+    return int(os.environ.get('SENTIMENT_WORKERS', multiprocessing.cpu_count()))
+
+
+class SentimentServer(BaseApplication):
+    """gunicorn application serving ``app.app`` with preload_app on"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the sentiment analyzer with gunicorn')
+    parser.add_argument('--bind', default=default_bind())
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--threads', type=int,
+                        default=int(os.environ.get('SENTIMENT_THREADS', 1)),
+                        help='threads per worker; above 1 uses gthread workers')
+    parser.add_argument('--timeout', type=int,
+                        default=int(os.environ.get('SENTIMENT_TIMEOUT', 30)))
+    parser.add_argument('--log-level', default=os.environ.get('SENTIMENT_LOG_LEVEL', 'info'))
+    args = parser.parse_args(argv)
+
+    SentimentServer({
+        'bind': args.bind,
+        'workers': max(args.workers, 1),
+        'threads': max(args.threads, 1),
+        'timeout': args.timeout,
+        'loglevel': args.log_level,
+        # Build the lexicon and cache config once, before forking
+        'preload_app': True,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()
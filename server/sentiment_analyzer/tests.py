@@ -0,0 +1,216 @@
+"""
+Tests for the sentiment service, through Flask's test client.
+
+Run from this directory: python -m unittest tests
+"""
+import json
+import os
+import re
+import tempfile
+import unittest
+from unittest import mock
+
+import app
+import metrics
+from cache import LRUCache
+from lexicon import Lexicon, load_lexicon, tokenize
+from metrics_core import Registry
+
+
+class ServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.app.test_client()
+
+
+class BatchTests(ServiceTestCase):
+
+    def test_labels_come_back_in_input_order(self):
+        response = self.client.post('/analyzereviews', json={
+            'reviews': ['Great service', {'review': 'Rude and slow'}, 'It is a car', None]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['sentiments'],
+                         ['positive', 'negative', 'neutral', 'neutral'])
+
+    def test_a_bare_list_is_accepted(self):
+        response = self.client.post('/analyzereviews', json=['Great service'])
+        self.assertEqual(response.get_json(), {'sentiments': ['positive']})
+
+    def test_batches_over_the_limit_are_rejected(self):
+        with mock.patch.object(app, 'MAX_BATCH_SIZE', 2):
+            response = self.client.post('/analyzereviews', json=['a', 'b', 'c'])
+            self.assertEqual(response.status_code, 413)
+            self.assertEqual(self.client.post('/analyzereviews', json=['a', 'b']).status_code, 200)
+
+    def test_malformed_batches_are_rejected(self):
+        self.assertEqual(self.client.post('/analyzereviews', json={'review': 'x'}).status_code, 400)
+        self.assertEqual(self.client.post('/analyzereviews', json=[1]).status_code, 400)
+
+    def test_ndjson_is_streamed_line_by_line(self):
+        body = '\n'.join([
+            json.dumps({'review': 'Great service'}), '{not json', json.dumps('Rude staff'), '',
+        ])
+        with mock.patch.object(app, 'NDJSON_CHUNK_SIZE', 2):
+            response = self.client.post(
+                '/analyzereviews', data=body, content_type='application/x-ndjson'
+            )
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[0], {'sentiment': 'positive'})
+        self.assertIn('error', lines[1])
+        self.assertEqual(lines[2], {'sentiment': 'negative'})
+        self.assertEqual(len(lines), 3)
+
+
+class LexiconTests(ServiceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.lexicon = Lexicon(
+            {'good': 1, 'great': 1, 'bad': -1, 'recommend': 1},
+            {'not good': -1, 'highly recommend': 2, 'not bad at all': 2},
+        )
+
+    def test_tokens_ignore_case_and_punctuation(self):
+        self.assertEqual(tokenize("GREAT, fast service!"), ['great', 'fast', 'service'])
+        self.assertEqual(tokenize('Très bien—merci'), ['très', 'bien', 'merci'])
+
+    def test_phrases_replace_the_weights_of_their_words(self):
+        self.assertEqual(self.lexicon.score('Good, great'), 2)
+        self.assertEqual(self.lexicon.score('Not good.'), -1)
+        self.assertEqual(self.lexicon.score('I highly recommend them'), 2)
+        # The longest phrase wins, and its words are not matched again
+        self.assertEqual(self.lexicon.score('not bad at all, not good'), 1)
+        self.assertEqual(self.lexicon.score(''), 0)
+
+    def test_single_word_phrases_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Lexicon({}, {'good': 1})
+
+    def test_lexicon_files(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            tsv = os.path.join(workdir, 'lexicon.tsv')
+            with open(tsv, 'w', encoding='utf-8') as handle:
+                handle.write('# weights\nsuperb\t2\nnot Superb\t-1\n')
+            lexicon = load_lexicon(tsv)
+            self.assertEqual((lexicon.score('Superb'), lexicon.score('not superb!')), (2, -1))
+
+            bad = os.path.join(workdir, 'bad.tsv')
+            with open(bad, 'w', encoding='utf-8') as handle:
+                handle.write('superb 2\n')
+            with self.assertRaisesRegex(ValueError, 'bad.tsv:1'):
+                load_lexicon(bad)
+
+            with mock.patch.dict(os.environ, {'SENTIMENT_LEXICON': ''}):
+                self.assertIs(load_lexicon(default=self.lexicon), self.lexicon)
+
+    def test_the_service_lexicon_scores_phrases(self):
+        response = self.client.post(
+            '/analyzereviews', json=['not good at all', 'would recommend', 'never again']
+        )
+        self.assertEqual(response.get_json()['sentiments'], ['negative', 'positive', 'negative'])
+
+
+class CacheTests(ServiceTestCase):
+
+    def analyze(self, text):
+        response = self.client.post('/analyzereview', json={'review': text})
+        return response.get_json()['sentiment']
+
+    def test_normalized_text_is_scored_once(self):
+        cache = LRUCache(10, 60)
+        hits = metrics.sentiment_cache.value('hit')
+        with mock.patch.object(app, 'SENTIMENT_CACHE', cache), \
+                mock.patch.object(app.LEXICON, 'score', wraps=app.LEXICON.score) as score:
+            self.assertEqual(self.analyze('Great  service'), 'positive')
+            self.assertEqual(self.analyze('great service '), 'positive')
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(metrics.sentiment_cache.value('hit'), hits + 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = LRUCache(2, 60)
+        evictions = metrics.sentiment_cache_evictions.value()
+        with mock.patch.object(app, 'SENTIMENT_CACHE', cache):
+            for text in ('Great', 'Rude', 'Great', 'Slow'):
+                self.analyze(text)
+        # 'Rude' was the least recently used when 'Slow' came in
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(app.text_key('Rude')))
+        self.assertEqual(cache.get(app.text_key('Great')), 'positive')
+        self.assertEqual(metrics.sentiment_cache_evictions.value(), evictions + 1)
+
+    def test_expired_entries_are_scored_again(self):
+        cache = LRUCache(10, 0)
+        with mock.patch.object(app, 'SENTIMENT_CACHE', cache):
+            self.analyze('Great')
+            self.analyze('Great')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_disabled_cache(self):
+        with mock.patch.object(app, 'SENTIMENT_CACHE', None):
+            self.assertEqual(self.analyze('Rude staff'), 'negative')
+
+
+class MetricsTests(ServiceTestCase):
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.content_type, metrics.CONTENT_TYPE)
+        return response.get_data(as_text=True)
+
+    def sample(self, text, name, **labels):
+        """The value of one series, matched on its labels in any order"""
+        for line in text.splitlines():
+            series, _, value = line.rpartition(' ')
+            if not series.startswith(name + '{'):
+                continue
+            found = dict(re.findall(r'(\w+)="([^"]*)"', series[len(name):]))
+            if found == {k: str(v) for k, v in labels.items()}:
+                return float(value)
+        return None
+
+    def test_every_sample_carries_the_worker_pid(self):
+        self.client.get('/health')
+        text = self.scrape()
+        samples = [line for line in text.splitlines() if line and not line.startswith('#')]
+        self.assertTrue(samples)
+        for line in samples:
+            self.assertIn(f'pid="{os.getpid()}"', line)
+
+    def test_requests_and_labels_are_counted(self):
+        pid = os.getpid()
+        before = self.scrape()
+        self.client.post('/analyzereviews', json=['Great', 'Rude', 'Great'])
+        after = self.scrape()
+
+        def delta(name, **labels):
+            return (self.sample(after, name, pid=pid, **labels) or 0) - \
+                (self.sample(before, name, pid=pid, **labels) or 0)
+
+        self.assertEqual(delta('sentiment_http_requests_total', endpoint='analyze_reviews',
+                               method='POST', status=200), 1)
+        self.assertEqual(delta('sentiment_labels_total', sentiment='positive'), 2)
+        self.assertEqual(delta('sentiment_labels_total', sentiment='negative'), 1)
+        self.assertEqual(delta('sentiment_http_request_duration_seconds_count',
+                               endpoint='analyze_reviews'), 1)
+        self.assertEqual(delta('sentiment_http_request_duration_seconds_bucket',
+                               endpoint='analyze_reviews', le='+Inf'), 1)
+        self.assertIn('# TYPE sentiment_http_request_duration_seconds histogram', after)
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry(buckets=(0.1, 1.0))
+        histogram = registry.histogram('test_seconds', 'Test')
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value)
+        text = registry.render()
+        pid = os.getpid()
+        self.assertEqual(
+            [self.sample(text, 'test_seconds_bucket', pid=pid, le=le) for le in ('0.1', '1', '+Inf')],
+            [1, 2, 3]
+        )
+        self.assertAlmostEqual(self.sample(text, 'test_seconds_sum', pid=pid), 5.55)
+
+
+if __name__ == '__main__':
+    unittest.main()
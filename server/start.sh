@@ -0,0 +1,26 @@
+#!/bin/sh
+# Serve the project in the mode named by SERVER_MODE:
+#   wsgi (default)  sync gunicorn workers
+#   asgi            uvicorn workers under gunicorn, with the async API views
+#   dev             Django's development server
+# gunicorn reads WEB_CONCURRENCY for the worker count.
+set -e
+cd "$(dirname "$0")"
+PORT="${PORT:-8000}"
+
+case "${SERVER_MODE:-wsgi}" in
+    wsgi)
+        exec gunicorn djangoproj.wsgi --bind "0.0.0.0:$PORT"
+        ;;
+    asgi)
+        exec gunicorn djangoproj.asgi --bind "0.0.0.0:$PORT" \
+            --worker-class uvicorn.workers.UvicornWorker
+        ;;
+    dev)
+        exec python manage.py runserver "0.0.0.0:$PORT"
+        ;;
+    *)
+        echo "Unknown SERVER_MODE '$SERVER_MODE' (expected wsgi, asgi or dev)" >&2
+        exit 1
+        ;;
+esac